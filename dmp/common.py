@@ -7,6 +7,17 @@ tensorflow_config_key: str = 'config'
 keras_type_key: str = 'class'
 marshal_type_key: str = 'type'
 
+# environment variable naming a node-local directory (on a tmpfs such as
+# /dev/shm) in which workers on the same node share prepared datasets
+shared_dataset_directory_variable: str = 'DMP_SHARED_DATASET_DIRECTORY'
+
+# environment variable capping the bytes of the shared dataset directory
+# (by default, half the size of its file system)
+shared_dataset_max_bytes_variable: str = 'DMP_SHARED_DATASET_MAX_BYTES'
+
+# environment variable naming a precomputed DenseBySize width table (.npz)
+dense_by_size_table_variable: str = 'DMP_DENSE_BY_SIZE_TABLE'
+
 K = TypeVar('K')
 V = TypeVar('V')
 
@@ -3,6 +3,7 @@ from typing import List, Dict, Tuple, Optional, Any, Sequence
 
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.ml_task import MLTask
+from dmp.preprocessing.preprocessor import Preprocessor
 import dmp.task.experiment.training_experiment.training_experiment_keys as training_experiment_keys
 
 
@@ -13,6 +14,14 @@ class Dataset():
     test: Optional[DatasetGroup] = None
     validation: Optional[DatasetGroup] = None
 
+    # fitted transforms that were applied to the splits, if any
+    input_preprocessor: Optional[Preprocessor] = None
+    output_preprocessor: Optional[Preprocessor] = None
+    # if True, that preprocessor has not been applied to the splits, and the
+    # input pipeline applies it to each batch instead
+    preprocess_input_batches: bool = False
+    preprocess_output_batches: bool = False
+
     @property
     def splits(self) -> Sequence[Tuple[str, DatasetGroup]]:
         splits = []
@@ -36,8 +45,24 @@ class Dataset():
 
     @property
     def input_shape(self) -> List[int]:
-        return [int(i) for i in self.train.inputs.shape[1:]]  # type: ignore
+        return self._get_shape(
+            self.train.inputs,  # type: ignore
+            self.input_preprocessor if self.preprocess_input_batches else None,
+        )
 
     @property
     def output_shape(self) -> List[int]:
-        return [int(i) for i in self.train.outputs.shape[1:]]  # type: ignore
+        return self._get_shape(
+            self.train.outputs,  # type: ignore
+            self.output_preprocessor
+            if self.preprocess_output_batches else None,
+        )
+
+    @staticmethod
+    def _get_shape(
+        values: Any,
+        batch_preprocessor: Optional[Preprocessor],
+    ) -> List[int]:
+        if batch_preprocessor is not None:
+            values = batch_preprocessor.forward(values[:1])
+        return [int(i) for i in values.shape[1:]]
@@ -0,0 +1,437 @@
+'''
+Columnar, memory-mappable on-disk format for cached Datasets.
+
+A cached Dataset is a directory containing one uncompressed .npy file for each
+split's inputs and outputs (e.g. train_inputs.npy) and a small json manifest.
+Arrays are opened with numpy.load(mmap_mode='r'), so workers on the same node
+share the cached pages through the OS page cache instead of each holding a
+private decompressed copy. Any fitted preprocessors of the Dataset are pickled
+alongside the arrays.
+
+DatasetCache manages a directory of such entries. Entries are written to a
+temporary directory and renamed into place, and a per-entry file lock ensures
+that only one worker on a node fetches a missing dataset while the others
+wait for it.
+
+A DatasetCache may have a byte budget. Its readers then hold a shared lock
+on each entry for as long as the Dataset they read from it is alive. To make
+room for a new entry, least recently read entries that nobody holds are
+evicted, and an entry that still doesn't fit is not cached.
+'''
+
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import uuid
+import weakref
+
+import numpy
+
+from dmp.dataset.dataset import Dataset
+from dmp.dataset.dataset_group import DatasetGroup
+from dmp.dataset.ml_task import MLTask
+
+manifest_filename: str = 'manifest.json'
+preprocessors_filename: str = 'preprocessors.pkl'
+lock_suffix: str = '.lock'
+temp_infix: str = '.tmp-'
+_group_arrays: Tuple[str, ...] = ('inputs', 'outputs')
+
+
+def _get_array_filename(split: str, array_name: str) -> str:
+    return f'{split}_{array_name}.npy'
+
+
+def get_array_path(path: str, split: str, array_name: str) -> str:
+    '''
+    Returns where write_dataset() stores an array of the entry at path. An
+    array can be built in place there as a numpy memmap, and write_dataset()
+    will keep it instead of copying it.
+    '''
+    return os.path.join(path, _get_array_filename(split, array_name))
+
+
+def write_dataset(path: str, dataset: Dataset) -> int:
+    '''
+    Writes dataset into the directory at path and returns the number of bytes
+    written. The manifest is written last, so a directory without one is an
+    incomplete write.
+    '''
+    os.makedirs(path, exist_ok=True)
+    num_bytes = 0
+    splits: Dict[str, Dict[str, Any]] = {}
+    for split, group in dataset.splits:
+        split_manifest = {}
+        for array_name in _group_arrays:
+            array = numpy.asanyarray(getattr(group, array_name))
+            # object arrays must be pickled, and pickled arrays can't be mapped
+            mappable = not array.dtype.hasobject
+            filename = _get_array_filename(split, array_name)
+            file_path = os.path.join(path, filename)
+            if isinstance(array, numpy.memmap) and \
+                os.path.abspath(array.filename) == os.path.abspath(file_path):
+                array.flush()  # already written in place
+            else:
+                numpy.save(file_path, array, allow_pickle=not mappable)
+            num_bytes += os.path.getsize(file_path)
+            split_manifest[array_name] = {
+                'file': filename,
+                'mmap': mappable,
+            }
+        splits[split] = split_manifest
+
+    manifest: Dict[str, Any] = {
+        'ml_task': dataset.ml_task.value,
+        'splits': splits,
+        'preprocess_input_batches': dataset.preprocess_input_batches,
+        'preprocess_output_batches': dataset.preprocess_output_batches,
+    }
+    if dataset.input_preprocessor is not None or \
+        dataset.output_preprocessor is not None:
+        file_path = os.path.join(path, preprocessors_filename)
+        with open(file_path, 'wb') as file:
+            pickle.dump(
+                {
+                    'inputs': dataset.input_preprocessor,
+                    'outputs': dataset.output_preprocessor,
+                }, file)
+        num_bytes += os.path.getsize(file_path)
+        manifest['preprocessors'] = preprocessors_filename
+
+    with open(os.path.join(path, manifest_filename), 'w') as file:
+        json.dump(manifest, file)
+    return num_bytes
+
+
+def read_dataset(path: str) -> Dataset:
+    '''
+    Opens a Dataset written by write_dataset(). Arrays are read-only memory
+    maps where possible. Raises FileNotFoundError if there is no complete
+    cache entry at path.
+    '''
+    with open(os.path.join(path, manifest_filename), 'r') as file:
+        manifest = json.load(file)
+
+    groups: Dict[str, DatasetGroup] = {}
+    for split, split_manifest in manifest['splits'].items():
+        arrays = []
+        for array_name in _group_arrays:
+            array_manifest = split_manifest[array_name]
+            file_path = os.path.join(path, array_manifest['file'])
+            if array_manifest['mmap']:
+                arrays.append(numpy.load(file_path, mmap_mode='r'))
+            else:
+                arrays.append(numpy.load(file_path, allow_pickle=True))
+        groups[split] = DatasetGroup(*arrays)
+
+    preprocessors = {}
+    if 'preprocessors' in manifest:
+        with open(os.path.join(path, manifest['preprocessors']), 'rb') as file:
+            preprocessors = pickle.load(file)
+
+    return Dataset(
+        MLTask(manifest['ml_task']),
+        groups.get('train', None),
+        groups.get('test', None),
+        groups.get('validation', None),
+        preprocessors.get('inputs', None),
+        preprocessors.get('outputs', None),
+        manifest.get('preprocess_input_batches', False),
+        manifest.get('preprocess_output_batches', False),
+    )
+
+
+def get_dataset_size(dataset: Dataset) -> int:
+    return sum(
+        numpy.asanyarray(getattr(group, array_name)).nbytes
+        for _, group in dataset.splits for array_name in _group_arrays)
+
+
+def make_cache_key(prefix: str, version: int, parameters: Dict[str,
+                                                               Any]) -> str:
+    '''
+    Makes a cache key from a readable prefix, a version number, and a hash of
+    the parameters that determine the cached content.
+    '''
+    content_hash = hashlib.sha256(
+        json.dumps(parameters, sort_keys=True,
+                   default=str).encode('utf-8')).hexdigest()
+    return f'{prefix}_v{version}_{content_hash[:16]}'
+
+
+def get_directory_size(path: str) -> int:
+    num_bytes = 0
+    for entry in os.scandir(path):
+        if entry.is_dir(follow_symlinks=False):
+            num_bytes += get_directory_size(entry.path)
+        else:
+            num_bytes += entry.stat(follow_symlinks=False).st_size
+    return num_bytes
+
+
+@dataclass
+class DatasetCacheStatistics():
+    hits: int = 0
+    misses: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    evictions: int = 0
+    bytes_evicted: int = 0
+    skipped_writes: int = 0  # entries that didn't fit in the budget
+
+
+class DatasetCache():
+
+    def __init__(
+        self,
+        name: str,
+        directory: str,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.name: str = name
+        self.directory: str = directory
+        # the byte budget of the cached entries, if any
+        self.max_bytes: Optional[int] = max_bytes
+        self.statistics: DatasetCacheStatistics = DatasetCacheStatistics()
+        _caches.append(self)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str, fetch: Callable[[], Dataset]) -> Dataset:
+        '''
+        Returns the cached Dataset for key, calling fetch() and caching its
+        result on a miss.
+        '''
+        data = self.try_read(key)
+        if data is not None:
+            return data
+
+        with self._lock(key):
+            # another worker may have written the entry while we waited
+            if not self._has_entry(key):
+                data, _ = self._fetch_and_write(key, fetch)
+                return data
+        return self.load(key, fetch)
+
+    def load_entry(self, key: str, write_entry: Callable[[str], int]) -> Dataset:
+        '''
+        Like load(), but on a miss write_entry(path) writes the entry into the
+        directory at path itself (ending with write_dataset()) and returns the
+        number of bytes written. The new entry is then read from the cache.
+        As its size isn't known in advance, the entry is written regardless
+        of the budget.
+        '''
+        data = self.try_read(key)
+        if data is not None:
+            return data
+
+        with self._lock(key):
+            if self._has_entry(key):
+                return self.load_entry(key, write_entry)
+            self.statistics.misses += 1
+            self._write_entry(key, write_entry)
+
+        data = self._read(key)
+        if data is None:
+            raise FileNotFoundError(self.get_path(key))
+        return data
+
+    def load_mapped(self, key: str, fetch: Callable[[], Dataset]) -> Dataset:
+        '''
+        Like load(), but on a miss returns the newly written entry as read
+        from the cache, so that every process maps the same cached arrays.
+        If the entry isn't written, for instance because it doesn't fit in
+        the budget, returns the result of fetch() instead.
+        '''
+        data = self.try_read(key)
+        if data is not None:
+            return data
+
+        with self._lock(key):
+            if self._has_entry(key):
+                return self.load_mapped(key, fetch)
+            data, written = self._fetch_and_write(key, fetch)
+
+        if written:
+            mapped_data = self._read(key)
+            if mapped_data is not None:
+                return mapped_data
+        return data
+
+    def try_read(self, key: str) -> Optional[Dataset]:
+        path = self.get_path(key)
+        try:
+            data = self._read(key)
+        except:
+            print(f'Error reading from {self.name} {path}:')
+            traceback.print_exc()
+            self._remove(path)
+            return None
+        if data is None:
+            return None
+
+        self.statistics.hits += 1
+        self.statistics.bytes_read += get_dataset_size(data)
+        return data
+
+    def _read(self, key: str) -> Optional[Dataset]:
+        # must not be called holding the entry's lock, which flock would
+        # treat as held by another reader
+        path = self.get_path(key)
+        if self.max_bytes is None:
+            try:
+                return read_dataset(path)
+            except FileNotFoundError:
+                return None
+
+        # hold the entry for as long as its Dataset is alive
+        lock_file = open(path + lock_suffix, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            data = read_dataset(path)
+        except FileNotFoundError:
+            lock_file.close()
+            return None
+        except:
+            lock_file.close()
+            raise
+        weakref.finalize(data, lock_file.close)
+        os.utime(path)  # mark the entry as recently read
+        return data
+
+    def _has_entry(self, key: str) -> bool:
+        return os.path.exists(
+            os.path.join(self.get_path(key), manifest_filename))
+
+    def _fetch_and_write(
+        self,
+        key: str,
+        fetch: Callable[[], Dataset],
+    ) -> Tuple[Dataset, bool]:
+        # must be called holding the entry's lock
+        self.statistics.misses += 1
+        data = fetch()
+        if not self._make_room(get_dataset_size(data)):
+            print(f'Not writing {self.name} {self.get_path(key)}: '
+                  'it does not fit in the budget.')
+            self.statistics.skipped_writes += 1
+            return data, False
+        self.write(key, data)
+        return data, self._has_entry(key)
+
+    def write(self, key: str, data: Dataset) -> None:
+        self._write_entry(key, lambda path: write_dataset(path, data))
+
+    def _write_entry(self, key: str, write_entry: Callable[[str], int]) -> None:
+        path = self.get_path(key)
+        temp_path = f'{path}{temp_infix}{os.getpid()}-{uuid.uuid4().hex}'
+        try:
+            print(f'Writing {self.name} {path}.')
+            num_bytes = write_entry(temp_path)
+            try:
+                os.rename(temp_path, path)
+            except OSError:
+                if self._has_entry(key):
+                    # another writer got there first; keep their entry
+                    self._remove(temp_path)
+                    return
+                # replace an incomplete entry
+                self._remove(path)
+                os.rename(temp_path, path)
+            self.statistics.bytes_written += num_bytes
+            print(f'Done writing {self.name} {path}.')
+        except:
+            print(f'Error writing to {self.name} {path}:')
+            traceback.print_exc()
+            self._remove(temp_path)
+
+    def _make_room(self, num_bytes: int) -> bool:
+        '''
+        Evicts least recently read entries that nobody holds until an entry
+        of num_bytes fits in the budget and the free space of the file
+        system. Returns False if it can't be made to fit.
+        '''
+        if self.max_bytes is None:
+            return True
+        if num_bytes > self.max_bytes:
+            return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []  # (last read time, size, key)
+        used_bytes = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            size = get_directory_size(entry.path)
+            used_bytes += size
+            if temp_infix not in entry.name:
+                entries.append((entry.stat().st_mtime, size, entry.name))
+        entries.sort()
+
+        def fits() -> bool:
+            return used_bytes + num_bytes <= self.max_bytes and \
+                num_bytes <= shutil.disk_usage(self.directory).free
+
+        for _, size, key in entries:
+            if fits():
+                return True
+            if self._try_evict(key):
+                used_bytes -= size
+                self.statistics.evictions += 1
+                self.statistics.bytes_evicted += size
+        return fits()
+
+    def _try_evict(self, key: str) -> bool:
+        # an entry can only be evicted while no reader or writer holds it
+        with open(self.get_path(key) + lock_suffix, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                print(f'Evicting {self.name} {self.get_path(key)}.')
+                self._remove(self.get_path(key))
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return True
+
+    @contextmanager
+    def _lock(self, key: str) -> Iterator[None]:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.get_path(key) + lock_suffix, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _remove(self, path: str) -> None:
+        try:
+            shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except:
+            print(f'Error removing {self.name} entry {path}:')
+            traceback.print_exc()
+
+
+_caches: List[DatasetCache] = []
+
+
+def get_cache_statistics() -> Dict[str, int]:
+    '''
+    Returns a flat snapshot of the counters of every DatasetCache, suitable
+    for logging into run_data.
+    '''
+    return {
+        f'{cache.name}_{field.name}': getattr(cache.statistics, field.name)
+        for cache in _caches for field in fields(DatasetCacheStatistics)
+    }
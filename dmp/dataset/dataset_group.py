@@ -1,8 +1,14 @@
-
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional
 
 @dataclass
 class DatasetGroup:
     inputs : Any
-    outputs : Any
\ No newline at end of file
+    outputs : Any
+    # When set, this group's inputs are inputs[input_indices], gathered lazily
+    # so that several groups can share one inputs array without copying it.
+    input_indices : Optional[Any] = None
+
+    @property
+    def size(self) -> int:
+        return int(self.outputs.shape[0])
@@ -5,8 +5,7 @@ from dataclasses import dataclass
 from io import BytesIO
 import json
 import os
-import pickle
-import traceback
+import shutil
 from typing import (
     Callable,
     Dict,
@@ -18,18 +17,56 @@ from typing import (
 )
 import numpy
 from numpy import ndarray
-import pandas
-import pyarrow
-from sklearn.preprocessing import (
-    MinMaxScaler,
-    OneHotEncoder,
+from dmp.common import (
+    shared_dataset_directory_variable,
+    shared_dataset_max_bytes_variable,
+)
+from dmp.dataset.dataset_cache import (
+    DatasetCache,
+    make_cache_key,
 )
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.dataset import Dataset
 from dmp.dataset.ml_task import MLTask
+from dmp.preprocessing.column_encoding import (
+    ColumnEncoder,
+    ColumnEncoding,
+    count_distinct_values,
+    is_numeric_column,
+)
+from dmp.preprocessing.preprocessor import Preprocessor
 
 dataset_cache_directory = os.path.join(os.getcwd(), '.dataset_cache')
 
+raw_dataset_cache = DatasetCache('dataset_cache', dataset_cache_directory)
+prepared_dataset_cache = DatasetCache(
+    'prepared_dataset_cache',
+    dataset_cache_directory,
+)
+
+# When the node manager provides a node-local tmpfs directory, the first
+# worker on a node to load a prepared dataset copies it there once, and every
+# worker on the node maps that single copy read-only. tmpfs pages are shared
+# memory, as with multiprocessing.shared_memory, and the cache entries are
+# named by their cache keys. As tmpfs pages take up memory, the tier has a
+# byte budget: datasets that don't fit aren't shared, and least recently read
+# datasets no worker has loaded are evicted to make room.
+shared_dataset_cache: Optional[DatasetCache] = None
+if os.environ.get(shared_dataset_directory_variable):
+    _shared_dataset_directory = os.environ[shared_dataset_directory_variable]
+    if os.environ.get(shared_dataset_max_bytes_variable):
+        _shared_dataset_max_bytes = int(
+            os.environ[shared_dataset_max_bytes_variable])
+    else:
+        _shared_dataset_max_bytes = shutil.disk_usage(
+            os.path.dirname(os.path.abspath(
+                _shared_dataset_directory))).total // 2
+    shared_dataset_cache = DatasetCache(
+        'shared_dataset_cache',
+        _shared_dataset_directory,
+        _shared_dataset_max_bytes,
+    )
+
 
 @dataclass
 class DatasetLoader(ABC):
@@ -43,187 +80,147 @@ class DatasetLoader(ABC):
     index_delimiter = 'x'
     _group_column = 'g'
 
+    loader_version = 0  # increment to invalidate cached data from this loader
+    preprocessing_version = 1  # increment when preprocessing output changes
+    # if True, that fitted preprocessor is applied to each batch by the input
+    # pipeline instead of to the whole dataset
+    _preprocess_input_batches = False
+    _preprocess_output_batches = False
+
     def __call__(self) -> Dataset:
+        # cached prepared arrays are read-only memory maps
+        key = self._get_prepared_cache_key()
+
+        def load_prepared_dataset() -> Dataset:
+            return prepared_dataset_cache.load(
+                key,
+                self._load_and_prepare_dataset,
+            )
+
+        if shared_dataset_cache is None:
+            return load_prepared_dataset()
+
+        # falls back to the prepared dataset if it isn't shared
+        return shared_dataset_cache.load_mapped(key, load_prepared_dataset)
+
+    def _load_and_prepare_dataset(self) -> Dataset:
         data = self._load_dataset()
         data = self._prepare_dataset_data(data)
         return data
 
     def _load_dataset(self):
-        data = self._try_read_from_cache()
-        data = None
-        if data is None:
-            data = self._fetch_from_source()
-            self._write_to_cache(data)
-        return data
-
-    def _get_cache_path(self, name):
-        filename = self.source + '_' + self.dataset_name + name
-        return os.path.join(dataset_cache_directory, filename)
-
-    def _try_read_from_cache(self) -> Optional[Dataset]:
-        # filename = self._get_cache_path('.pkl.bz2')
-        # try:
-        #     import bz2
-        #     with bz2.BZ2File(filename, 'rb') as file: 
-        #         return pickle.load(file)
-        filename = self._get_cache_path('.pkl.lz4')
-        try:
-            import lz4
-            with lz4.frame.open(filename, mode='rb') as file:
-                return pickle.load(file)
-        # 
-        except FileNotFoundError:
-            print(f'Dataset cache file {filename} not found while reading from dataset cache for {self}.')
-            return None
-        except:
-            print(f'Error reading from dataset cache for {self}:')
-            traceback.print_exc()
-            try:
-                os.remove(filename)
-            except:
-                print(f'Error removing bad cache file for {self}:')
-                traceback.print_exc()
-        return None
+        return raw_dataset_cache.load(
+            self._get_cache_key(),
+            self._fetch_from_source,
+        )
+
+    def _get_cache_key(self) -> str:
+        return make_cache_key(
+            self.source + '_' + self.dataset_name,
+            self.loader_version,
+            self._get_cache_parameters(),
+        )
+
+    def _get_prepared_cache_key(self) -> str:
+        parameters = self._get_cache_parameters()
+        parameters['loader_version'] = self.loader_version
+        if self._preprocess_input_batches:
+            parameters['preprocess_input_batches'] = True
+        if self._preprocess_output_batches:
+            parameters['preprocess_output_batches'] = True
+        return make_cache_key(
+            self.source + '_' + self.dataset_name + '_prepared',
+            self.preprocessing_version,
+            parameters,
+        )
+
+    def _get_cache_parameters(self) -> Dict[str, Any]:
+        # public, plain-valued attributes identify what this loader fetches
+        parameters: Dict[str, Any] = {'type': type(self).__name__}
+        for name, value in vars(self).items():
+            if not name.startswith('_') and \
+                (value is None or isinstance(value, (str, numbers.Number))):
+                parameters[name] = value
+        return parameters
 
     @abstractmethod
     def _fetch_from_source(self) -> Dataset:
         pass
 
-    def _write_to_cache(self, data: Dataset) -> None:
-        try:
-            # filename = self._get_cache_path('.pkl.bz2')
-            # print(f'Writing dataset cache file {filename} for {self}.')
-
-            # import bz2
-            # with bz2.BZ2File(filename, 'wb', compresslevel=1) as file:
-            #     pickle.dump(data, file)
-
-            filename = self._get_cache_path('.pkl.lz4')
-            print(f'Writing dataset cache file {filename} for {self}.')
-
-            import lz4
-            with lz4.frame.open(filename, mode='wb') as file:
-                pickle.dump(data, file)
-
-            print(f'Done writing dataset cache file {filename} for {self}.')
-            
-        except Exception as e:
-            print(f'Error writing to dataset cache for {self}:')
-            traceback.print_exc()
-
     def _prepare_dataset_data(self, data: Dataset) -> Dataset:
-        data.train = self._prepare_data_group(data.train)
-        data.test = self._prepare_data_group(data.test)
-        data.validation = self._prepare_data_group(data.validation)
+        # Fit preprocessing to the training split only, and apply the same
+        # fitted transform to every split. The fitted preprocessors are kept
+        # with the dataset (and its cache entry).
+        data.input_preprocessor = self._fit_input_preprocessor(
+            data.train.inputs)  # type: ignore
+        data.output_preprocessor = self._fit_output_preprocessor(
+            data.train.outputs)  # type: ignore
+        data.preprocess_input_batches = self._preprocess_input_batches
+        data.preprocess_output_batches = self._preprocess_output_batches
+        data.train = self._prepare_data_group(data, data.train)
+        data.test = self._prepare_data_group(data, data.test)
+        data.validation = self._prepare_data_group(data, data.validation)
         return data
 
     def _prepare_data_group(
         self,
+        data: Dataset,
         group: Optional[DatasetGroup],
     ) -> Optional[DatasetGroup]:
         if group is None:
             return None
-        group.inputs = self._prepare_inputs(group.inputs)
-        group.outputs = self._prepare_outputs(group.outputs)
+        if data.input_preprocessor is not None and \
+            not data.preprocess_input_batches:
+            group.inputs = data.input_preprocessor.forward(group.inputs)
+        if data.output_preprocessor is not None and \
+            not data.preprocess_output_batches:
+            group.outputs = data.output_preprocessor.forward(group.outputs)
         return group
 
-    def _prepare_inputs(self, data) -> ndarray:
-        return self.prepare_data(data, self.dynamic_value_transform)
-
-    def _prepare_outputs(self, data) -> ndarray:
-        return self.prepare_data(data, self.dynamic_output_value_transform)
+    def _fit_input_preprocessor(self, data: ndarray) -> Optional[Preprocessor]:
+        return ColumnEncoder(data, self._get_input_encodings(data))
 
-    def prepare_data(self, value, transform) -> ndarray:
-        shape = value.shape
-        if len(shape) == 1:
-            return self.prepare_value(value, transform)  # type: ignore
-        elif len(shape) > 1:
-            return self.prepare_matrix(value, transform)  # type: ignore
-        raise Exception('Invalid shape {}.'.format(shape))
+    def _fit_output_preprocessor(self, data: ndarray) -> Optional[Preprocessor]:
+        return ColumnEncoder(data, self._get_output_encodings(data))
 
-    @staticmethod
-    def dynamic_value_transform(
-        self,
-        value: ndarray,
-    ) -> Optional[ndarray]:
+    def _get_input_encodings(self, values: ndarray) -> ndarray:
         # TODO: Normalizer and PCA decorrelation can also help, etc
         # see http://yann.lecun.com/exdb/publis/pdf/lecun-98b.pdf
         # use one-hot when there are 20 or fewer distinct values, or the
         # values are not numbers
-
-        num_distinct_values = numpy.unique(value).size
-        if num_distinct_values <= 1:
-            return None  # ignore it
-        if num_distinct_values <= 2:
-            return self.binary(value)
-        if num_distinct_values <= 20 or \
-            not isinstance(value[0][0], numbers.Number):
-            return self.one_hot(value)
-        return self.min_max(value)
-
-    @staticmethod
-    def dynamic_output_value_transform(
-        self,
-        value: ndarray,
-    ) -> Optional[ndarray]:
+        values = _as_columns(values)
+        num_distinct_values = count_distinct_values(values)
+        encodings = numpy.full(num_distinct_values.shape,
+                               ColumnEncoding.min_max)
+        encodings[(num_distinct_values <= 20)
+                  | ~is_numeric_column(values)] = ColumnEncoding.one_hot
+        encodings[num_distinct_values <= 2] = ColumnEncoding.binary
+        encodings[num_distinct_values <= 1] = ColumnEncoding.ignore
+        return encodings
+
+    def _get_output_encodings(self, values: ndarray) -> ndarray:
+        values = _as_columns(values)
         if self.ml_task == MLTask.classification:
-            num_distinct_values = numpy.unique(value).size
-            if num_distinct_values <= 1:
-                return numpy.zeros_like(value)
-            if num_distinct_values <= 2:
-                return self.binary(value)
-            return self.one_hot(value)
+            num_distinct_values = count_distinct_values(values)
+            encodings = numpy.full(num_distinct_values.shape,
+                                   ColumnEncoding.one_hot)
+            encodings[num_distinct_values <= 2] = ColumnEncoding.binary
+            encodings[num_distinct_values <= 1] = ColumnEncoding.zeros
         else:
-            return self.min_max(value)
-
-    def prepare_value(
-        self,
-        value: ndarray,
-        value_transform: Callable[['DatasetLoader', ndarray], ndarray],
-    ) -> Optional[ndarray]:
-        value = numpy.reshape(value, (-1, 1))
-        return value_transform(self, value)
-
-    def prepare_matrix(
-        self,
-        values: ndarray,
-        value_transform: Callable[['DatasetLoader', ndarray], ndarray],
-    ) -> Optional[ndarray]:
-        transformed_list = []
-        for i in range(values.shape[1]):
-            value = values[:, i]
-            transformed_value = self.prepare_value(value, value_transform)
-            if transformed_value is not None:
-                transformed_list.append(transformed_value)
-        return numpy.hstack(transformed_list)
-
-    def prepare_tensor(
-        self,
-        values: ndarray,
-        value_transform: Callable[['DatasetLoader', ndarray], ndarray],
-    ) -> ndarray:
-        # apply value_transform to all entries
-        return value_transform(self, values)
-
-    def min_max(self, value: ndarray) -> ndarray:
-        preprocessor = MinMaxScaler()
-        preprocessor.fit(value)
-        return preprocessor.transform(value).astype(numpy.float32)
-
-    def one_hot(self, value: ndarray) -> ndarray:
-        preprocessor = OneHotEncoder(handle_unknown='ignore', sparse=False)
-        preprocessor.fit(value)
-        return preprocessor.transform(value).astype(numpy.int8)  # type: ignore
+            encodings = numpy.full(values.shape[1], ColumnEncoding.min_max)
+        return encodings
 
-    def binary(self, value: ndarray) -> ndarray:
-        # if there are only two values, set them as 0 and 1
-        return (value == value[0]).astype(numpy.int8)  # type: ignore
 
-    def _prepare_image(self, data: ndarray) -> ndarray:
-        return (data.astype(numpy.float16) / numpy.array(255.0, dtype=numpy.float16)).astype(numpy.float16)
+def _as_columns(values: ndarray) -> ndarray:
+    if len(values.shape) == 1:
+        return numpy.reshape(values, (-1, 1))
+    elif len(values.shape) > 1:
+        return values
+    raise Exception('Invalid shape {}.'.format(values.shape))
 
 
-def load_dataset_index(path: str) -> pandas.DataFrame:
+def load_dataset_index(path: str) -> 'pandas.DataFrame':
+    import pandas
     datasets = pandas.read_csv(path)
     datasets.set_index('Dataset', inplace=True, drop=False)
     return datasets
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -9,3 +10,6 @@ class DatasetSpec():
     test_split: float  # direct migrate
     validation_split: float  # 0.0 when migrating from AspectTestTask
     label_noise: float  # direct migrate from label_noise is None or label_noise == 'none' or label_noise <= 0.0:
+    # tf.data input pipeline options (see PreparedDataset); None for the plain
+    # batched pipeline. Recorded in run_data, not as an experiment attribute.
+    pipeline: Optional[Dict[str, Any]] = None
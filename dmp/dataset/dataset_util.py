@@ -1,3 +1,13 @@
+'''
+Lazy registry of dataset loaders.
+
+Loaders are only constructed when a (source, name) pair is first requested,
+and are then memoized. Importing this module doesn't import tensorflow or
+parse the PMLB index; the index is parsed once, on the first PMLB lookup.
+'''
+
+import csv
+import functools
 import os
 from typing import (
     Callable,
@@ -7,55 +17,55 @@ from typing import (
     Tuple,
     Any,
 )
-from dmp.dataset.gaussian_classification_dataset import GaussianClassificationDataset
-import tensorflow.keras as keras
-import pandas
 from dmp.dataset.dataset import Dataset
 from dmp.dataset.dataset_loader import DatasetLoader
-from dmp.dataset.functional_pmlb_dataset_loader import FunctionalPMLBDatasetLoader
-from dmp.dataset.gaussian_regression_dataset import GaussianRegressionDataset
-from dmp.dataset.keras_image_dataset_loader import KerasImageDatasetLoader
-from dmp.dataset.keras_mnist_dataset_loader import KerasMNISTDatasetLoader
 from dmp.dataset.ml_task import MLTask
-from dmp.dataset.pmlb_dataset_loader import PMLBDatasetLoader
-from dmp.dataset.tf_image_classification_dataset_loader import TFImageClassificationDatasetLoader
-from dmp.dataset.imagenet_dataset_loader import ImageNetDatasetLoader
-from dmp.common import make_dispatcher
+from dmp.common import dispatch, make_dispatcher
 
 
 def load_dataset(source: str, name: str) -> Dataset:
-    result = __source_loaders(source)(name)()  # type: ignore
+    result = get_dataset_loader(source, name)()
     return result
 
 
-def _make_loader_map(
-    loaders: List[DatasetLoader], ) -> Dict[str, DatasetLoader]:
-    return {loader.dataset_name: loader for loader in loaders}
+@functools.lru_cache(maxsize=None)
+def get_dataset_loader(source: str, name: str) -> DatasetLoader:
+    return __source_loaders(source)(name)
+
 
+def _load_keras_data(dataset: str, **kwargs) -> Any:
+    import tensorflow.keras as keras
+    return getattr(keras.datasets, dataset).load_data(**kwargs)
 
-__load_keras_dataset = make_dispatcher(
-    'keras dataset',
-    _make_loader_map([
-        KerasMNISTDatasetLoader(
-            'mnist',
-            keras.datasets.mnist.load_data,
-        ),
-        KerasMNISTDatasetLoader(
-            'fashion_mnist',
-            keras.datasets.fashion_mnist.load_data,
-        ),
-        KerasImageDatasetLoader(
-            'cifar10',
-            keras.datasets.cifar10.load_data,
-        ),
-        KerasImageDatasetLoader(
-            'cifar100',
-            lambda: keras.datasets.cifar100.load_data(label_mode='fine'),
-        ),
-    ]))
-
-
-def __make_load_pmlb_dataset():
+
+# name: (uses the MNIST loader, keras.datasets module, load_data() arguments)
+_keras_datasets: Dict[str, Tuple[bool, str, Dict[str, Any]]] = {
+    'mnist': (True, 'mnist', {}),
+    'fashion_mnist': (True, 'fashion_mnist', {}),
+    'cifar10': (False, 'cifar10', {}),
+    'cifar100': (False, 'cifar100', {
+        'label_mode': 'fine'
+    }),
+}
+
+
+def _make_keras_loader(name: str, uint8_images: bool) -> DatasetLoader:
+    from dmp.dataset.keras_image_dataset_loader import KerasImageDatasetLoader
+    from dmp.dataset.keras_mnist_dataset_loader import KerasMNISTDatasetLoader
+
+    is_mnist, dataset, kwargs = dispatch('keras dataset', _keras_datasets,
+                                         name)
+    loader_type = KerasMNISTDatasetLoader if is_mnist \
+        else KerasImageDatasetLoader
+    return loader_type(
+        name,
+        functools.partial(_load_keras_data, dataset, **kwargs),
+        uint8_images,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pmlb_index() -> Dict[str, MLTask]:
     pmlb_index_path = os.path.join(
         os.path.realpath(os.path.join(
             os.getcwd(),
@@ -63,74 +73,109 @@ def __make_load_pmlb_dataset():
         )),
         'pmlb.csv',
     )
-    dataset_index = pandas.read_csv(pmlb_index_path)
-    dataset_index.set_index('Dataset', inplace=True, drop=False)
-
-    loader_list: List[DatasetLoader] = []
-    for _, row in dataset_index.iterrows():
-        loader_list.append(
-            PMLBDatasetLoader(row['Dataset'], MLTask(row['Task'])))
-
-    loaders: Dict[str, DatasetLoader] = _make_loader_map(loader_list)
-    loaders.update(
-        _make_loader_map([
-            FunctionalPMLBDatasetLoader(
-                'mnist',
-                MLTask.classification,
-                lambda loader, data: loader._prepare_image(data),
-            ),
-            PMLBDatasetLoader('201_pol', MLTask.classification),
-            PMLBDatasetLoader('294_satellite_image', MLTask.classification),
-        ]))  # type: ignore
-    return make_dispatcher('pmlb dataset', loaders)
-
-
-__load_pmlb_dataset = __make_load_pmlb_dataset()
-
-__load_imagenet_dataset = make_dispatcher(
-    'ImageNet dataset',
-    _make_loader_map([
-        ImageNetDatasetLoader(
-            'imagenet_16',
-            MLTask.classification,
-            16,
-            None,
-        ),
-        ImageNetDatasetLoader(
-            'imagenet_16_120',
-            MLTask.classification,
-            16,
-            120,
-        ),
-        ImageNetDatasetLoader(
-            'imagenet_32',
-            MLTask.classification,
-            32,
-            None,
-        ),
-        ImageNetDatasetLoader(
-            'imagenet_32_120',
+    with open(pmlb_index_path, newline='') as file:
+        return {
+            row['Dataset']: MLTask(row['Task'])
+            for row in csv.DictReader(file)
+        }
+
+
+# datasets that override the PMLB index
+_pmlb_ml_tasks: Dict[str, MLTask] = {
+    '201_pol': MLTask.classification,
+    '294_satellite_image': MLTask.classification,
+}
+
+
+def _make_pmlb_loader(name: str) -> DatasetLoader:
+    from dmp.dataset.functional_pmlb_dataset_loader import FunctionalPMLBDatasetLoader
+    from dmp.dataset.pmlb_dataset_loader import PMLBDatasetLoader
+    from dmp.preprocessing.image_scaler import ImageScaler
+
+    if name == 'mnist':
+        return FunctionalPMLBDatasetLoader(
+            'mnist',
             MLTask.classification,
-            32,
-            120,
-        ),
-    ]))
-
-__load_synthetic_dataset = make_dispatcher(
-    'synthetic dataset',
-    _make_loader_map([
-        GaussianClassificationDataset(2, 10, 1.0, 10000),
-        GaussianRegressionDataset(20, 1.0, 1000),
-    ])
-)
+            lambda loader, data: ImageScaler(),
+        )
+    ml_task = _pmlb_ml_tasks.get(name, None)
+    if ml_task is None:
+        ml_task = dispatch('pmlb dataset', _get_pmlb_index(), name)
+    return PMLBDatasetLoader(name, ml_task)
+
+
+# name: (size, crop)
+_imagenet_datasets: Dict[str, Tuple[int, Optional[int]]] = {
+    'imagenet_16': (16, None),
+    'imagenet_16_120': (16, 120),
+    'imagenet_32': (32, None),
+    'imagenet_32_120': (32, 120),
+}
+
+
+def _make_imagenet_loader(
+    name: str,
+    streaming: bool,
+    uint8_images: bool,
+) -> DatasetLoader:
+    from dmp.dataset.imagenet_dataset_loader import ImageNetDatasetLoader
+
+    size, crop = dispatch('ImageNet dataset', _imagenet_datasets, name)
+    return ImageNetDatasetLoader(
+        name,
+        MLTask.classification,
+        size,
+        crop,
+        streaming,
+        uint8_images,
+    )
+
+
+def _make_tensorflow_loader(name: str) -> DatasetLoader:
+    from dmp.dataset.tf_image_classification_dataset_loader import TFImageClassificationDatasetLoader
+    return TFImageClassificationDatasetLoader(name)
+
+
+def _make_synthetic_gaussian_classification_loader() -> DatasetLoader:
+    from dmp.dataset.gaussian_classification_dataset import GaussianClassificationDataset
+    return GaussianClassificationDataset(2, 10, 1.0, 10000)
+
+
+def _make_synthetic_gaussian_regression_loader() -> DatasetLoader:
+    from dmp.dataset.gaussian_regression_dataset import GaussianRegressionDataset
+    return GaussianRegressionDataset(20, 1.0, 1000)
+
+
+_synthetic_datasets: Dict[str, Callable[[], DatasetLoader]] = {
+    'GaussianClassificationDataset_2_10_100':
+    _make_synthetic_gaussian_classification_loader,
+    'GaussianRegressionDataset_20_100':
+    _make_synthetic_gaussian_regression_loader,
+}
+
+
+def _make_synthetic_loader(name: str) -> DatasetLoader:
+    return dispatch('synthetic dataset', _synthetic_datasets, name)()
+
 
 __source_loaders = make_dispatcher(
     'dataset source', {
-        'keras': __load_keras_dataset,
-        'tensorflow': TFImageClassificationDatasetLoader,
-        'pmlb': __load_pmlb_dataset,
-        'imagenet': __load_imagenet_dataset,
-        'synthetic':__load_synthetic_dataset,
+        'keras':
+        lambda name: _make_keras_loader(name, False),
+        'keras_uint8':
+        lambda name: _make_keras_loader(name, True),
+        'tensorflow':
+        _make_tensorflow_loader,
+        'pmlb':
+        _make_pmlb_loader,
+        'imagenet':
+        lambda name: _make_imagenet_loader(name, False, False),
+        'imagenet_uint8':
+        lambda name: _make_imagenet_loader(name, False, True),
+        'imagenet_streaming':
+        lambda name: _make_imagenet_loader(name, True, True),
+        'synthetic':
+        _make_synthetic_loader,
     })
 '''
     keras_datasets = ['mnist', 'fashion_mnist', 'cifar10', 'cifar100']
@@ -144,8 +189,7 @@ __source_loaders = make_dispatcher(
         imagenet_16_120
         imagenet_32
         imagenet_32_120
-'''
-
 
-def get_dataset_loader(source: str, name: str):
-    return __source_loaders(source)(name)
+    keras_uint8, imagenet_uint8, imagenet_streaming: same names as keras and
+    imagenet, but images are kept as uint8 and scaled batch by batch
+'''
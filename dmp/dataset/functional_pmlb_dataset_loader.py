@@ -9,21 +9,22 @@ from typing import (
 from dataclasses import dataclass
 from dmp.dataset.ml_task import MLTask
 from dmp.dataset.pmlb_dataset_loader import PMLBDatasetLoader
+from dmp.preprocessing.preprocessor import Preprocessor
 
 
 class FunctionalPMLBDatasetLoader(PMLBDatasetLoader):
-    _prepare_inputs_function: Callable[['FunctionalPMLBDatasetLoader', Any],
-                                       Any]
+    _fit_input_preprocessor_function: Callable[
+        ['FunctionalPMLBDatasetLoader', Any], Optional[Preprocessor]]
 
     def __init__(
         self,
         dataset_name: str,
         ml_task: MLTask,
-        prepare_inputs_function: Callable[['FunctionalPMLBDatasetLoader', Any],
-                                          Any],
+        fit_input_preprocessor_function: Callable[
+            ['FunctionalPMLBDatasetLoader', Any], Optional[Preprocessor]],
     ):
         super().__init__(dataset_name, ml_task)
-        self._prepare_inputs_function = prepare_inputs_function
+        self._fit_input_preprocessor_function = fit_input_preprocessor_function
 
-    def _prepare_inputs(self, data):
-        return self._prepare_inputs_function(self, data)
+    def _fit_input_preprocessor(self, data) -> Optional[Preprocessor]:
+        return self._fit_input_preprocessor_function(self, data)
@@ -2,34 +2,68 @@
 
 
 
+from typing import Iterator, Optional, Tuple
+
 import numpy
+from numpy import ndarray
 from dmp.dataset.dataset import Dataset
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.dataset_loader import DatasetLoader
+from dmp.dataset.gaussian_data import (
+    collect_chunks,
+    default_chunk_size,
+    generate_classification_chunks,
+    make_generator,
+)
 from dmp.dataset.ml_task import MLTask
 
 
 class GaussianClassificationDataset(DatasetLoader):
     
 
-    def __init__(self, num_classes, num_dimensions, scale, num_samples):
+    def __init__(
+        self,
+        num_classes,
+        num_dimensions,
+        scale,
+        num_samples,
+        seed: Optional[int] = None,
+        chunk_size: Optional[int] = default_chunk_size,
+    ):
         super().__init__('synthetic', f'GaussianClassificationDataset_{num_classes}_{num_dimensions}_{int(scale*100)}',MLTask.classification)
         self.num_classes = num_classes
         self.scale = scale
         self.num_dimensions = num_dimensions
         self.num_samples = num_samples
+        self.seed = seed  # None to draw from numpy's global seed
+        self.chunk_size = chunk_size
+
+    def __call__(self) -> Dataset:
+        # synthetic data is generated for each run, so bypass the caches
+        return self._load_and_prepare_dataset()
 
     def _load_dataset(self):
-        classes = numpy.random.normal(0, 1, size=(self.num_classes, self.num_dimensions))
-        x = []
-        y = []
-
-        for i in range(self.num_samples):
-            ci = numpy.random.randint(self.num_classes)
-            y.append(ci)
-            mu = classes[ci]
-            x.append(numpy.random.normal(mu, self.scale, size=(self.num_dimensions)))
-        return Dataset(self.ml_task, DatasetGroup(numpy.vstack(x), numpy.vstack(y)))
+        inputs, labels = collect_chunks(
+            self.generate_chunks(make_generator(self.seed)),
+            self.num_samples,
+        )
+        return Dataset(
+            self.ml_task,
+            DatasetGroup(inputs, labels.reshape(-1, 1)),
+        )
+
+    def generate_chunks(
+        self,
+        rng: numpy.random.Generator,
+    ) -> Iterator[Tuple[ndarray, ndarray]]:
+        centers = rng.normal(0, 1, size=(self.num_classes, self.num_dimensions))
+        return generate_classification_chunks(
+            rng,
+            centers,
+            self.scale,
+            self.num_samples,
+            self.chunk_size,
+        )
 
     def _fetch_from_source(self) -> Dataset:
         return None
@@ -0,0 +1,104 @@
+'''
+Vectorized generators for the synthetic Gaussian datasets.
+
+Samples are drawn in bulk from a numpy.random.Generator, optionally in chunks
+of a fixed number of samples, so that very large datasets can be streamed
+chunk by chunk or written into a preallocated array without holding
+temporaries for the whole dataset.
+'''
+
+from typing import Iterator, Optional, Tuple
+
+import numpy
+from numpy import ndarray
+
+default_chunk_size: int = 1 << 16
+
+
+def make_generator(seed: Optional[int]) -> numpy.random.Generator:
+    '''
+    Returns a Generator seeded with seed, or with a seed drawn from numpy's
+    global random state (which experiments seed) if seed is None.
+    '''
+    if seed is None:
+        seed = numpy.random.randint(2**31)
+    return numpy.random.default_rng(seed)
+
+
+def _iterate_chunk_sizes(
+    num_samples: int,
+    chunk_size: Optional[int],
+) -> Iterator[int]:
+    if num_samples <= 0:
+        yield 0  # an empty chunk still has the shapes of the samples
+        return
+    if chunk_size is None or chunk_size <= 0:
+        chunk_size = num_samples
+    for start in range(0, num_samples, chunk_size):
+        yield min(chunk_size, num_samples - start)
+
+
+def generate_classification_chunks(
+    rng: numpy.random.Generator,
+    centers: ndarray,
+    scale: float,
+    num_samples: int,
+    chunk_size: Optional[int] = default_chunk_size,
+) -> Iterator[Tuple[ndarray, ndarray]]:
+    '''
+    Yields (inputs, labels) chunks. Each sample's label is drawn uniformly
+    from the classes, and its inputs are drawn from an isotropic Gaussian with
+    standard deviation scale around that class's row of centers.
+    '''
+    num_classes, num_dimensions = centers.shape
+    for n in _iterate_chunk_sizes(num_samples, chunk_size):
+        labels = rng.integers(num_classes, size=n)
+        inputs = rng.normal(0.0, scale, size=(n, num_dimensions))
+        inputs += centers[labels]
+        yield inputs, labels
+
+
+def generate_regression_chunks(
+    rng: numpy.random.Generator,
+    direction: ndarray,
+    scale: float,
+    num_samples: int,
+    chunk_size: Optional[int] = default_chunk_size,
+) -> Iterator[Tuple[ndarray, ndarray]]:
+    '''
+    Yields (inputs, outputs) chunks. Each output is drawn uniformly from
+    [-1, 1), and its inputs are output * direction plus Gaussian noise with
+    standard deviation scale.
+    '''
+    num_dimensions = direction.shape[0]
+    for n in _iterate_chunk_sizes(num_samples, chunk_size):
+        outputs = rng.uniform(-1.0, 1.0, size=n)
+        inputs = rng.normal(0.0, scale, size=(n, num_dimensions))
+        inputs += outputs[:, None] * direction[None, :]
+        yield inputs, outputs
+
+
+def collect_chunks(
+    chunks: Iterator[Tuple[ndarray, ndarray]],
+    num_samples: int,
+) -> Tuple[ndarray, ndarray]:
+    '''
+    Copies (inputs, outputs) chunks into preallocated arrays.
+    '''
+    inputs = None
+    outputs = None
+    offset = 0
+    for chunk_inputs, chunk_outputs in chunks:
+        if inputs is None or outputs is None:
+            inputs = numpy.empty((num_samples, *chunk_inputs.shape[1:]),
+                                 dtype=chunk_inputs.dtype)
+            outputs = numpy.empty((num_samples, *chunk_outputs.shape[1:]),
+                                  dtype=chunk_outputs.dtype)
+        n = chunk_inputs.shape[0]
+        inputs[offset:offset + n] = chunk_inputs
+        outputs[offset:offset + n] = chunk_outputs
+        offset += n
+    if inputs is None or outputs is None:
+        # no chunks, so no sample shapes either
+        return numpy.empty((0, )), numpy.empty((0, ))
+    return inputs, outputs
@@ -2,38 +2,63 @@
 
 
 
+from typing import Iterator, Optional, Tuple
+
 import numpy
+from numpy import ndarray
 from dmp.dataset.dataset import Dataset
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.dataset_loader import DatasetLoader
+from dmp.dataset.gaussian_data import (
+    collect_chunks,
+    default_chunk_size,
+    generate_regression_chunks,
+    make_generator,
+)
 from dmp.dataset.ml_task import MLTask
 
 
 class GaussianRegressionDataset(DatasetLoader):
     
 
-    def __init__(self, num_dimensions, scale, num_samples):
+    def __init__(
+        self,
+        num_dimensions,
+        scale,
+        num_samples,
+        seed: Optional[int] = None,
+        chunk_size: Optional[int] = default_chunk_size,
+    ):
         super().__init__('synthetic', f'GaussianRegressionDataset_{num_dimensions}_{int(scale*100)}',MLTask.regression)
         self.scale = scale
         self.num_dimensions = num_dimensions
         self.num_samples = num_samples
+        self.seed = seed  # None to draw from numpy's global seed
+        self.chunk_size = chunk_size
+
+    def __call__(self) -> Dataset:
+        # synthetic data is generated for each run, so bypass the caches
+        return self._load_and_prepare_dataset()
 
     def _load_dataset(self):
-        m = numpy.random.normal(0, 1, size=(self.num_dimensions,))
-        # b = numpy.random.normal(0, 1, size=(self.num_dimensions))
-        y = numpy.random.uniform(-1,1, size=(self.num_samples,))
-        x = []
-        for i in range(self.num_samples):
-            r = m*y[i]
-            print(r.shape, r)
-            x.append(r)
-        
-        x = numpy.vstack(x)
-        x += numpy.random.normal(0, self.scale, size=x.shape)
-
-        print(x.shape, y.shape)
-
-        return Dataset(self.ml_task, DatasetGroup(x,y))
+        x, y = collect_chunks(
+            self.generate_chunks(make_generator(self.seed)),
+            self.num_samples,
+        )
+        return Dataset(self.ml_task, DatasetGroup(x, y))
+
+    def generate_chunks(
+        self,
+        rng: numpy.random.Generator,
+    ) -> Iterator[Tuple[ndarray, ndarray]]:
+        m = rng.normal(0, 1, size=(self.num_dimensions,))
+        return generate_regression_chunks(
+            rng,
+            m,
+            self.scale,
+            self.num_samples,
+            self.chunk_size,
+        )
 
     def _fetch_from_source(self) -> Dataset:
         return None
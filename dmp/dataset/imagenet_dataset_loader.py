@@ -12,8 +12,15 @@ from typing import (
 import numpy
 from dmp.dataset.dataset import Dataset
 from dmp.dataset.dataset_group import DatasetGroup
-from dmp.dataset.dataset_loader import DatasetLoader, dataset_cache_directory
+from dmp.dataset.dataset_cache import get_array_path, write_dataset
+from dmp.dataset.dataset_loader import (
+    DatasetLoader,
+    dataset_cache_directory,
+    raw_dataset_cache,
+)
 from dmp.dataset.ml_task import MLTask
+from dmp.preprocessing.image_scaler import ImageScaler
+from dmp.preprocessing.preprocessor import Preprocessor
 
 
 @dataclass
@@ -22,19 +29,110 @@ class ImageNetDatasetLoader(DatasetLoader):
     size: int
     crop: Optional[int]
 
+    streaming_chunk_size = 8192  # images transposed at a time when streaming
+
     def __init__(
         self,
         dataset_name: str,
         ml_task: MLTask,
         size: int,
         crop: Optional[int],
+        streaming: bool = False,
+        uint8_images: bool = False,
     ):
         super().__init__('imagenet', dataset_name, ml_task)
         self.size = size
         self.crop = crop
 
-    # def _load_dataset(self):
-    #     return self._fetch_from_source() # bypass local caching
+        # In streaming mode, the source batches are converted one at a time
+        # into a memory-mapped uint8 cache entry, and images are scaled batch
+        # by batch as they are fed to training. The cache entry is the same
+        # as in the non-streaming mode.
+        self._streaming: bool = streaming
+        self._preprocess_output_batches = streaming
+        # keep images as uint8 and scale each batch in the input pipeline
+        self._preprocess_input_batches = streaming or uint8_images
+
+    def __call__(self) -> Dataset:
+        if self._streaming:
+            # nothing is transformed ahead of time, so skip the prepared cache
+            return self._load_and_prepare_dataset()
+        return super().__call__()
+
+    def _load_dataset(self):
+        if self._streaming:
+            return raw_dataset_cache.load_entry(
+                self._get_cache_key(),
+                self._write_streamed_entry,
+            )
+        return super()._load_dataset()
+
+    def _get_source_files(self) -> List[str]:
+        batches = 10
+        source_files = []
+        for batch in range(1, batches + 1):
+            source_files.append(
+                os.path.join(
+                    dataset_cache_directory,
+                    f'Imagenet{self.size}_train_npz',
+                    f'train_data_batch_{batch}.npz',
+                ))
+
+        source_files.append(
+            os.path.join(
+                dataset_cache_directory,
+                f'Imagenet{self.size}_val_npz',
+                'val_data.npz',
+            ))
+        return source_files
+
+    def _write_streamed_entry(self, path: str) -> int:
+        source_files = self._get_source_files()
+        print(f' source files : {source_files}')
+
+        # read the labels first to size the preallocated inputs array
+        labels = []
+        for file_path in source_files:
+            with numpy.load(file_path) as file:
+                outputs = file['labels'] - 1  # make labels start at 0
+            if self.crop is not None:
+                outputs = outputs[outputs < self.crop]
+            labels.append(outputs)
+
+        num_images = sum(outputs.shape[0] for outputs in labels)
+        os.makedirs(path, exist_ok=True)
+        inputs = numpy.lib.format.open_memmap(
+            get_array_path(path, 'train', 'inputs'),
+            mode='w+',
+            dtype=numpy.uint8,
+            shape=(num_images, self.size, self.size, 3),
+        )
+
+        # convert each batch from NCHW rows to NHWC images a chunk at a time
+        offset = 0
+        chunk_size = self.streaming_chunk_size
+        for file_path in source_files:
+            with numpy.load(file_path) as file:
+                data = file['data']
+                if self.crop is not None:
+                    data = data[(file['labels'] - 1) < self.crop]
+            for start in range(0, data.shape[0], chunk_size):
+                chunk = data[start:start + chunk_size]
+                n = chunk.shape[0]
+                inputs[offset:offset + n] = numpy.transpose(
+                    chunk.reshape(n, 3, self.size, self.size),
+                    (0, 2, 3, 1),
+                )
+                offset += n
+            del data
+            print(f'converted {file_path}, {offset} / {num_images} images')
+
+        outputs = numpy.concatenate(labels).reshape(num_images, 1).astype(
+            numpy.uint16)
+        return write_dataset(
+            path,
+            Dataset(self.ml_task, DatasetGroup(inputs, outputs)),
+        )
 
     def _fetch_from_source(self) -> Dataset:
 
@@ -54,23 +152,8 @@ class ImageNetDatasetLoader(DatasetLoader):
             outputs = outputs.reshape(n, 1).astype(numpy.uint16)
             return inputs, outputs
 
-        batches = 10
-        source_files = []
+        source_files = self._get_source_files()
         arrays = []
-        for batch in range(1, batches + 1):
-            source_files.append(
-                os.path.join(
-                    dataset_cache_directory,
-                    f'Imagenet{self.size}_train_npz',
-                    f'train_data_batch_{batch}.npz',
-                ))
-
-        source_files.append(
-            os.path.join(
-                dataset_cache_directory,
-                f'Imagenet{self.size}_val_npz',
-                'val_data.npz',
-            ))
 
         print(f' source files : {source_files}')
         for file_path in source_files:
@@ -99,8 +182,8 @@ class ImageNetDatasetLoader(DatasetLoader):
             DatasetGroup(inputs, outputs),
         )
 
-    def _prepare_inputs(self, data):
-        return self._prepare_image(data)
+    def _fit_input_preprocessor(self, data) -> Optional[Preprocessor]:
+        return ImageScaler()
 
     # def _fetch_from_source(self):
     #     # dataset_cache_directory
@@ -12,6 +12,8 @@ from dmp.dataset.dataset import Dataset
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.dataset_loader import DatasetLoader
 from dmp.dataset.ml_task import MLTask
+from dmp.preprocessing.image_scaler import ImageScaler
+from dmp.preprocessing.preprocessor import Preprocessor
 
 
 class KerasImageDatasetLoader(DatasetLoader):
@@ -20,9 +22,12 @@ class KerasImageDatasetLoader(DatasetLoader):
         self,
         dataset_name: str,
         keras_load_data_function: Callable,
+        uint8_images: bool = False,
     ) -> None:
         super().__init__('keras', dataset_name, MLTask.classification)
         self._keras_load_data_function: Callable = keras_load_data_function
+        # keep images as uint8 and scale each batch in the input pipeline
+        self._preprocess_input_batches = uint8_images
 
     def _fetch_from_source(self):
         train, test = self._keras_load_data_function()
@@ -32,5 +37,5 @@ class KerasImageDatasetLoader(DatasetLoader):
             DatasetGroup(*test),
         )
 
-    def _prepare_inputs(self, data):
-        return self._prepare_image(data)
\ No newline at end of file
+    def _fit_input_preprocessor(self, data) -> Optional[Preprocessor]:
+        return ImageScaler()
\ No newline at end of file
@@ -7,6 +7,7 @@ from typing import (
     Any,
 )
 
+from dmp.dataset.dataset import Dataset
 from dmp.dataset.keras_image_dataset_loader import KerasImageDatasetLoader
 
 
@@ -16,8 +17,9 @@ class KerasMNISTDatasetLoader(KerasImageDatasetLoader):
         self,
         dataset_name: str,
         keras_load_data_function: Callable,
+        uint8_images: bool = False,
     ) -> None:
-        super().__init__(dataset_name, keras_load_data_function)
+        super().__init__(dataset_name, keras_load_data_function, uint8_images)
 
     # def __call__(self):
     #     result = super().__call__()
@@ -39,5 +41,11 @@ class KerasMNISTDatasetLoader(KerasImageDatasetLoader):
     #         pyplot.show()
     #     return result
 
-    def _prepare_inputs(self, data):
-        return super()._prepare_inputs(data.reshape(*data.shape, 1))
\ No newline at end of file
+    loader_version = 1
+
+    def _fetch_from_source(self) -> Dataset:
+        data = super()._fetch_from_source()
+        # add a channel dimension to the grayscale images
+        for _, group in data.splits:
+            group.inputs = group.inputs.reshape(*group.inputs.shape, 1)
+        return data
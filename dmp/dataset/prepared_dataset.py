@@ -4,17 +4,33 @@ import sklearn.model_selection
 import sklearn.utils
 import numpy
 from dmp.dataset.dataset import Dataset
+from dmp.dataset.dataset_cache import get_cache_statistics
 
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.ml_task import MLTask
+from dmp.preprocessing.preprocessor import Preprocessor
 from .dataset_spec import DatasetSpec
 
+# defaults for the keys of DatasetSpec.pipeline
+default_pipeline_config: Dict[str, Any] = {
+    'prefetch': True,  # prefetch batches with tf.data.AUTOTUNE
+    'cache': False,  # cache the tensors in memory after the first epoch
+    'shuffle_buffer_size': 0,  # reshuffle training data each epoch if > 0
+    'shuffle_seed': None,  # None uses the global tensorflow seed
+    'drop_remainder': False,  # drop the last partial training batch
+}
+
 
 class PreparedDataset():
 
     def __init__(self, spec: DatasetSpec, batch_size: int) -> None:
         from dmp.dataset.dataset_util import load_dataset
+        initial_cache_statistics = get_cache_statistics()
         dataset: Dataset = load_dataset(spec.source, spec.name)
+        self.cache_statistics: Dict[str, int] = {
+            k: v - initial_cache_statistics.get(k, 0)
+            for k, v in get_cache_statistics().items()
+        }
         split_dataset(spec, dataset)
 
         self.ml_task: MLTask = dataset.ml_task
@@ -24,25 +40,49 @@ class PreparedDataset():
         def get_group_size(group) -> int:
             if group is None or group.inputs is None:
                 return 0
-            return int(group.inputs.shape[0])  # type: ignore
+            return group.size
 
         self.train_size: int = get_group_size(dataset.train)
         self.test_size: int = get_group_size(dataset.test)
         self.validation_size: int = get_group_size(dataset.validation)
 
+        pipeline = None
+        if spec.pipeline is not None:
+            pipeline = default_pipeline_config.copy()
+            pipeline.update(spec.pipeline)
+
+        input_preprocessor = None
+        if dataset.preprocess_input_batches:
+            input_preprocessor = dataset.input_preprocessor
+        output_preprocessor = None
+        if dataset.preprocess_output_batches:
+            output_preprocessor = dataset.output_preprocessor
+
         self.train = make_tensorflow_dataset(
             dataset.train,
             batch_size,
+            pipeline,
+            True,
+            input_preprocessor,
+            output_preprocessor,
         )
         dataset.train = None
         self.test = make_tensorflow_dataset(
             dataset.test,
             batch_size,
+            pipeline,
+            False,
+            input_preprocessor,
+            output_preprocessor,
         )
         dataset.test = None
         self.validation = make_tensorflow_dataset(
             dataset.validation,
             batch_size,
+            pipeline,
+            False,
+            input_preprocessor,
+            output_preprocessor,
         )
         dataset.validation = None
         del dataset
@@ -50,6 +90,11 @@ class PreparedDataset():
 
 def split_dataset(spec: DatasetSpec, dataset: Dataset) -> None:
     method = spec.method
+    if dataset.preprocess_output_batches and spec.label_noise > 0.0:
+        raise NotImplementedError(
+            'Label noise is not supported for datasets preprocessed in batches.'
+        )
+
     if method == 'shuffled_train_test_split':
         # combine all splits and resplit the dataset
 
@@ -74,6 +119,10 @@ def split_dataset(spec: DatasetSpec, dataset: Dataset) -> None:
         make_validation_split(spec, dataset)
         add_label_noise(spec.label_noise, dataset.ml_task, train_outputs)
         dataset.test = DatasetGroup(test_inputs, test_outputs)
+    elif method == 'indexed_shuffled_train_test_split':
+        make_indexed_splits(spec, dataset)
+        add_label_noise(spec.label_noise, dataset.ml_task,
+                        dataset.train.outputs)  # type: ignore
     elif method == 'default':
         set_spec_splits_to_actuals(spec, dataset)
     elif method == 'default_shuffled':
@@ -91,6 +140,46 @@ def split_dataset(spec: DatasetSpec, dataset: Dataset) -> None:
         raise NotImplementedError(f'Unknown test_split_method {method}.')
 
 
+def make_indexed_splits(spec: DatasetSpec, dataset: Dataset) -> None:
+    '''
+    Like shuffled_train_test_split, but the splits share one inputs array
+    and index into it with a single shuffled permutation instead of each
+    holding a copy. Inputs are only copied if the dataset has more than one
+    split to combine. Outputs are gathered for each split.
+    '''
+    splits = dataset.splits
+    if len(splits) == 1:
+        inputs = splits[0][1].inputs
+        outputs = splits[0][1].outputs
+    else:
+        inputs = numpy.concatenate([group.inputs for _, group in splits])
+        outputs = numpy.concatenate([group.outputs for _, group in splits])
+
+    del splits
+    dataset.train = None
+    dataset.test = None
+    dataset.validation = None
+
+    total_size = int(inputs.shape[0])
+    permutation = numpy.random.permutation(total_size)
+    test_size = int(numpy.ceil(spec.test_split * total_size))
+    validation_split = spec.validation_split
+    if validation_split is None or validation_split <= 0.0:
+        spec.validation_split = 0.0
+        validation_split = 0.0
+    validation_size = int(numpy.ceil(validation_split * total_size))
+
+    def make_group(indices: numpy.ndarray) -> Optional[DatasetGroup]:
+        if indices.size == 0:
+            return None
+        return DatasetGroup(inputs, outputs[indices], indices)
+
+    dataset.test = make_group(permutation[:test_size])
+    dataset.validation = make_group(
+        permutation[test_size:test_size + validation_size])
+    dataset.train = make_group(permutation[test_size + validation_size:])
+
+
 def set_spec_splits_to_actuals(spec: DatasetSpec, dataset: Dataset):
     total_size = sum([group.inputs.shape[0] for name, group in dataset.splits])
 
@@ -125,31 +214,187 @@ def make_validation_split(spec: DatasetSpec, dataset: Dataset) -> None:
 def make_tensorflow_dataset(
     group: Optional[DatasetGroup],
     batch_size: int,
+    pipeline: Optional[Dict[str, Any]] = None,
+    is_training_set: bool = False,
+    input_preprocessor: Optional[Preprocessor] = None,
+    output_preprocessor: Optional[Preprocessor] = None,
 ) -> Any:
+    '''
+    Makes a batched tf.data.Dataset of group. With a pipeline config (see
+    default_pipeline_config), also caches, shuffles and prefetches. Shuffling
+    and drop_remainder only apply to the training set so that evaluation
+    always sees every example.
+
+    input_preprocessor and output_preprocessor, if given, are applied to each
+    batch: as a tf.data map if they implement forward_tensor(), otherwise by
+    streaming batches from a generator. Indexed groups are also streamed. A
+    streamed group gathers and preprocesses one batch at a time, so its
+    inputs are never copied whole into memory.
+    '''
     if group is None:
         return None
 
-    datasets = (group.inputs, group.outputs)
-
     import tensorflow
     dataset_options = tensorflow.data.Options()
     dataset_options.experimental_distribute.auto_shard_policy = \
         tensorflow.data.experimental.AutoShardPolicy.DATA
 
-    tf_datasets = tensorflow.data.Dataset.from_tensor_slices(datasets)
+    shuffle_buffer_size = 0
+    shuffle_seed = None
+    drop_remainder = False
+    if pipeline is not None and is_training_set:
+        shuffle_buffer_size = pipeline['shuffle_buffer_size']
+        shuffle_seed = pipeline['shuffle_seed']
+        drop_remainder = pipeline['drop_remainder']
+    shuffle = shuffle_buffer_size > 0
+
+    batch_preprocessors = [
+        p for p in (input_preprocessor, output_preprocessor) if p is not None
+    ]
+    streamed = group.input_indices is not None or \
+        not all(p.has_forward_tensor for p in batch_preprocessors)
+    if streamed:
+        # streamed batches are shuffled over the whole group
+        tf_datasets = _make_streamed_dataset(
+            group,
+            batch_size,
+            shuffle,
+            shuffle_seed,
+            drop_remainder,
+            input_preprocessor,
+            output_preprocessor,
+        )
+        tf_datasets = tf_datasets.with_options(dataset_options)
+        if pipeline is None:
+            return tf_datasets
+        if pipeline['cache'] and not shuffle:
+            tf_datasets = tf_datasets.cache()
+    else:
+        tf_datasets = tensorflow.data.Dataset.from_tensor_slices(
+            (group.inputs, group.outputs))
+        tf_datasets = tf_datasets.with_options(dataset_options)
+        if pipeline is None:
+            return _map_batch_preprocessors(
+                tf_datasets.batch(batch_size),
+                input_preprocessor,
+                output_preprocessor,
+            )
 
-    tf_datasets = tf_datasets.with_options(dataset_options)
-    tf_datasets = tf_datasets.batch(batch_size)
+        if shuffle:
+            # cache the unshuffled examples so each epoch can be reshuffled
+            if pipeline['cache']:
+                tf_datasets = tf_datasets.cache()
+            tf_datasets = tf_datasets.shuffle(
+                min(shuffle_buffer_size, group.size),
+                seed=shuffle_seed,
+                reshuffle_each_iteration=True,
+            )
+        tf_datasets = tf_datasets.batch(
+            batch_size,
+            drop_remainder=drop_remainder,
+            num_parallel_calls=tensorflow.data.AUTOTUNE,
+        )
+        if pipeline['cache'] and not shuffle:
+            tf_datasets = tf_datasets.cache()
+        # preprocess after caching, so the cache holds the smaller raw data
+        tf_datasets = _map_batch_preprocessors(
+            tf_datasets,
+            input_preprocessor,
+            output_preprocessor,
+        )
+
+    if pipeline['prefetch']:
+        tf_datasets = tf_datasets.prefetch(tensorflow.data.AUTOTUNE)
     return tf_datasets
 
 
+def _map_batch_preprocessors(
+    tf_datasets: Any,
+    input_preprocessor: Optional[Preprocessor],
+    output_preprocessor: Optional[Preprocessor],
+) -> Any:
+    if input_preprocessor is None and output_preprocessor is None:
+        return tf_datasets
+
+    import tensorflow
+
+    def preprocess_batch(inputs, outputs):
+        if input_preprocessor is not None:
+            inputs = input_preprocessor.forward_tensor(inputs)
+        if output_preprocessor is not None:
+            outputs = output_preprocessor.forward_tensor(outputs)
+        return inputs, outputs
+
+    return tf_datasets.map(
+        preprocess_batch,
+        num_parallel_calls=tensorflow.data.AUTOTUNE,
+    )
+
+
+def _make_streamed_dataset(
+    group: DatasetGroup,
+    batch_size: int,
+    shuffle: bool,
+    shuffle_seed: Optional[int],
+    drop_remainder: bool,
+    input_preprocessor: Optional[Preprocessor],
+    output_preprocessor: Optional[Preprocessor],
+) -> Any:
+    import tensorflow
+
+    inputs = group.inputs
+    outputs = group.outputs
+    input_indices = group.input_indices
+    size = group.size
+    rng = None
+    if shuffle:
+        if shuffle_seed is None:
+            # draw from the global numpy seed
+            shuffle_seed = numpy.random.randint(2**31)
+        rng = numpy.random.default_rng(shuffle_seed)
+
+    def get_batch(positions: numpy.ndarray) -> Tuple[Any, Any]:
+        rows = positions if input_indices is None else input_indices[positions]
+        # read rows in order for locality (inputs may be memory mapped)
+        order = numpy.argsort(rows, kind='stable')
+        batch_inputs = numpy.empty((rows.size, *inputs.shape[1:]),
+                                   dtype=inputs.dtype)
+        batch_inputs[order] = inputs[rows[order]]
+        batch_outputs = outputs[positions]
+        if input_preprocessor is not None:
+            batch_inputs = input_preprocessor.forward(batch_inputs)
+        if output_preprocessor is not None:
+            batch_outputs = output_preprocessor.forward(batch_outputs)
+        return batch_inputs, batch_outputs
+
+    def generate_batches():
+        positions = numpy.arange(size) if rng is None else rng.permutation(size)
+        end = size - (size % batch_size) if drop_remainder else size
+        for start in range(0, end, batch_size):
+            yield get_batch(positions[start:start + batch_size])
+
+    example = get_batch(numpy.arange(min(1, size)))
+    return tensorflow.data.Dataset.from_generator(
+        generate_batches,
+        output_signature=tuple(
+            tensorflow.TensorSpec(
+                shape=(None, *value.shape[1:]),
+                dtype=tensorflow.as_dtype(value.dtype),
+            ) for value in example),
+    )
+
+
 def add_label_noise(label_noise: float, ml_task: MLTask, train_outputs: Any):
+    '''
+    Perturbs the labels of a label_noise fraction of train_outputs in place,
+    using numpy's global random state. Classification labels are moved to a
+    different class uniformly at random, and regression outputs get Gaussian
+    noise with label_noise times each output's standard deviation.
+    '''
     if label_noise <= 0.0:
         return
 
     train_size = len(train_outputs)
-    # print(f'run_task {run_task} output shape {outputs.shape}')
-    # print(f'sample\n{outputs_train[0:20, :]}')
     if ml_task == MLTask.classification:
         num_to_perturb = int(train_size * label_noise)
         noisy_labels_idx = numpy.random.choice(train_size,
@@ -162,21 +407,36 @@ def add_label_noise(label_noise: float, ml_task: MLTask, train_outputs: Any):
             train_outputs[noisy_labels_idx] ^= 1
         else:
             # one-hot response variable...
-            rolls = numpy.random.choice(
-                numpy.arange(num_outputs - 1) + 1, noisy_labels_idx.size)
-            for i, idx in enumerate(noisy_labels_idx):
-                train_outputs[noisy_labels_idx] = numpy.roll(
-                    train_outputs[noisy_labels_idx], rolls[i])
-            # noisy_labels_new_idx = numpy.random.choice(train_size, size=num_to_perturb, replace=True)
-            # outputs_train[noisy_labels_idx] = outputs_train[noisy_labels_new_idx]
+            add_one_hot_label_noise(train_outputs, noisy_labels_idx)
     elif ml_task == MLTask.regression:
-        # mean = numpy.mean(outputs, axis=0)
         std_dev = numpy.std(train_outputs, axis=0)
-        # print(f'std_dev {std_dev}')
         noise_std = std_dev * label_noise
-        for i in range(train_outputs.shape[1]):
-            train_outputs[:, i] += numpy.random.normal(
-                loc=0, scale=noise_std[i], size=train_outputs[:, i].shape)
+        # draw one output column after another, in the order the random state
+        # was always consumed
+        noise = numpy.random.normal(
+            loc=0,
+            scale=numpy.reshape(noise_std, (-1, 1)),
+            size=(noise_std.size, train_size),
+        )
+        train_outputs += noise.T.reshape(train_outputs.shape)
     else:
         raise ValueError(
             f'Do not know how to add label noise to dataset task {ml_task}.')
+
+
+def add_one_hot_label_noise(
+    outputs: numpy.ndarray,
+    indices: numpy.ndarray,
+) -> None:
+    '''
+    Moves each one-hot row of outputs at indices to a different class, offset
+    from its current class by a uniformly random 1 to (classes - 1),
+    in place.
+    '''
+    num_classes = outputs.shape[1]
+    rows = outputs[indices]
+    offsets = numpy.random.randint(1, num_classes, size=indices.size)
+    classes = (numpy.argmax(rows, axis=1) + offsets) % num_classes
+    rows[:] = 0
+    rows[numpy.arange(indices.size), classes] = 1
+    outputs[indices] = rows
@@ -12,12 +12,14 @@ from dmp.dataset.dataset import Dataset
 from dmp.dataset.dataset_group import DatasetGroup
 from dmp.dataset.dataset_loader import DatasetLoader
 from dmp.dataset.ml_task import MLTask
+from dmp.preprocessing.image_scaler import ImageScaler
+from dmp.preprocessing.preprocessor import Preprocessor
 
 
 class TFImageClassificationDatasetLoader(DatasetLoader):
 
     def __init__(self, dataset_name: str) -> None:
-        super().__init__(dataset_name, MLTask.classification)
+        super().__init__('tensorflow', dataset_name, MLTask.classification)
 
     def _fetch_from_source(self) -> Dataset:
         import tensorflow_datasets
@@ -46,5 +48,5 @@ class TFImageClassificationDatasetLoader(DatasetLoader):
         del datasets
         return Dataset(self.ml_task, *results)
 
-    def _prepare_inputs(self, data):
-        return self._prepare_image(data)
+    def _fit_input_preprocessor(self, data) -> Optional[Preprocessor]:
+        return ImageScaler()
@@ -2,6 +2,8 @@ import math
 import platform
 import re
 import select
+import shutil
+import signal
 import sys
 import subprocess
 import os
@@ -9,6 +11,47 @@ from typing import IO, Any, Dict, List, Tuple
 from dataclasses import dataclass
 from numpy import append
 
+from dmp.common import shared_dataset_directory_variable
+
+shared_memory_directory = '/dev/shm'
+shared_dataset_directory_prefix = 'dmp_datasets_'
+
+
+def is_process_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # another user's process
+    return True
+
+
+def remove_stale_shared_dataset_directories() -> None:
+    '''
+    Removes the shared dataset directories of node managers that are no
+    longer running, such as those killed before they could clean up.
+    '''
+    pattern = re.compile(re.escape(shared_dataset_directory_prefix) +
+                         r'(\d+)$')
+    for name in os.listdir(shared_memory_directory):
+        match = pattern.match(name)
+        if match is None:
+            continue
+        pid = int(match.group(1))
+        if pid == os.getpid() or is_process_running(pid):
+            continue
+        print(f'Removing stale shared dataset directory {name}.')
+        shutil.rmtree(
+            os.path.join(shared_memory_directory, name),
+            ignore_errors=True,
+        )
+
+
+def raise_on_sigterm(signum, frame) -> None:
+    # unwind through the finally blocks, which clean up the workers
+    sys.exit(128 + signum)
+
 
 def get_run_script(default_script, custom_script):
     if os.path.exists(custom_script):
@@ -254,54 +297,77 @@ def main():
     worker_configs.extend((WorkerConfig(cpu_run_script, cpu_group, [], 0)
                            for cpu_group in cpu_groups))
 
-    # start workers
-    workers = [
-        run_worker(
-            i,
-            project,
-            queue,
-            config,
-        ) for i, config in enumerate(worker_configs)
-    ]
+    # share prepared datasets between this node's workers through a
+    # node-local tmpfs directory, removed when the workers exit
+    shared_dataset_directory = None
+    if os.path.isdir(shared_memory_directory):
+        remove_stale_shared_dataset_directories()
+        shared_dataset_directory = os.path.join(
+            shared_memory_directory,
+            f'{shared_dataset_directory_prefix}{os.getpid()}',
+        )
+        os.environ[shared_dataset_directory_variable] = \
+            shared_dataset_directory
+        print(f'Sharing datasets in {shared_dataset_directory}.')
 
-    streams: List[IO[str]] = [
-        w for w in [w.stdout for w in workers] if w is not None
-    ]
-    stream_name_map = {id(s): f'{i}:' for i, s in enumerate(streams)}
-
-    def output(stream, line):
-        if len(line) == 0:
-            return
-        name = stream_name_map[id(stream)]
-        if not isinstance(line, str):
-            line = line.decode("utf-8")
-        line = name + line
-        sys.stdout.write(line)
-        sys.stdout.flush()
-
-    print('Starting output redirection...')
-    while True:
-        rstreams, _, _ = select.select(streams, [], [], 30)
-        exit = False
-        for stream in rstreams:
-            line = stream.readline()
-            if len(line) == 0:
-                exit = True
-            output(stream, line)
-        if (len(rstreams) == 0 or exit) and all(w.poll() is not None
-                                                for w in workers):
-            break
+    # a scheduler kill (e.g. at a SLURM time limit) sends SIGTERM
+    signal.signal(signal.SIGTERM, raise_on_sigterm)
+    workers: List[subprocess.Popen] = []
+    try:
+        # start workers, keeping each so it is cleaned up if a later one fails
+        for i, config in enumerate(worker_configs):
+            workers.append(run_worker(
+                i,
+                project,
+                queue,
+                config,
+            ))
+
+        streams: List[IO[str]] = [
+            w for w in [w.stdout for w in workers] if w is not None
+        ]
+        stream_name_map = {id(s): f'{i}:' for i, s in enumerate(streams)}
 
-    for stream in streams:
-        while True:
-            line = stream.readline()
+        def output(stream, line):
             if len(line) == 0:
+                return
+            name = stream_name_map[id(stream)]
+            if not isinstance(line, str):
+                line = line.decode("utf-8")
+            line = name + line
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+        print('Starting output redirection...')
+        while True:
+            rstreams, _, _ = select.select(streams, [], [], 30)
+            exit = False
+            for stream in rstreams:
+                line = stream.readline()
+                if len(line) == 0:
+                    exit = True
+                output(stream, line)
+            if (len(rstreams) == 0 or exit) and all(w.poll() is not None
+                                                    for w in workers):
                 break
-            output(stream, line)
 
-    print(f'Waiting for worker processes to exit...')
-    for worker in workers:
-        worker.wait()
+        for stream in streams:
+            while True:
+                line = stream.readline()
+                if len(line) == 0:
+                    break
+                output(stream, line)
+
+        print(f'Waiting for worker processes to exit...')
+        for worker in workers:
+            worker.wait()
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait()
+        if shared_dataset_directory is not None:
+            shutil.rmtree(shared_dataset_directory, ignore_errors=True)
     print('Exiting Worker Manager...')
 
 
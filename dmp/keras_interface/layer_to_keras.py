@@ -27,17 +27,13 @@ class LayerToKerasVisitor:
 
     def _make_keras_network(self, target: Layer) -> KerasLayerInfo:
         keras_map = self._info.layer_to_keras_map
-        if target in keras_map:
-            return keras_map[target]
-
-        result = self._visit(
-            target,
-            target.config,
-            [self._make_keras_network(i).output_tensor for i in target.inputs],
-        )
-
-        keras_map[target] = result
-        return result
+        for layer in target.topological_order:
+            keras_map[layer] = self._visit(
+                layer,
+                layer.config,
+                [keras_map[i].output_tensor for i in layer.inputs],
+            )
+        return keras_map[target]
 
     @singledispatchmethod
     def _visit(
@@ -211,11 +207,15 @@ def make_keras_network_from_layer(target: Layer) -> KerasNetworkInfo:
     return LayerToKerasVisitor(target)()
 
 
-def make_keras_model_from_network(network: NetworkInfo) -> ModelInfo:
+def make_keras_model_from_network(
+    network: NetworkInfo,
+    name: Optional[str] = None,
+) -> ModelInfo:
     keras_network = make_keras_network_from_layer(network.structure)
     keras_model = keras.Model(
         inputs=keras_network.inputs,
         outputs=keras_network.outputs,
+        name=name,
     )
     if len(keras_model.inputs) != 1:  # type: ignore
         raise ValueError('Wrong number of keras inputs generated.')
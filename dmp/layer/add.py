@@ -3,6 +3,7 @@ from dmp.layer.element_wise_operator_layer import ElementWiseOperatorLayer
 from dmp.layer.layer import Layer
 
 class Add(ElementWiseOperatorLayer):
+    __slots__ = ()
 
     @staticmethod
     def make(input: List[Layer]) -> 'Add':
@@ -5,6 +5,7 @@ from dmp.layer.spatitial_layer import SpatitialLayer
 
 
 class AvgPool(PoolingLayer):
+    __slots__ = ()
 
     @staticmethod
     def make(
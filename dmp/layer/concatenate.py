@@ -1,5 +1,5 @@
 from dmp.layer.layer import Layer
 
 class Concatenate(Layer):
-    pass
+    __slots__ = ()
 
@@ -8,6 +8,7 @@ T = TypeVar('T')
 
 
 class ConvolutionalLayer(SpatitialLayer, ABC):
+    __slots__ = ()
 
     _default_config = {
         'strides': (1, 1),
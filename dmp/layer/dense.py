@@ -4,6 +4,7 @@ from dmp.layer.layer import Layer, LayerConfig, empty_config, empty_inputs
 
 
 class Dense(Layer):
+    __slots__ = ()
 
     _default_config: LayerConfig = {
         'activation': 'relu',
@@ -3,6 +3,7 @@ from dmp.layer.convolutional_layer import ConvolutionalLayer
 from dmp.layer.layer import Layer, empty_config, empty_inputs, LayerConfig
 
 class DenseConv(ConvolutionalLayer):
+    __slots__ = ()
 
     @staticmethod
     def make(
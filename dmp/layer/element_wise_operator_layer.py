@@ -2,4 +2,4 @@ from abc import ABC
 from dmp.layer.layer import Layer
 
 class ElementWiseOperatorLayer(Layer, ABC):
-    pass
+    __slots__ = ()
@@ -4,5 +4,5 @@ from dmp.layer.element_wise_operator_layer import ElementWiseOperatorLayer
 
 
 class Flatten(ElementWiseOperatorLayer):
-    pass
+    __slots__ = ()
 
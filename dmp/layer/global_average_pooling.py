@@ -1,4 +1,4 @@
 from dmp.layer.global_pooling_layer import GlobalPoolingLayer
 
 class GlobalAveragePooling(GlobalPoolingLayer):
-    pass
+    __slots__ = ()
@@ -2,6 +2,6 @@ from dmp.layer.global_average_pooling import GlobalPoolingLayer
 
 
 class GlobalMaxPooling(GlobalPoolingLayer):
-    pass
+    __slots__ = ()
 
 
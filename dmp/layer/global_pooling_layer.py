@@ -3,4 +3,4 @@ from dmp.layer.spatitial_layer import SpatitialLayer
 
 
 class GlobalPoolingLayer(SpatitialLayer, ABC):
-    pass
+    __slots__ = ()
@@ -4,7 +4,7 @@ from dmp.layer.element_wise_operator_layer import ElementWiseOperatorLayer
 
 
 class Identity(ElementWiseOperatorLayer):
-    pass
+    __slots__ = ()
 
     # def make_layer(
     #     self,
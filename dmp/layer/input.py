@@ -1,6 +1,8 @@
 from dmp.layer.layer import Layer
 
 class Input(Layer):
+    __slots__ = ()
+
     def marshal(self) -> dict:
         result = self.config.copy()
         shape = result.get('shape', None)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Type, TypeVar, Union, Callable
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Type, TypeVar, Union, Callable
 from lmarshal.src.custom_marshalable import CustomMarshalable
 
 LayerConfig = Dict[str, Any]
@@ -12,6 +12,17 @@ empty_config: Dict[str, Any] = {}
 empty_inputs: List = []
 unitialized_parameter_count: int = -1
 
+# incremented whenever the inputs of any Layer are assigned, which
+# invalidates every cached topological order
+_graph_version: int = 0
+
+# Layer configs are interned: Layers with equal configs share one dict, which
+# is never modified. Changing a Layer's config replaces its dict.
+_interned_configs: Dict[Tuple, LayerConfig] = {}
+# id of each interned config -> (config, key)
+_interned_config_keys: Dict[int, Tuple[LayerConfig, Tuple]] = {}
+_max_interned_configs: int = 1 << 16
+
 T = TypeVar('T')
 
 # layer_types: List[Type] = []
@@ -23,7 +34,77 @@ T = TypeVar('T')
 #     # layer_types.append(type)
 
 
+def intern_config(
+    config: LayerConfig,
+    key: Optional[Tuple] = None,
+) -> LayerConfig:
+    '''
+    Returns the shared dict equal to config, interning config if it is the
+    first. The caller must not modify config afterwards. Configs with
+    unhashable values are not interned and are returned as is.
+    '''
+    if _is_interned(config):
+        return config
+
+    if key is None:
+        key = _freeze_config(config)
+    try:
+        interned = _interned_configs.get(key, None)
+    except TypeError:  # unhashable value
+        return config
+
+    if interned is None:
+        if len(_interned_configs) >= _max_interned_configs:
+            _interned_configs.clear()
+            _interned_config_keys.clear()
+        _interned_configs[key] = config
+        _interned_config_keys[id(config)] = (config, key)
+        interned = config
+    return interned
+
+
+def _is_interned(config: Mapping[str, Any]) -> bool:
+    entry = _interned_config_keys.get(id(config), None)
+    return entry is not None and entry[0] is config
+
+
+def _update_config(
+    config: Mapping[str, Any],
+    overrides: Mapping[str, Any],
+) -> LayerConfig:
+    # copy on write, reusing the key of an interned config
+    updated = dict(config)
+    updated.update(overrides)
+
+    key = None
+    entry = _interned_config_keys.get(id(config), None)
+    if entry is not None and entry[0] is config:
+        frozen = dict(entry[1])
+        for k, v in overrides.items():
+            frozen[k] = _freeze_config_value(v)
+        key = tuple(frozen.items())
+    return intern_config(updated, key)
+
+
+def _freeze_config(config: Mapping[str, Any]) -> Tuple:
+    return tuple([(k, _freeze_config_value(v)) for k, v in config.items()])
+
+
+def _freeze_config_value(value: Any) -> Any:
+    # a hashable key that is equal for equal configs, including key order and
+    # the types of values (so 1, 1.0 and True and lists and tuples differ)
+    value_type = type(value)
+    if value_type is str or value is None:
+        return value  # only equal to values of the same type
+    if value_type is dict:
+        return (dict, _freeze_config(value))
+    if value_type is list or value_type is tuple:
+        return (value_type, tuple([_freeze_config_value(v) for v in value]))
+    return (value_type, value)
+
+
 class LayerFactory(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def make_layer(
@@ -35,23 +116,31 @@ class LayerFactory(ABC):
 
 
 class Layer(LayerFactory, CustomMarshalable, ABC):
+    __slots__ = (
+        '_config',
+        '_inputs',
+        '_topological_order',
+        'computed_shape',
+        'free_parameters',
+    )
 
     def __init__(
         self,
-        config: LayerConfig = empty_config,
+        config: Mapping[str, Any] = empty_config,
         input: Union['Layer', List['Layer']] = empty_inputs,
-        overrides: LayerConfig = empty_config,
+        overrides: Mapping[str, Any] = empty_config,
     ) -> None:
         if not isinstance(input, List):
             input = [input]
         else:
             input = input.copy()  # defensive copy
 
-        config = config.copy()  # defensive copy
-        config.update(overrides)
-
-        self.config: LayerConfig = config
-        self.inputs: List['Layer'] = input
+        if len(overrides) > 0 or not _is_interned(config):
+            config = _update_config(config, overrides)  # defensive copy
+        self._config: LayerConfig = config  # type: ignore
+        self._topological_order: Optional[Tuple[int, Tuple['Layer', ...]]] = None
+        # a new Layer isn't an input of any graph yet, so no order is stale
+        self._inputs: List['Layer'] = input
         self.computed_shape: Tuple[
             int, ...] = uninitialized_shape  # must be computed in context
         self.free_parameters: int = unitialized_parameter_count  # must be computed in context
@@ -63,29 +152,40 @@ class Layer(LayerFactory, CustomMarshalable, ABC):
         return id(self) == id(other)
 
     def __copy__(self) -> 'Layer':
-        return self.__class__(self.config, self.inputs)
+        return self.__class__(self._config, self.inputs)
+
+    @property
+    def config(self) -> LayerConfig:
+        '''
+        This Layer's config. It may be shared with other Layers, so it must
+        not be modified in place; use update() or layer[key] = value instead.
+        '''
+        return self._config
+
+    @config.setter
+    def config(self, config: Mapping[str, Any]) -> None:
+        self._config = intern_config(dict(config))
 
     def __setitem__(self, key, value):
-        self.config[key] = value
+        self.update({key: value})
 
     def __getitem__(self, key):
-        return self.config[key]
+        return self._config[key]
 
     def __contains__(self, key) -> bool:
-        return self.config.__contains__(key)
+        return self._config.__contains__(key)
 
-    def update_if_exists(self, overrides: LayerConfig) -> None:
-        for k, v in overrides.items():
-            if k in self.config:
-                self.config[k] = v
+    def update_if_exists(self, overrides: Mapping[str, Any]) -> None:
+        config = self._config
+        self.update({k: v for k, v in overrides.items() if k in config})
 
-    def insert_if_not_exists(self, to_insert: LayerConfig) -> None:
-        for k, v in to_insert.items():
-            if k not in self.config:
-                self.config[k] = v
+    def insert_if_not_exists(self, to_insert: Mapping[str, Any]) -> None:
+        config = self._config
+        self.update({k: v for k, v in to_insert.items() if k not in config})
 
-    def update(self, overrides: LayerConfig) -> None:
-        self.config.update(overrides)
+    def update(self, overrides: Mapping[str, Any]) -> None:
+        if len(overrides) > 0:
+            self._config = _update_config(self._config, overrides)
 
     def make_layer(
         self,
@@ -99,44 +199,63 @@ class Layer(LayerFactory, CustomMarshalable, ABC):
                 for input in self.inputs
             ]
 
-        result = self.__class__(self.config, layer_inputs)
+        result = self.__class__(self._config, layer_inputs)
         result.update_if_exists(override_if_exists)
         return result
 
+    @property
+    def inputs(self) -> List['Layer']:
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, inputs: List['Layer']) -> None:
+        # Assign a new list to change a Layer's inputs; modifying the list in
+        # place won't invalidate cached topological orders.
+        global _graph_version
+        _graph_version += 1
+        self._inputs: List['Layer'] = inputs
+
     @property
     def input(self) -> 'Layer':
         return self.inputs[0]
 
     @property
-    def all_descendants(self) -> Iterator['Layer']:
+    def topological_order(self) -> Tuple['Layer', ...]:
         '''
-        An iterator over all layers in the graph without duplicates.
+        All layers in the graph without duplicates, each after all of its
+        inputs and ending with this layer. Inputs are visited in order, so
+        this is the order in which a depth-first traversal finishes each
+        layer. The order is cached until the inputs of any Layer change.
         '''
+        cached = self._topological_order
+        if cached is not None and cached[0] == _graph_version:
+            return cached[1]
 
-        visited: Set['Layer'] = set()
+        order = _compute_topological_order(self)
+        self._topological_order = (_graph_version, order)
+        return order
 
-        def visit(current: 'Layer') -> Iterator['Layer']:
-            if current not in visited:
-                visited.add(current)
-                yield current
-                for i in current.inputs:
-                    yield from visit(i)
-
-        yield from visit(self)
+    @property
+    def all_descendants(self) -> Iterator['Layer']:
+        '''
+        An iterator over all layers in the graph without duplicates, starting
+        with this layer.
+        '''
+        return reversed(self.topological_order)
 
     @property
     def use_bias(self) -> bool:
-        return self.config.get('use_bias', True)
+        return self._config.get('use_bias', True)
 
     @property
     def dimension(self) -> int:
         return len(self.computed_shape) - 1
 
     def get(self, key, default):
-        return self.config.get(key, default)
+        return self._config.get(key, default)
 
     def marshal(self) -> dict:
-        flat = self.config.copy()
+        flat = self._config.copy()
 
         def safe_set(key, value):
             if key in flat:
@@ -152,13 +271,33 @@ class Layer(LayerFactory, CustomMarshalable, ABC):
         return flat
 
     def demarshal(self, flat: dict) -> None:
-        self.config = flat
+        self._topological_order = None
         self.inputs = flat.pop(marshaled_inputs_key, [])
         computed_shape = flat.pop(marshaled_computed_shape_key, None)
         self.computed_shape = uninitialized_shape if computed_shape is None \
             else tuple(computed_shape)
         self.free_parameters = flat.pop(marshaled_free_parameters_key,
                                         unitialized_parameter_count)
+        self._config = intern_config(flat)
+
+
+def _compute_topological_order(root: Layer) -> Tuple[Layer, ...]:
+    # iterative depth-first traversal, so deep graphs can't exceed the
+    # recursion limit
+    order: List[Layer] = []
+    visited: Set[Layer] = {root}
+    stack: List[Tuple[Layer, Iterator[Layer]]] = [(root, iter(root.inputs))]
+    while len(stack) > 0:
+        layer, inputs = stack[-1]
+        for input in inputs:
+            if input not in visited:
+                visited.add(input)
+                stack.append((input, iter(input.inputs)))
+                break
+        else:
+            stack.pop()
+            order.append(layer)
+    return tuple(order)
 
 
 LayerConstructor = Callable[
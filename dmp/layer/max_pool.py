@@ -2,6 +2,7 @@ from typing import Callable, Dict, Optional, Tuple, Any, List, Sequence, TypeVar
 from dmp.layer.pooling_layer import PoolingLayer
 
 class MaxPool(PoolingLayer):
+    __slots__ = ()
 
     @staticmethod
     def make(
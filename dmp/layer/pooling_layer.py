@@ -7,6 +7,7 @@ T = TypeVar('T')
 
 
 class PoolingLayer(SpatitialLayer, ABC):
+    __slots__ = ()
 
     @property
     def strides(self) -> Tuple:
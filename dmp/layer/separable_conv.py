@@ -4,6 +4,7 @@ from dmp.layer.layer import LayerConfig, Layer, empty_config, empty_inputs
 
 
 class SeparableConv(ConvolutionalLayer):
+    __slots__ = ()
 
     @staticmethod
     def make(
@@ -6,6 +6,7 @@ T = TypeVar('T')
 
 
 class SpatitialLayer(Layer, ABC):
+    __slots__ = ()
 
     _default_config = {
         'padding': 'valid',
@@ -13,21 +13,14 @@ _invalid_shape = tuple()
 class ComputeLayerShapesVisitor:
 
     def __init__(self, target: Layer) -> None:
-        self._visited: Set[Layer] = set()
-        self._compute_output_shape(target)
-
-    def _compute_output_shape(self, target: Layer) -> Optional[Tuple]:
-        if target in self._visited:
-            return
-
-        target.computed_shape = _invalid_shape
-        self._visited.add(target)
-        for i in target.inputs:
-            self._compute_output_shape(i)
-        target.computed_shape = self._visit(target, target.config)
+        order = target.topological_order
+        for layer in order:
+            layer.computed_shape = _invalid_shape
+        # each layer's inputs are computed before it
+        for layer in order:
+            layer.computed_shape = self._visit(layer, layer.config)
 
     def _get_output_shape(self, target: Layer) -> Tuple:
-        self._compute_output_shape(target)
         shape = target.computed_shape
         if shape is _invalid_shape:
             raise ValueError(f'Can not determine shape of Layer {target}.')
@@ -1,6 +1,6 @@
 from dmp.layer.element_wise_operator_layer import ElementWiseOperatorLayer
 
 class Zeroize(ElementWiseOperatorLayer):
-    pass
+    __slots__ = ()
 
 
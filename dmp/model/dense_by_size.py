@@ -1,12 +1,14 @@
 from dataclasses import dataclass
+import functools
 import math
-from typing import Any, Callable, List, Tuple, Dict
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Dict
 from dmp.common import make_dispatcher
 from dmp.layer.flatten import Flatten
 from dmp.model.fully_connected_network import FullyConnectedNetwork
+from dmp.model.dense_by_size_table import DenseBySizeEntry, get_dense_by_size_table
 from dmp.model.model_spec import ModelSpec
 from dmp.model.network_info import NetworkInfo
-from dmp.model.model_util import find_closest_network_to_target_size_float, find_closest_network_to_target_size_int
+from dmp.model.model_util import find_closest_network_to_target_size_float, find_closest_network_to_target_size_int, find_closest_to_target_size_float, find_closest_to_target_size_int
 from dmp.layer import *
 
 
@@ -37,83 +39,212 @@ class DenseBySize(ModelSpec):
     #     return self.output['units']
 
     def make_network(self) -> NetworkInfo:
-        shape = self.shape
         if isinstance(self.input, Input) and len(self.input['shape']) > 1:
             self.input = Flatten({}, [self.input])
 
-        #TODO: make it so we don't need this hack?
-        residual_mode = 'none'
-        residual_suffix = '_residual'
-        if shape.endswith(residual_suffix):
-            residual_mode = 'full'
-            shape = shape[0:-len(residual_suffix)]
-
+        shape, residual_mode = split_residual_shape(self.shape)
         widths_factory = _get_widths_factory(shape)
 
         if type(self.output) is not Dense:
             raise NotImplementedError('Invalid output type for model.')
 
         num_outputs = self.output['units']
+        depth = self.depth
 
-        def make_network_with_scale(scale):
-            widths = widths_factory(self, num_outputs, scale)
-
+        def make_network_with_widths(widths):
             return FullyConnectedNetwork(
                 self.input,  # type: ignore
                 self.output,  # type: ignore
-                widths,
+                list(widths),
                 residual_mode,
                 False,
                 self.inner).make_network()
 
-        search_func = find_closest_network_to_target_size_int
-        if self.search_method == 'integer':
-            search_func = find_closest_network_to_target_size_int
-        elif self.search_method == 'float':
-            search_func = find_closest_network_to_target_size_float
+        input_size = self._get_input_size()
+        if input_size is not None and _is_simple_dense(self.inner) and \
+            _is_simple_dense(self.output):
+            # Count parameters from the widths alone and only build the
+            # network for the chosen widths.
+            widths, _ = find_dense_widths_by_size(
+                shape,
+                depth,
+                input_size,
+                num_outputs,
+                self.size,
+                self.search_method,
+                self.inner.use_bias,
+                self.output.use_bias,  # type: ignore
+            )
+            network = make_network_with_widths(widths)
         else:
-            raise NotImplementedError(
-                f'Unknown search method {self.search_method}.')
-
-        delta, network = search_func(self.size, make_network_with_scale)
-
-        # reject non-conformant network sizes
-        delta = network.num_free_parameters - self.size
-        relative_error = delta / self.size
-        if abs(relative_error) >= .5:
-            raise ValueError(
-                f'Could not find conformant network error : {100 * relative_error}%, delta : {delta}, size: {self.size}, actual: {network.num_free_parameters}.'
+            search_func = _get_network_search_function(self.search_method)
+            delta, network = search_func(
+                self.size,
+                lambda scale: make_network_with_widths(
+                    widths_factory(depth, num_outputs, scale)),
             )
 
+        check_dense_by_size_conformance(self.size,
+                                        network.num_free_parameters)
         return network
 
+    def _get_input_size(self) -> Optional[int]:
+        input = self.input
+        if type(input) is Flatten and len(input.inputs) == 1:
+            input = input.input
+        if not isinstance(input, Input):
+            return None
+        shape = input.get('shape', None)
+        if shape is None:
+            return None
+        return math.prod(shape)
+
+
+def split_residual_shape(shape: str) -> Tuple[str, str]:
+    '''
+    Splits a DenseBySize shape such as 'rectangle_residual' into its plain
+    shape and FullyConnectedNetwork residual mode.
+    '''
+    #TODO: make it so we don't need this hack?
+    residual_suffix = '_residual'
+    if shape.endswith(residual_suffix):
+        return shape[0:-len(residual_suffix)], 'full'
+    return shape, 'none'
+
+
+def check_dense_by_size_conformance(size: int, num_free_parameters) -> None:
+    '''
+    Rejects networks whose size is too far from the target size.
+    '''
+    delta = num_free_parameters - size
+    relative_error = delta / size
+    if abs(relative_error) >= .5:
+        raise ValueError(
+            f'Could not find conformant network error : {100 * relative_error}%, delta : {delta}, size: {size}, actual: {num_free_parameters}.'
+        )
+
+
+def find_dense_widths_by_size(
+    shape: str,
+    depth: int,
+    input_size: int,
+    num_outputs: int,
+    size: int,
+    search_method: str = 'integer',
+    inner_use_bias: bool = True,
+    output_use_bias: bool = True,
+) -> DenseBySizeEntry:
+    '''
+    Returns the widths DenseBySize would use for a plain Dense network on a
+    flat input of input_size units, and their number of free parameters,
+    without building the network. Widths are looked up in the precomputed
+    table (see dense_by_size_table) before searching. Batch scripts can use
+    this with check_dense_by_size_conformance() to validate experiments
+    before enqueueing them.
+    '''
+    key = (
+        split_residual_shape(shape)[0],
+        depth,
+        input_size,
+        num_outputs,
+        size,
+        search_method,
+        bool(inner_use_bias),
+        bool(output_use_bias),
+    )
+    entry = get_dense_by_size_table().get(key, None)
+    if entry is not None:
+        return entry
+    return _search_widths_by_size(*key)
+
+
+def _is_simple_dense(layer: Any) -> bool:
+    # a Dense layer that FullyConnectedNetwork turns into exactly one layer
+    return type(layer) is Dense and len(layer.inputs) == 0
+
 
-def _get_rectangular_widths(model: DenseBySize, num_outputs: int,
+def count_fully_connected_parameters(
+    input_size: int,
+    widths: Sequence[int],
+    inner_use_bias: bool,
+    output_use_bias: bool,
+) -> int:
+    '''
+    Closed-form number of free parameters of a FullyConnectedNetwork with the
+    given widths on a flat input of input_size units. Residual additions add
+    no parameters.
+    '''
+    num_free_parameters = 0
+    previous_width = input_size
+    for width in widths:
+        num_free_parameters += width * previous_width
+        previous_width = width
+    if inner_use_bias:
+        num_free_parameters += sum(widths[:-1])
+    if output_use_bias:
+        num_free_parameters += widths[-1]
+    return num_free_parameters
+
+
+@functools.lru_cache(maxsize=None)
+def _search_widths_by_size(
+    shape: str,
+    depth: int,
+    input_size: int,
+    num_outputs: int,
+    size: int,
+    search_method: str,
+    inner_use_bias: bool,
+    output_use_bias: bool,
+) -> DenseBySizeEntry:
+    '''
+    Runs the same search as the Layer graph based search, but on
+    count_fully_connected_parameters(), so it finds the same widths.
+    '''
+    widths_factory = _get_widths_factory(shape)
+    search_func = _get_search_function(search_method)
+
+    def count(widths):
+        return count_fully_connected_parameters(
+            input_size,
+            widths,
+            inner_use_bias,
+            output_use_bias,
+        )
+
+    delta, widths = search_func(
+        size,
+        lambda scale: tuple(widths_factory(depth, num_outputs, scale)),
+        count,
+    )
+    return widths, count(widths)
+
+
+def _get_rectangular_widths(depth: int, num_outputs: int,
                             scale: float) -> List[int]:
-    return (([round(scale)] * (model.depth - 1)) + [num_outputs])
+    return (([round(scale)] * (depth - 1)) + [num_outputs])
 
 
-def _get_trapezoidal_widths(model: DenseBySize, num_outputs: int,
+def _get_trapezoidal_widths(depth: int, num_outputs: int,
                             scale: float) -> List[int]:
-    beta = (scale - num_outputs) / (model.depth - 1)
-    return [round(scale - beta * k) for k in range(0, model.depth)]
+    beta = (scale - num_outputs) / (depth - 1)
+    return [round(scale - beta * k) for k in range(0, depth)]
 
 
-def _get_exponential_widths(model: DenseBySize, num_outputs: int,
+def _get_exponential_widths(depth: int, num_outputs: int,
                             scale: float) -> List[int]:
-    beta = math.exp(math.log(num_outputs / scale) / (model.depth - 1))
+    beta = math.exp(math.log(num_outputs / scale) / (depth - 1))
     return [
         max(num_outputs, round(scale * (beta**k)))
-        for k in range(0, model.depth)
+        for k in range(0, depth)
     ]
 
 
 def _make_wide_first(
     first_layer_width_multiplier: float,
-) -> Callable[[DenseBySize, int, float], List[int]]:
+) -> Callable[[int, int, float], List[int]]:
 
-    def make_layout(model: DenseBySize, num_outputs: int, scale: float):
-        depth = model.depth
+    def make_layout(depth: int, num_outputs: int, scale: float):
         layout = []
         if depth > 1:
             layout.append(scale)
@@ -140,3 +271,15 @@ _get_widths_factory = make_dispatcher(
         'wide_first_16x': _make_wide_first(16),
         'wide_first_20x': _make_wide_first(20),
     })
+
+_get_search_function = make_dispatcher(
+    'search_method', {
+        'integer': find_closest_to_target_size_int,
+        'float': find_closest_to_target_size_float,
+    })
+
+_get_network_search_function = make_dispatcher(
+    'search_method', {
+        'integer': find_closest_network_to_target_size_int,
+        'float': find_closest_network_to_target_size_float,
+    })
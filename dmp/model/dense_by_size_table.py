@@ -0,0 +1,125 @@
+'''
+On-disk table of precomputed DenseBySize widths.
+
+Each row maps a width search key (shape, depth, input size, number of
+outputs, target size, search method and the inner and output use_bias
+flags) to the widths that search finds and their number of free parameters.
+Tables are uncompressed .npz files written by
+dmp.util.precompute_dense_by_size_table. If the environment variable named
+by dense_by_size_table_variable points at a table, DenseBySize looks widths
+up there before searching.
+'''
+
+import functools
+import os
+from typing import Dict, Iterable, Tuple, Union
+
+import numpy
+
+from dmp.common import dense_by_size_table_variable
+
+# (shape, depth, input_size, num_outputs, size, search_method,
+#  inner_use_bias, output_use_bias)
+DenseBySizeKey = Tuple[str, int, int, int, int, str, bool, bool]
+Width = Union[int, float]
+DenseBySizeEntry = Tuple[Tuple[Width, ...], Union[int, float]]
+
+_key_columns: Tuple[str, ...] = (
+    'shape',
+    'depth',
+    'input_size',
+    'num_outputs',
+    'size',
+    'search_method',
+    'inner_use_bias',
+    'output_use_bias',
+)
+
+
+def write_dense_by_size_table(
+    path: str,
+    table: Dict[DenseBySizeKey, DenseBySizeEntry],
+) -> None:
+    keys = list(table.keys())
+    entries = [table[key] for key in keys]
+
+    columns = {
+        name: numpy.array([key[i] for key in keys])
+        for i, name in enumerate(_key_columns)
+    }
+
+    # widths are stored as rows of a float matrix, padded with zeros, along
+    # with which of them are floats, so that they are read back as the search
+    # returned them
+    max_depth = max((len(widths) for widths, _ in entries), default=0)
+    widths = numpy.zeros((len(entries), max_depth), dtype=numpy.float64)
+    width_is_float = numpy.zeros((len(entries), max_depth), dtype=bool)
+    for i, (entry_widths, _) in enumerate(entries):
+        widths[i, :len(entry_widths)] = entry_widths
+        width_is_float[i, :len(entry_widths)] = [
+            isinstance(width, float) for width in entry_widths
+        ]
+    columns['widths'] = widths
+    columns['width_is_float'] = width_is_float
+    columns['num_free_parameters'] = numpy.array(
+        [num_free_parameters for _, num_free_parameters in entries],
+        dtype=numpy.float64,
+    )
+    columns['num_free_parameters_is_float'] = numpy.array(
+        [
+            isinstance(num_free_parameters, float)
+            for _, num_free_parameters in entries
+        ],
+        dtype=bool,
+    )
+
+    with open(path, 'wb') as file:
+        numpy.savez(file, **columns)
+
+
+def read_dense_by_size_table(
+        path: str) -> Dict[DenseBySizeKey, DenseBySizeEntry]:
+    table = {}
+    with numpy.load(path) as columns:
+        key_columns = [columns[name].tolist() for name in _key_columns]
+        all_widths = columns['widths'].tolist()
+        all_width_is_float = columns['width_is_float'].tolist()
+        all_num_free_parameters = columns['num_free_parameters'].tolist()
+        all_num_free_parameters_is_float = \
+            columns['num_free_parameters_is_float'].tolist()
+
+    for key, widths, width_is_float, num_free_parameters, \
+        num_free_parameters_is_float in zip(
+            zip(*key_columns),
+            all_widths,
+            all_width_is_float,
+            all_num_free_parameters,
+            all_num_free_parameters_is_float,
+    ):
+        depth = key[1]
+        table[key] = (
+            tuple(
+                _from_float(width, is_float)
+                for width, is_float in zip(widths[:depth], width_is_float)),
+            _from_float(num_free_parameters, num_free_parameters_is_float),
+        )
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def get_dense_by_size_table() -> Dict[DenseBySizeKey, DenseBySizeEntry]:
+    '''
+    The table named by the environment, or an empty table if there isn't
+    one. It is read once per process.
+    '''
+    path = os.environ.get(dense_by_size_table_variable, None)
+    if path is None:
+        return {}
+    return read_dense_by_size_table(path)
+
+
+def _from_float(value: float, is_float: bool) -> Width:
+    # float searches can produce float widths, even integral ones
+    if is_float:
+        return value
+    return int(value)
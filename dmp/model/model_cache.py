@@ -0,0 +1,166 @@
+'''
+A worker's cache of compiled keras models.
+
+Compiling a keras model and tracing its train and test functions takes longer
+than training most of the small networks our jobs train. Jobs that differ only
+in their seed or learning rate compile identical models, so a Worker keeps its
+compiled models in a ModelCache and reuses them across jobs.
+
+A reused model is put back into the state a newly compiled model would be in:
+it takes the initial weights of a newly built model, its optimizer variables
+are restored to their initial values, and its metrics are reset. Its traced
+functions are kept.
+'''
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy
+import tensorflow.keras as keras
+
+from dmp.dataset.dataset_cache import make_cache_key
+from dmp.model.model_info import ModelInfo
+
+
+def make_model_cache_key(
+    structure: Any,
+    precision: str,
+    loss: Optional[dict],
+    optimizer: dict,
+    compile_options: Dict[str, Any],
+    metrics: List[Any],
+) -> Tuple[str, Optional[float]]:
+    '''
+    Returns the ModelCache key of a model compiled from its marshaled network
+    structure and these settings, and the learning rate to load it with.
+    The key leaves out a numeric learning rate of the optimizer config, so
+    models differing only in it share a key; a learning rate schedule is
+    part of the key.
+    '''
+    optimizer = optimizer.copy()
+    learning_rate = optimizer.pop('learning_rate', None)
+    if not isinstance(learning_rate, (int, float)):
+        # learning rate schedules are part of the compiled model
+        optimizer['learning_rate'] = learning_rate
+        learning_rate = None
+
+    key = make_cache_key(
+        'model', 1, {
+            'structure':
+            structure,
+            'precision':
+            precision,
+            'loss':
+            loss,
+            'optimizer':
+            optimizer,
+            'compile':
+            compile_options,
+            'metrics': [
+                m if isinstance(m, str) else keras.metrics.serialize(m)
+                for m in metrics
+            ],
+        })
+    return key, learning_rate
+
+
+@dataclass
+class ModelCacheStatistics():
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _ModelCacheEntry():
+    model: ModelInfo
+    initial_optimizer_state: List[numpy.ndarray]
+
+
+class ModelCache():
+
+    def __init__(self, max_size: int = 8) -> None:
+        self.max_size: int = max_size
+        self.statistics: ModelCacheStatistics = ModelCacheStatistics()
+        self._entries: OrderedDict[str, _ModelCacheEntry] = OrderedDict()
+
+    def load(
+        self,
+        key: str,
+        model: ModelInfo,
+        compile: Callable[[ModelInfo], None],
+        learning_rate: Optional[float] = None,
+    ) -> ModelInfo:
+        '''
+        Returns a compiled model equivalent to model after calling
+        compile(model). Models with the same key must compile to the same
+        keras model up to their weights and learning rate.
+
+        On a miss, model is compiled, cached under key, and returned. On a
+        hit, the cached model is reset to model's weights, and to
+        learning_rate if it is not None, and returned instead. Its
+        keras_network then maps the layers of the cached model's network.
+        '''
+        entry = self._entries.get(key, None)
+        if entry is None:
+            self.statistics.misses += 1
+            compile(model)
+            self._put(key, model)
+            return model
+
+        self.statistics.hits += 1
+        self._entries.move_to_end(key)
+
+        keras_model = entry.model.keras_model
+        keras_model.set_weights(model.keras_model.get_weights())
+        optimizer = keras_model.optimizer
+        for variable, value in zip(
+                _get_optimizer_variables(optimizer),
+                entry.initial_optimizer_state,
+        ):
+            variable.assign(value)
+        if learning_rate is not None:
+            optimizer.learning_rate = learning_rate
+        keras_model.reset_metrics()
+        keras_model.stop_training = False
+
+        return ModelInfo(
+            model.network,
+            entry.model.keras_network,
+            keras_model,
+        )
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _put(self, key: str, model: ModelInfo) -> None:
+        # build the optimizer now so its initial state can be restored later
+        keras_model = model.keras_model
+        _build_optimizer(keras_model.optimizer,
+                         keras_model.trainable_variables)
+        self._entries[key] = _ModelCacheEntry(
+            model,
+            [
+                numpy.array(variable.numpy()) for variable in
+                _get_optimizer_variables(keras_model.optimizer)
+            ],
+        )
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.statistics.evictions += 1
+
+
+def _build_optimizer(optimizer: Any, variables: List[Any]) -> None:
+    if hasattr(optimizer, 'build'):
+        optimizer.build(variables)
+    else:  # legacy keras optimizers
+        optimizer._create_all_weights(variables)
+
+
+def _get_optimizer_variables(optimizer: Any) -> List[Any]:
+    variables = optimizer.variables
+    if callable(variables):  # legacy keras optimizers
+        variables = variables()
+    return list(variables)
@@ -4,41 +4,95 @@ from dmp.common import binary_search_float, binary_search_int
 from dmp.model.network_info import NetworkInfo
 
 T = TypeVar('T')
+C = TypeVar('C')
 
 
-def _find_closest_network_to_target_size(
+def _find_closest_to_target_size(
     target_num_free_parameters: int,
-    make_network: Callable[[T], NetworkInfo],
+    make_candidate: Callable[[T], C],
+    get_num_free_parameters: Callable[[C], int],
     search_function: Callable,
-) -> Tuple[T, NetworkInfo]:
+) -> Tuple[int, C]:
     best = (math.inf, None)
 
     def search_objective(search_parameter):
         nonlocal best
-        network = make_network(search_parameter)
-        delta = network.num_free_parameters - target_num_free_parameters
-        # print(f'search_objective {search_parameter}, {network.num_free_parameters}, {target_num_free_parameters}, {delta}')
+        candidate = make_candidate(search_parameter)
+        delta = get_num_free_parameters(
+            candidate) - target_num_free_parameters
+        # print(f'search_objective {search_parameter}, {delta}')
         if abs(delta) < abs(best[0]):
-            best = (delta, network)
+            best = (delta, candidate)
         return delta
 
     search_function(search_objective)
     return best  # type: ignore
 
 
+def _search_float(search_objective):
+    return binary_search_float(
+        search_objective,
+        0.0,
+        float(2**31),
+        1e-12,
+    )
+
+
+def _search_int(search_objective):
+    return binary_search_int(
+        search_objective,
+        1,
+        int(2**30),
+    )
+
+
+def find_closest_to_target_size_float(
+    target_num_free_parameters: int,
+    make_candidate: Callable[[float], C],
+    get_num_free_parameters: Callable[[C], int],
+) -> Tuple[int, C]:
+    '''
+    Searches a float parameter for the candidate whose number of free
+    parameters is closest to the target. Candidates can be anything whose
+    size get_num_free_parameters() can count, so the search can run without
+    building a NetworkInfo for every probe.
+    '''
+    return _find_closest_to_target_size(
+        target_num_free_parameters,
+        make_candidate,
+        get_num_free_parameters,
+        _search_float,
+    )
+
+
+def find_closest_to_target_size_int(
+    target_num_free_parameters: int,
+    make_candidate: Callable[[int], C],
+    get_num_free_parameters: Callable[[C], int],
+) -> Tuple[int, C]:
+    '''
+    Integer counterpart of find_closest_to_target_size_float().
+    '''
+    return _find_closest_to_target_size(
+        target_num_free_parameters,
+        make_candidate,
+        get_num_free_parameters,
+        _search_int,
+    )
+
+
+def _get_network_num_free_parameters(network: NetworkInfo) -> int:
+    return network.num_free_parameters
+
+
 def find_closest_network_to_target_size_float(
     target_num_free_parameters: int,
     make_network: Callable[[float], NetworkInfo],
 ) -> Tuple[int, NetworkInfo]:
-    return _find_closest_network_to_target_size(
+    return find_closest_to_target_size_float(
         target_num_free_parameters,
         make_network,
-        lambda search_objective: binary_search_float(
-            search_objective,
-            0.0,
-            float(2**31),
-            1e-12,
-        ),
+        _get_network_num_free_parameters,
     )
 
 
@@ -46,16 +100,8 @@ def find_closest_network_to_target_size_int(
     target_num_free_parameters: int,
     make_network: Callable[[float], NetworkInfo],
 ) -> Tuple[int, NetworkInfo]:
-    return _find_closest_network_to_target_size(
+    return find_closest_to_target_size_int(
         target_num_free_parameters,
         make_network,
-        lambda search_objective: binary_search_int(
-            search_objective,
-            1,
-            int(2**30),
-        ),
+        _get_network_num_free_parameters,
     )
-
-
-
-
@@ -0,0 +1,278 @@
+'''
+Vectorized per-column encoding of data matrices.
+
+Every column of a matrix is assigned a ColumnEncoding. A ColumnEncoder is fit
+to one matrix and then transforms all columns of any matrix with the same
+columns at once into a single preallocated output matrix. The results match
+fitting scikit-learn's MinMaxScaler and OneHotEncoder(handle_unknown='ignore')
+(and the simple binary and zeros encodings) to each column separately and
+stacking the results, without a Python-level loop over numeric columns.
+'''
+
+from enum import IntEnum
+import numbers
+from typing import Any, Optional, Tuple
+
+import numpy
+from numpy import ndarray
+
+from dmp.preprocessing.preprocessor import Preprocessor
+
+# dtypes preserved by scikit-learn's MinMaxScaler; other dtypes become float64
+_min_max_dtypes = (numpy.float64, numpy.float32, numpy.float16)
+
+
+class ColumnEncoding(IntEnum):
+    ignore = 0  # drop the column
+    zeros = 1  # replace the column with zeros
+    binary = 2  # 1 where equal to the column's first value, else 0
+    one_hot = 3  # one output column per distinct value, in sorted order
+    min_max = 4  # scale linearly onto [0, 1]
+
+
+_encoding_dtypes = {
+    ColumnEncoding.binary: numpy.dtype(numpy.int8),
+    ColumnEncoding.one_hot: numpy.dtype(numpy.int8),
+    ColumnEncoding.min_max: numpy.dtype(numpy.float32),
+}
+
+
+def count_distinct_values(values: ndarray) -> ndarray:
+    '''
+    Returns the number of distinct values in each column of values.
+    '''
+    if values.dtype.hasobject:
+        return numpy.array(
+            [numpy.unique(values[:, i]).size for i in range(values.shape[1])],
+            dtype=numpy.int64,
+        )
+    if values.shape[0] == 0:
+        return numpy.zeros(values.shape[1], dtype=numpy.int64)
+    return 1 + numpy.sum(_find_changes(numpy.sort(values, axis=0)), axis=0)
+
+
+def is_numeric_column(values: ndarray) -> ndarray:
+    '''
+    Returns True for each column whose first value is a number.
+    '''
+    if not values.dtype.hasobject:
+        return numpy.full(
+            values.shape[1],
+            isinstance(values.dtype.type(0), numbers.Number),
+        )
+    return numpy.array(
+        [isinstance(v, numbers.Number) for v in values[0]],
+        dtype=bool,
+    )
+
+
+class ColumnEncoder(Preprocessor):
+    '''
+    Per-column encoding fit to one data matrix (usually the training split)
+    and then applied to any matrix with the same columns, so every split is
+    encoded identically. Values outside the fitted range are scaled linearly
+    and unseen categories are one-hot encoded as all zeros.
+    '''
+
+    def __init__(self, data: ndarray, encodings: ndarray):
+        data = _as_matrix(data)
+        encodings = numpy.asarray(encodings)
+        self.encodings: ndarray = encodings
+
+        widths = numpy.ones(encodings.shape, dtype=numpy.int64)
+        widths[encodings == ColumnEncoding.ignore] = 0
+
+        self._binary_columns: ndarray = \
+            numpy.flatnonzero(encodings == ColumnEncoding.binary)
+        self._binary_values: ndarray = data[0, self._binary_columns].copy()
+
+        self._one_hot_columns: ndarray = \
+            numpy.flatnonzero(encodings == ColumnEncoding.one_hot)
+        self._categories, self._num_categories = _fit_categories(
+            data[:, self._one_hot_columns])
+        widths[self._one_hot_columns] = self._num_categories
+
+        self._min_max_columns: ndarray = \
+            numpy.flatnonzero(encodings == ColumnEncoding.min_max)
+        self._min_max_scale, self._min_max_offset = _fit_min_max(
+            data[:, self._min_max_columns])
+
+        self._offsets: ndarray = numpy.concatenate(([0], numpy.cumsum(widths)))
+
+        kept = encodings[encodings != ColumnEncoding.ignore]
+        self.dtype: Optional[numpy.dtype] = None
+        if kept.size > 0:
+            self.dtype = numpy.result_type(*[
+                data.dtype if e == ColumnEncoding.zeros else
+                _encoding_dtypes[ColumnEncoding(e)] for e in numpy.unique(kept)
+            ])
+
+    @property
+    def output_width(self) -> int:
+        return int(self._offsets[-1])
+
+    def forward(self, element: ndarray) -> Optional[ndarray]:
+        '''
+        Encodes all columns of element in one pass. Returns None if every
+        column is ignored.
+        '''
+        if self.dtype is None:
+            return None
+
+        values = _as_matrix(element)
+        num_rows = values.shape[0]
+        offsets = self._offsets
+        result = numpy.zeros((num_rows, self.output_width), dtype=self.dtype)
+
+        binary_columns = self._binary_columns
+        if binary_columns.size > 0:
+            result[:, offsets[binary_columns]] = \
+                (values[:, binary_columns] == self._binary_values[None, :])
+
+        one_hot_columns = self._one_hot_columns
+        if one_hot_columns.size > 0:
+            codes, found = _lookup_categories(
+                self._categories,
+                self._num_categories,
+                values[:, one_hot_columns],
+            )
+            rows = numpy.broadcast_to(
+                numpy.arange(num_rows)[:, None],
+                codes.shape,
+            )
+            result[rows[found],
+                   (offsets[one_hot_columns][None, :] + codes)[found]] = 1
+
+        min_max_columns = self._min_max_columns
+        if min_max_columns.size > 0:
+            scaled = values[:, min_max_columns].astype(
+                self._min_max_scale.dtype)
+            scaled *= self._min_max_scale
+            scaled += self._min_max_offset
+            result[:, offsets[min_max_columns]] = scaled.astype(numpy.float32)
+
+        # zeros columns are already zero
+        return result
+
+    def backward(self, element):
+        raise NotImplementedError('Column encodings are not invertible.')
+
+
+def encode_columns(
+    values: ndarray,
+    encodings: ndarray,
+) -> Optional[ndarray]:
+    '''
+    Fits a ColumnEncoder to values and encodes them. Returns None if every
+    column is ignored.
+    '''
+    return ColumnEncoder(values, encodings).forward(values)
+
+
+def _as_matrix(values: ndarray) -> ndarray:
+    # a 1-d array is a single column
+    values = numpy.asanyarray(values)
+    if values.ndim == 1:
+        return values.reshape(-1, 1)
+    return values
+
+
+def _find_changes(sorted_values: ndarray) -> ndarray:
+    # True where a column of sorted_values changes value (NaNs compare equal)
+    changes = sorted_values[1:] != sorted_values[:-1]
+    if numpy.issubdtype(sorted_values.dtype, numpy.inexact):
+        changes &= ~(numpy.isnan(sorted_values[1:])
+                     & numpy.isnan(sorted_values[:-1]))
+    return changes
+
+
+def _fit_categories(values: ndarray) -> Tuple[Any, ndarray]:
+    '''
+    Returns the sorted distinct values of each column and the number of
+    distinct values in each column. For non-object values, the distinct
+    values are packed into a (max categories, columns) matrix padded with
+    each column's largest value.
+    '''
+    num_rows, num_columns = values.shape
+    if values.dtype.hasobject:
+        categories = [numpy.unique(values[:, i]) for i in range(num_columns)]
+        return categories, numpy.array([c.size for c in categories],
+                                       dtype=numpy.int64)
+
+    if num_rows == 0 or num_columns == 0:
+        return (
+            numpy.zeros((0, num_columns), dtype=values.dtype),
+            numpy.zeros(num_columns, dtype=numpy.int64),
+        )
+
+    sorted_values = numpy.sort(values, axis=0)
+    ranks = numpy.zeros(values.shape, dtype=numpy.int64)
+    numpy.cumsum(_find_changes(sorted_values), axis=0, out=ranks[1:])
+    num_categories = ranks[-1] + 1
+
+    categories = numpy.empty((num_categories.max(), num_columns),
+                             dtype=values.dtype)
+    categories[:] = sorted_values[-1]
+    categories[ranks, numpy.arange(num_columns)[None, :]] = sorted_values
+    return categories, num_categories
+
+
+def _lookup_categories(
+    categories: Any,
+    num_categories: ndarray,
+    values: ndarray,
+) -> Tuple[ndarray, ndarray]:
+    '''
+    Returns the index of each value in its column's fitted categories, and
+    whether it was found there.
+    '''
+    if isinstance(categories, list):
+        codes = numpy.empty(values.shape, dtype=numpy.int64)
+        found = numpy.empty(values.shape, dtype=bool)
+        for i, column_categories in enumerate(categories):
+            column = values[:, i]
+            column_codes = numpy.searchsorted(column_categories, column)
+            column_codes = numpy.minimum(column_codes,
+                                         column_categories.size - 1)
+            codes[:, i] = column_codes
+            found[:, i] = column_categories[column_codes] == column
+        return codes, found
+
+    # Sort the fitted categories together with the values. Categories come
+    # first, so a stable sort places each category before any equal values,
+    # and counting the categories at or before each value gives its index.
+    # Padding entries are not counted.
+    max_categories = categories.shape[0]
+    combined = numpy.concatenate((categories, values), axis=0)
+    is_category = numpy.zeros(combined.shape, dtype=numpy.int64)
+    is_category[:max_categories] = \
+        numpy.arange(max_categories)[:, None] < num_categories[None, :]
+    order = numpy.argsort(combined, axis=0, kind='stable')
+    counts = numpy.cumsum(
+        numpy.take_along_axis(is_category, order, axis=0),
+        axis=0,
+    )
+    positions = numpy.empty_like(counts)
+    numpy.put_along_axis(positions, order, counts, axis=0)
+    codes = positions[max_categories:] - 1
+
+    codes = numpy.maximum(codes, 0)
+    matched = numpy.take_along_axis(categories, codes, axis=0)
+    found = matched == values
+    if numpy.issubdtype(matched.dtype, numpy.inexact):
+        found |= numpy.isnan(matched) & numpy.isnan(values)
+    return codes, found
+
+
+def _fit_min_max(values: ndarray) -> Tuple[ndarray, ndarray]:
+    # same arithmetic as sklearn.preprocessing.MinMaxScaler
+    dtype = values.dtype if values.dtype in _min_max_dtypes else numpy.float64
+    values = values.astype(dtype)
+    if values.shape[1] == 0:
+        return numpy.zeros(0, dtype=dtype), numpy.zeros(0, dtype=dtype)
+    minimum = numpy.nanmin(values, axis=0)
+    value_range = numpy.nanmax(values, axis=0) - minimum
+    value_range[value_range < 10 * numpy.finfo(dtype).eps] = 1.0
+    scale = 1 / value_range
+    offset = 0 - minimum * scale
+    return scale, offset
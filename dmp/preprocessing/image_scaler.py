@@ -0,0 +1,22 @@
+import numpy
+
+from dmp.preprocessing.preprocessor import Preprocessor
+
+
+class ImageScaler(Preprocessor):
+    '''
+    Scales 8-bit image data onto [0, 1] as float16.
+    '''
+
+    def forward(self, element):
+        return (element.astype(numpy.float16) /
+                numpy.array(255.0, dtype=numpy.float16)).astype(numpy.float16)
+
+    def forward_tensor(self, element):
+        import tensorflow
+        return tensorflow.cast(element, tensorflow.float16) / \
+            tensorflow.constant(255.0, dtype=tensorflow.float16)
+
+    def backward(self, element):
+        return numpy.rint(element.astype(numpy.float32) * 255.0).astype(
+            numpy.uint8)
@@ -10,3 +10,14 @@ class Preprocessor:
     @abstractmethod
     def backward(self, element):
         pass
+
+    def forward_tensor(self, element):
+        '''
+        forward() implemented with tensorflow ops, for use inside tf.data
+        pipelines. Preprocessors that only support numpy don't override this.
+        '''
+        raise NotImplementedError()
+
+    @property
+    def has_forward_tensor(self) -> bool:
+        return type(self).forward_tensor is not Preprocessor.forward_tensor
@@ -60,10 +60,17 @@ class GrowthExperiment(TrainingExperiment):
 
     def __call__(self, worker: Worker, job: Job, *args,
                  **kwargs) -> ExperimentResultRecord:
+        if self.replica_seeds:
+            raise NotImplementedError(
+                'GrowthExperiment does not support replica_seeds.')
+
         with worker.strategy.scope():
-            self._set_random_seeds()
+            self._set_random_seeds(self.data_seed)
             dataset = self._load_and_prepare_dataset()
+            if self.data_seed is not None:
+                self._set_random_seeds()
             metrics = self._autoconfigure_for_dataset(dataset)
+            compile_options = self._get_compile_options(dataset)
 
             goal_network: NetworkInfo = self._make_network(self.model)
             # goal_network.description[self.key_names.scale_key] = 1.0
@@ -72,6 +79,10 @@ class GrowthExperiment(TrainingExperiment):
                 for l in goal_network.structure.all_descendants
             }
 
+            count_scaled_parameters = \
+                self.scaling_method.make_parameter_counter(
+                    goal_network.structure)
+
             # from dmp.marshaling import marshal
             # print(f'goal network:')
             # pprint(
@@ -125,10 +136,20 @@ class GrowthExperiment(TrainingExperiment):
                         description[self.keys.layer_map_key] = layer_map
                         return NetworkInfo(scaled, description)
 
-                    delta, network = find_closest_network_to_target_size_float(
-                        target_size,
-                        make_network,
-                    )
+                    if count_scaled_parameters is None:
+                        delta, network = find_closest_network_to_target_size_float(
+                            target_size,
+                            make_network,
+                        )
+                    else:
+                        # search on the parameter count and only scale the
+                        # network once, to the chosen scale
+                        delta, scale = find_closest_to_target_size_float(
+                            target_size,
+                            lambda scale: scale,
+                            count_scaled_parameters,
+                        )
+                        network = make_network(scale)
                     print(
                         f'Growing to {target_size} {network.num_free_parameters}')
                     # from dmp.marshaling import marshal
@@ -156,7 +177,7 @@ class GrowthExperiment(TrainingExperiment):
                     self.transfer_method.transfer(
                         self._make_transfer_map(src_model, model), )
 
-                self._compile_model(dataset, model, metrics)
+                self._compile_model(model, metrics, compile_options)
 
                 early_stopping_callback = None
                 if on_final_iteration:
@@ -1,6 +1,5 @@
-
 from abc import ABC, abstractmethod
-from typing import Dict, Tuple
+from typing import Callable, Dict, Optional, Tuple
 from dmp.layer.layer import Layer
 
 from dmp.model.model_info import ModelInfo
@@ -15,4 +14,15 @@ class ScalingMethod(ABC):
         target: Layer, 
         scale_factor: float,
     ) -> Tuple[Layer, Dict[Layer, Layer]]:
-        pass
\ No newline at end of file
+        pass
+
+    def make_parameter_counter(
+        self,
+        target: Layer,
+    ) -> Optional[Callable[[float], int]]:
+        '''
+        Returns a function of scale_factor that computes the number of free
+        parameters of scale(target, scale_factor) without building the
+        scaled network, or None if this method can't count them that way.
+        '''
+        return None
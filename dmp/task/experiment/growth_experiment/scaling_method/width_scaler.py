@@ -1,9 +1,12 @@
-from copy import copy
 from functools import singledispatchmethod
+import math
 from math import ceil
 from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional, Set, Sequence, Tuple, TypeVar, Union
 
 from dmp.layer import *
+from dmp.layer.flatten import Flatten
+from dmp.layer.layer import uninitialized_shape
+from dmp.layer.visitor.compute_layer_shapes import compute_layer_shapes
 from dmp.task.experiment.growth_experiment.scaling_method.scaling_method import ScalingMethod
 
 
@@ -14,44 +17,208 @@ class WidthScaler(ScalingMethod):
         root_output: Layer,
         scale_factor: float,
     ) -> Tuple[Layer, Dict[Layer, Layer]]:
+        return _ScalingVisitor(root_output, scale_factor)()
 
-        class ScalingVisitor():
+    def make_parameter_counter(
+        self,
+        target: Layer,
+    ) -> Optional[Callable[[float], int]]:
+        try:
+            return _WidthScaledParameterCounter(target)
+        except NotImplementedError:
+            return None
+
+
+class _ScalingVisitor():
+
+    def __init__(self, root_output: Layer, scale_factor: float) -> None:
+        self._scale_factor: float = scale_factor
+        self._layer_map: Dict[Layer, Layer] = {}
+
+        layer_map = self._layer_map
+        for layer in root_output.topological_order:
+            # scaled layers share their unscaled configs until they are scaled
+            scaled_layer = layer.__class__(
+                layer.config,
+                [layer_map[input] for input in layer.inputs],
+            )
+            layer_map[layer] = scaled_layer
+            if layer is not root_output:
+                self._scale_layer(scaled_layer)
+        self._output: Layer = layer_map[root_output]
+
+    def __call__(self) -> Tuple[Layer, Dict[Layer, Layer]]:
+        return self._output, self._layer_map
+
+    @singledispatchmethod
+    def _scale_layer(self, target: Layer) -> None:
+        pass
+
+    @_scale_layer.register
+    def _(self, target: Dense) -> None:
+        target['units'] = int(ceil(target['units'] * self._scale_factor))
+
+    @_scale_layer.register
+    def _(self, target: ConvolutionalLayer) -> None:
+        target['filters'] = int(ceil(target['filters'] * self._scale_factor))
+
+
+# channel count of each layer so far -> channel count of a layer
+ChannelFunction = Callable[[List[int], float], int]
+
+
+class _WidthScaledParameterCounter():
+    '''
+    Counts the free parameters of a network scaled by WidthScaler without
+    copying it. Width scaling only changes the number of channels of a layer,
+    so the output size of each layer is its unscaled spatial size times a
+    channel count that is a function of the scale factor and the channel
+    counts of its inputs.
+    '''
+
+    def __init__(self, root_output: Layer) -> None:
+        if root_output.computed_shape is uninitialized_shape:
+            compute_layer_shapes(root_output)
+
+        self._root_output: Layer = root_output
+        self._index: Dict[Layer, int] = {}
+        self._spatial_sizes: List[int] = []
+        self._channel_functions: List[ChannelFunction] = []
+        self._parameter_functions: List[ChannelFunction] = []
+        for layer in root_output.topological_order:
+            self._add_layer(layer)
 
-            def __init__(self) -> None:
-                # self._scale_factor: float = scale_factor
-                self._layer_map: Dict[Layer, Layer] = {}
+        # at scale 1, every channel count must match the unscaled network
+        channels = self._compute_channels(1.0)
+        for layer, i in self._index.items():
+            shape = layer.computed_shape
+            if channels[i] * self._spatial_sizes[i] != math.prod(shape):
+                raise NotImplementedError(
+                    f'Can not count scaled parameters of {layer}.')
 
-                self._output = self._scale_network(root_output)
+    def __call__(self, scale_factor: float) -> int:
+        channels = self._compute_channels(scale_factor)
+        return sum((count(channels, scale_factor)
+                    for count in self._parameter_functions))
 
-            def __call__(self) -> Tuple[Layer, Dict[Layer, Layer]]:
-                return self._output, self._layer_map
+    def _compute_channels(self, scale_factor: float) -> List[int]:
+        channels = []
+        for channel_function in self._channel_functions:
+            channels.append(channel_function(channels, scale_factor))
+        return channels
 
-            def _scale_network(self, target: Layer) -> Layer:
-                layer_map = self._layer_map
-                if target in layer_map:
-                    return layer_map[target]
+    def _add_layer(self, target: Layer) -> None:
+        shape = target.computed_shape
+        self._index[target] = len(self._channel_functions)
+        self._spatial_sizes.append(math.prod(shape[:-1]))
+        self._channel_functions.append(self._visit(target))
 
-                scaled_layer = copy(target)
-                layer_map[target] = scaled_layer
-                scaled_layer.inputs = [
-                    self._scale_network(input) for input in target.inputs
-                ]
-                if target is not root_output:
-                    self._scale_layer(scaled_layer)
-                return scaled_layer
+    def _get_input_indices(self, target: Layer) -> List[int]:
+        return [self._index[input] for input in target.inputs]
 
-            @singledispatchmethod
-            def _scale_layer(self, target: Layer) -> None:
-                pass
+    def _get_input_size(self, index: int) -> Callable[[List[int]], int]:
+        spatial_size = self._spatial_sizes[index]
+        return lambda channels: spatial_size * channels[index]
 
-            @_scale_layer.register
-            def _(self, target: Dense) -> None:
-                o = target['units']
-                target['units'] = int(ceil(target['units'] * scale_factor))
-                # print(f'scale layer {o} -> {target["units"]} @ {self._scale_factor}')
+    def _scale_channels(self, target: Layer, key: str) -> ChannelFunction:
+        num_channels = target[key]
+        if target is self._root_output:
+            return lambda channels, scale_factor: num_channels
+        return lambda channels, scale_factor: int(
+            ceil(num_channels * scale_factor))
 
-            @_scale_layer.register
-            def _(self, target: ConvolutionalLayer) -> None:
-                target['filters'] = int(ceil(target['filters'] * scale_factor))
+    @singledispatchmethod
+    def _visit(self, target: Layer) -> ChannelFunction:
+        raise NotImplementedError(f'Unsupported Layer of type {type(target)}.')
+
+    @_visit.register
+    def _(self, target: Input) -> ChannelFunction:
+        shape = target.computed_shape
+        num_channels = shape[-1]
+        return lambda channels, scale_factor: num_channels
+
+    @_visit.register
+    def _(self, target: Dense) -> ChannelFunction:
+        units = self._scale_channels(target, 'units')
+        input_sizes = [
+            self._get_input_size(i) for i in self._get_input_indices(target)
+        ]
+        bias = 1 if target.use_bias else 0
+        index = len(self._channel_functions)
+
+        self._parameter_functions.append(
+            lambda channels, scale_factor: channels[index] * (sum(
+                (input_size(channels)
+                 for input_size in input_sizes)) + bias))
+        return units
+
+    @_visit.register
+    def _(self, target: ConvolutionalLayer) -> ChannelFunction:
+        return self._visit_convolutional_layer(
+            target,
+            math.prod(target['kernel_size']),
+        )
+
+    @_visit.register
+    def _(self, target: SeparableConv) -> ChannelFunction:
+        return self._visit_convolutional_layer(
+            target,
+            sum(target['kernel_size']),
+        )
+
+    def _visit_convolutional_layer(
+        self,
+        target: ConvolutionalLayer,
+        input_weights_per_node_channel: int,
+    ) -> ChannelFunction:
+        self._require_channels_last(target)
+        filters = self._scale_channels(target, 'filters')
+        input_index = self._get_input_indices(target)[0]
+        bias = 1 if target.use_bias else 0
+        index = len(self._channel_functions)
+
+        self._parameter_functions.append(
+            lambda channels, scale_factor: channels[index] *
+            (input_weights_per_node_channel * channels[input_index] + bias))
+        return filters
+
+    @_visit.register
+    def _(self, target: ElementWiseOperatorLayer) -> ChannelFunction:
+        input_index = self._get_input_indices(target)[0]
+        return lambda channels, scale_factor: channels[input_index]
+
+    @_visit.register
+    def _(self, target: Flatten) -> ChannelFunction:
+        input_size = self._get_input_size(self._get_input_indices(target)[0])
+        return lambda channels, scale_factor: input_size(channels)
+
+    @_visit.register
+    def _(self, target: Concatenate) -> ChannelFunction:
+        input_indices = self._get_input_indices(target)
+        rank = len(target.computed_shape)
+        if target['axis'] % rank != rank - 1:
+            # concatenating along a spatial axis keeps the channel count
+            return lambda channels, scale_factor: channels[input_indices[0]]
+        return lambda channels, scale_factor: sum(
+            (channels[i] for i in input_indices))
+
+    @_visit.register
+    def _(self, target: PoolingLayer) -> ChannelFunction:
+        return self._visit_channel_preserving_layer(target)
+
+    @_visit.register
+    def _(self, target: GlobalPoolingLayer) -> ChannelFunction:
+        return self._visit_channel_preserving_layer(target)
+
+    def _visit_channel_preserving_layer(
+        self,
+        target: SpatitialLayer,
+    ) -> ChannelFunction:
+        self._require_channels_last(target)
+        input_index = self._get_input_indices(target)[0]
+        return lambda channels, scale_factor: channels[input_index]
 
-        return ScalingVisitor()()
+    def _require_channels_last(self, target: SpatitialLayer) -> None:
+        if target.get('data_format', None) not in (None, 'channels_last'):
+            raise NotImplementedError(
+                f'Unsupported data_format {target["data_format"]}.')
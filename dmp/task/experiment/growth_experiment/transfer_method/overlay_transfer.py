@@ -1,9 +1,9 @@
 from dataclasses import dataclass
 from functools import singledispatchmethod
-from typing import Any, Dict, Iterable, Set, Tuple, TypeVar
+from typing import Any, Dict, Iterable, List, Set, Tuple, TypeVar
 from dmp.layer.flatten import Flatten
 
-import numpy
+import tensorflow
 import tensorflow.keras as keras
 from dmp.layer import *
 from dmp.layer.global_pooling_layer import GlobalPoolingLayer
@@ -15,6 +15,7 @@ from dmp.task.experiment.growth_experiment.transfer_method.transfer_method impor
 from dmp.task.experiment.growth_experiment.layer_growth_info import LayerGrowthInfo
 
 T = TypeVar('T')
+BlockIndex = Tuple[Any, ...]  # slice of a weight variable
 
 
 @dataclass
@@ -23,6 +24,8 @@ class OverlayTransfer(TransferMethod):
     Visitor that fills one network with the values from another. 
     If the destination network is larger, this will 'grow' the src into
     the destination.
+    Weights are updated in place through slice assignments on the layers'
+    variables, so they stay on the device.
     """
 
     old_to_old_scale: float = 1.0
@@ -144,27 +147,25 @@ class OverlayTransfer(TransferMethod):
                 src_channels_in = src_weights.shape[-2]
                 self._scale_weights(
                     src_weights,
-                    dst_weights[..., :src_channels_in, :src_channels_out],
-                    dst_weights[..., :src_channels_in, src_channels_out:],
-                    dst_weights[..., src_channels_in:, :src_channels_out],
-                    dst_weights[..., src_channels_in:, src_channels_out:],
+                    dst_weights,
+                    (..., slice(None, src_channels_in), slice(None, src_channels_out)),
+                    (..., slice(None, src_channels_in), slice(src_channels_out, None)),
+                    (..., slice(src_channels_in, None), slice(None, src_channels_out)),
+                    (..., slice(src_channels_in, None), slice(src_channels_out, None)),
                 )
             elif num_dims == num_weight_dims - 1 or num_dims == 1:
-                src_biases = src_params[1]
-                dst_biases = dst_params[1]
-                num_src_biases = src_biases.shape[-1]
+                num_src_biases = src_weights.shape[-1]
                 self._scale_biases(
-                    src_biases,
-                    dst_biases[..., :num_src_biases],
-                    dst_biases[..., num_src_biases:],
+                    src_weights,
+                    dst_weights,
+                    (..., slice(None, num_src_biases)),
+                    (..., slice(num_src_biases, None)),
                 )
             else:
                 raise NotImplementedError(
                     f'Weight group dimension not supported {num_weight_dims} {num_dims} {src_weights.shape} {dst_weights.shape} {src_layer.config} {src_params[0].shape}'
                 )
 
-        dst_keras_layer.set_weights(dst_params)  # type: ignore
-
     @_do_visit.register
     def _(
         self,
@@ -175,79 +176,105 @@ class OverlayTransfer(TransferMethod):
 
     def _scale_weights(
         self,
-        src_weights: numpy.ndarray,
-        old_to_old: numpy.ndarray,
-        old_to_new: numpy.ndarray,
-        new_to_old: numpy.ndarray,
-        new_to_new: numpy.ndarray,
+        src_weights: tensorflow.Variable,
+        dst_weights: tensorflow.Variable,
+        old_to_old: BlockIndex,
+        old_to_new: BlockIndex,
+        new_to_old: BlockIndex,
+        new_to_new: BlockIndex,
     ):
         _blend_blocks(  # copy and scale old weights
             src_weights,
             self.old_to_old_scale,
+            dst_weights,
             old_to_old,
             self.new_add_to_old_scale,
         )
         _scale_block(  # scale old to new weights
+            dst_weights,
             old_to_new,
             self.old_to_new_scale,
         )
         _scale_block(  # scale new to old weights
+            dst_weights,
             new_to_old,
             self.new_to_old_scale,
         )
         _scale_block(  # scale new weights
+            dst_weights,
             new_to_new,
             self.new_to_new_scale,
         )
 
     def _scale_biases(
         self,
-        src_biases: numpy.ndarray,
-        old_biases: numpy.ndarray,
-        new_biases: numpy.ndarray,
+        src_biases: tensorflow.Variable,
+        dst_biases: tensorflow.Variable,
+        old_biases: BlockIndex,
+        new_biases: BlockIndex,
     ):
         _blend_blocks(  # copy and scale old biases
             src_biases,
             self.old_to_old_scale,
+            dst_biases,
             old_biases,
             self.new_add_to_old_scale,
         )
         _scale_block(  # scale new biases
+            dst_biases,
             new_biases,
             self.new_to_new_scale,
         )
 
 
 def _scale_block(
-    target: numpy.ndarray,
+    target: tensorflow.Variable,
+    index: BlockIndex,
     scale: float,
 ) -> None:
+    # updates the block in place on the variable's device
     if scale == 1.0:
-        pass
-    elif scale == 0.0:
-        target[:] = 0
+        return
+
+    block = target[index]
+    if block.shape.num_elements() == 0:
+        return
+
+    if scale == 0.0:
+        block.assign(tensorflow.zeros_like(block))
     else:
-        target[:] *= scale
+        block.assign(block * scale)
 
 
 def _blend_blocks(
-    src_weights: numpy.ndarray,
+    src_weights: tensorflow.Variable,
     src_scale: float,
-    dst_block: numpy.ndarray,
+    dst_weights: tensorflow.Variable,
+    dst_index: BlockIndex,
     dst_scale: float,
 ) -> None:
     if src_scale == 0.0:
-        dst_block[:] = src_weights
         _scale_block(
-            dst_block,
+            dst_weights,
+            dst_index,
             src_scale,
         )
-    else:
-        _scale_block(
-            dst_block,
-            dst_scale,
-        )
-        dst_block[:] += src_weights * src_scale
+        return
+
+    dst_block = dst_weights[dst_index]
+    value = src_weights if src_scale == 1.0 else src_weights * src_scale
+    if dst_scale == 1.0:
+        value = dst_block + value
+    elif dst_scale != 0.0:
+        value = dst_block * dst_scale + value
+    dst_block.assign(value)
+
+
+def _as_variable(weights: Any) -> tensorflow.Variable:
+    # Keras 3 wraps the backend's tf.Variable
+    if isinstance(weights, tensorflow.Variable):
+        return weights
+    return weights.value
 
 
 def _as_same_type(
@@ -265,7 +292,8 @@ def _get_layers(
     src_layer: T,
     src: KerasLayerInfo,
     dst: KerasLayerInfo,
-) -> Tuple[KerasLayer, Any, T, KerasLayer, Any, ]:
+) -> Tuple[KerasLayer, List[tensorflow.Variable], T, KerasLayer, List[
+        tensorflow.Variable], ]:
     src_keras_layer = src.keras_layer
     if not isinstance(src_keras_layer, keras.layers.Layer):
         raise ValueError()
@@ -275,8 +303,8 @@ def _get_layers(
 
     return (
         src_keras_layer,
-        src_keras_layer.get_weights(),
+        [_as_variable(w) for w in src_keras_layer.weights],
         dst_layer,
         dst_keras_layer,
-        dst_keras_layer.get_weights(),
+        [_as_variable(w) for w in dst_keras_layer.weights],  # type: ignore
     )
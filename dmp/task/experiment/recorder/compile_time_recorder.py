@@ -0,0 +1,86 @@
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import tensorflow
+
+from dmp.task.experiment.recorder.recorder import Recorder
+
+
+class CompileTimeRecorder(Recorder):
+    '''
+    Records how long tracing and compiling (with XLA, if jit_compile is on)
+    the model's train and test functions takes, apart from the epoch times
+    TimestampRecorder records.
+
+    The first call of each function traces and compiles it, then runs one
+    execution of steps_per_execution steps. Its compile time is the duration
+    of that call less that of the second call, or the whole duration if there
+    is no second call. Compile times are recorded at the first epoch.
+    '''
+
+    def __init__(
+        self,
+        time_suffix: str,
+        train_metric_name: str,
+        test_metric_name: str,
+    ):
+        super().__init__()
+        self._time_suffix: str = time_suffix
+        self._metric_names: Dict[str, str] = {
+            'train_function': train_metric_name,
+            'test_function': test_metric_name,
+        }
+        self._call_times: Dict[str, List[float]] = {}
+        self._wrapped_functions: List[Tuple[str, Any]] = []
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs=logs)
+        model = self.model
+        model.make_test_function()  # type: ignore
+        self._call_times = {}
+        self._wrapped_functions = []
+        for attribute in self._metric_names:
+            function = getattr(model, attribute)
+            self._wrapped_functions.append((attribute, function))
+            setattr(model, attribute,
+                    self._time_first_calls(attribute, function))
+
+    def on_train_end(self, logs=None):
+        # put back the unwrapped functions, which a reused model keeps
+        for attribute, function in self._wrapped_functions:
+            setattr(self.model, attribute, function)
+        self._wrapped_functions = []
+
+        self._record_epoch(0)
+        for attribute, metric_name in self._metric_names.items():
+            call_times = self._call_times.get(attribute, [])
+            if len(call_times) == 0:
+                continue
+            compile_time = call_times[0]
+            if len(call_times) > 1:
+                compile_time = max(0.0, compile_time - call_times[1])
+            self._record_metric(
+                metric_name + self._time_suffix,
+                int(compile_time * 1000),
+            )
+
+    def _time_first_calls(
+        self,
+        attribute: str,
+        function: Callable,
+    ) -> Callable:
+        call_times = self._call_times.setdefault(attribute, [])
+
+        def timed_function(*args, **kwargs):
+            if len(call_times) >= 2:
+                return function(*args, **kwargs)
+            start_time = time.time()
+            logs = function(*args, **kwargs)
+            # wait for the call to finish running on the device
+            for value in tensorflow.nest.flatten(logs):
+                if hasattr(value, 'numpy'):
+                    value.numpy()
+            call_times.append(time.time() - start_time)
+            return logs
+
+        return timed_function
@@ -11,7 +11,12 @@ class Recorder(keras.callbacks.Callback, ABC):
         self.history: dict = {}
 
     def _record_metric(self, metric: str, value: Any) -> None:
-        self.history.setdefault(metric, []).append(value)
+        # pad epochs where metric was not recorded with None, to keep its
+        # history aligned with self.epoch
+        metric_history = self.history.setdefault(metric, [])
+        metric_history.extend([None] *
+                              (len(self.epoch) - 1 - len(metric_history)))
+        metric_history.append(value)
 
     def _record_epoch(self, epoch: int) -> None:
         self.epoch.append(epoch)
@@ -0,0 +1,142 @@
+import functools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import tensorflow
+import tensorflow.keras as keras
+
+from dmp.task.experiment.training_experiment.test_set_info import TestSetInfo
+
+# a test set, its metric results by name, and its evaluation time in seconds
+TestSetResult = Tuple[TestSetInfo, Dict[str, Any], float]
+
+
+class TestSetEvaluator():
+    '''
+    Evaluates a compiled keras model on a fixed list of test sets.
+
+    Every test set held as a tf.data.Dataset is evaluated by one call of a
+    single tf.function, which runs the model's test_step() over each set in
+    turn. The model's metrics are reset before each set and read after it,
+    so each set gets the results its own model.evaluate() call would. Other
+    test sets, and models under a distribution strategy, are evaluated with
+    model.evaluate().
+
+    The datasets are arguments of the tf.function, so every evaluator of a
+    model shares its traces with any other evaluator of that model, including
+    those of later jobs reusing the model, with datasets of the same
+    structure.
+    '''
+
+    def __init__(
+        self,
+        model: keras.Model,
+        test_sets: List[TestSetInfo],
+    ):
+        self.model: keras.Model = model
+        self.test_sets: List[TestSetInfo] = [
+            test_set for test_set in test_sets
+            if test_set.test_data is not None
+        ]
+        self._fused_sets: List[TestSetInfo] = [
+            test_set for test_set in self.test_sets
+            if isinstance(test_set.test_data, tensorflow.data.Dataset)
+        ]
+
+    def evaluate(self) -> List[TestSetResult]:
+        '''
+        Evaluates the model on every test set, in order.
+        '''
+        if tensorflow.distribute.has_strategy():
+            return [self._evaluate_set(s) for s in self.test_sets]
+
+        fused_results = {}
+        if len(self._fused_sets) > 0:
+            datasets = tuple(s.test_data for s in self._fused_sets)
+            for test_set, (results, seconds) in zip(
+                    self._fused_sets,
+                    _get_evaluate_function(self.model, datasets)(datasets),
+            ):
+                fused_results[id(test_set)] = (
+                    test_set,
+                    {k: _to_python(v)
+                     for k, v in results.items()},
+                    float(seconds),
+                )
+
+        return [
+            fused_results[id(test_set)]
+            if id(test_set) in fused_results else self._evaluate_set(test_set)
+            for test_set in self.test_sets
+        ]
+
+    def _evaluate_set(self, test_set: TestSetInfo) -> TestSetResult:
+        start_time = time.time()
+        results = self.model.evaluate(
+            x=test_set.test_data,
+            y=test_set.test_targets,
+            sample_weight=test_set.sample_weights,
+            verbose=0,  # type: ignore
+            return_dict=True,
+        )
+        return test_set, results, time.time() - start_time  # type: ignore
+
+
+# the model attribute holding its traced evaluation function, which, like
+# keras' own train_function, lives and is freed with the model
+_evaluate_function_attribute: str = '_dmp_evaluate_function'
+
+
+def _get_evaluate_function(model: keras.Model, datasets: Tuple) -> Any:
+    function = getattr(model, _evaluate_function_attribute, None)
+    if function is None:
+        function = _make_evaluate_function(model, datasets)
+        setattr(model, _evaluate_function_attribute, function)
+    return function
+
+
+def _make_evaluate_function(model: keras.Model, datasets: Tuple) -> Any:
+    # Metrics may only create their variables when test_step() is first
+    # traced, after the first set's reset was traced without them. If so,
+    # trace again now that they exist.
+    num_variables = _count_metric_variables(model)
+    function = tensorflow.function(
+        functools.partial(_evaluate_fused_sets, model))
+    function.get_concrete_function(datasets)
+    if _count_metric_variables(model) != num_variables:
+        function = tensorflow.function(
+            functools.partial(_evaluate_fused_sets, model))
+    return function
+
+
+def _evaluate_fused_sets(
+    model: keras.Model,
+    datasets: Tuple,
+) -> List[Tuple[Dict[str, Any], Any]]:
+    evaluations = []
+    start_time = tensorflow.timestamp()
+    for dataset in datasets:
+        with tensorflow.control_dependencies([start_time]):
+            model.reset_metrics()
+        # an iterator loop runs much faster than a dataset reduction
+        for data in iter(dataset):
+            model.test_step(data)
+        results = model.get_metrics_result()
+        with tensorflow.control_dependencies(
+                tensorflow.nest.flatten(results)):
+            end_time = tensorflow.timestamp()
+        evaluations.append((results, end_time - start_time))
+        start_time = end_time
+    return evaluations
+
+
+def _count_metric_variables(model: keras.Model) -> int:
+    return sum(len(metric.variables) for metric in model.metrics)
+
+
+def _to_python(value: Any) -> Any:
+    # matches the python scalars and numpy arrays model.evaluate() returns
+    value = value.numpy()
+    if value.ndim == 0:
+        return value.item()
+    return value
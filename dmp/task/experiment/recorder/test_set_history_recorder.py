@@ -1,4 +1,4 @@
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Set
 import tensorflow.keras as keras
 from dmp.task.experiment.recorder.timestamp_recorder import TimestampRecorder
 
@@ -12,9 +12,19 @@ class TestSetHistoryRecorder(TestSetRecorder):
         self,
         test_sets: List[TestSetInfo],
         timestamp_recorder: Optional[TimestampRecorder],
+        epochs: Optional[Set[int]] = None,
     ):
         super().__init__(test_sets, timestamp_recorder)
-        
+        # (zero-based) epochs to evaluate after, or None for every epoch
+        self._epochs: Optional[Set[int]] = epochs
 
     def on_epoch_end(self, epoch, logs=None):
-        self.accumulate_metrics(epoch)
\ No newline at end of file
+        if self._epochs is None or epoch in self._epochs or \
+            self._is_last_epoch(epoch):
+            self.accumulate_metrics(epoch)
+
+    def _is_last_epoch(self, epoch: int) -> bool:
+        # callbacks such as EarlyStopping run before this one
+        model: keras.Model = self.model  # type: ignore
+        return epoch + 1 >= self.params.get('epochs', 0) or \
+            bool(getattr(model, 'stop_training', False))
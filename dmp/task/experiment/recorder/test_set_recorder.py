@@ -1,8 +1,8 @@
 from abc import ABC
-import time
 from typing import Any, List, Optional
 import tensorflow.keras as keras
 from dmp.task.experiment.recorder.recorder import Recorder
+from dmp.task.experiment.recorder.test_set_evaluator import TestSetEvaluator
 from dmp.task.experiment.recorder.timestamp_recorder import TimestampRecorder
 
 from dmp.task.experiment.training_experiment.test_set_info import TestSetInfo
@@ -20,32 +20,25 @@ class TestSetRecorder(Recorder, ABC):
         self._test_sets: List[TestSetInfo] = test_sets
         self._timestamp_recorder: Optional[
             TimestampRecorder] = timestamp_recorder
+        self._evaluator: Optional[TestSetEvaluator] = None
 
     def accumulate_metrics(self, epoch: int) -> None:
         self._record_epoch(epoch)
-        model: keras.Model = self.model  # type: ignore
 
         # evaluate on the additional test sets
-        for test_set in self._test_sets:
-            if test_set.test_data is None:
-                continue
-            start_time = time.time()
-            results = self._evaluate_set(test_set)
-            end_time = time.time()
+        for test_set, results, seconds in self._get_evaluator().evaluate():
             if self._timestamp_recorder is not None:
                 self._timestamp_recorder.record_time(
-                    test_set.history_key, end_time - start_time)
-            for metric, result in zip(model.metrics_names, results):
+                    test_set.history_key, seconds)
+            for metric, result in results.items():
                 self._accumulate_test_set_metric(test_set, metric, result)
 
-    def _evaluate_set(self, test_set: TestSetInfo) -> Any:
+    def _get_evaluator(self) -> TestSetEvaluator:
+        # one evaluator per model
         model: keras.Model = self.model  # type: ignore
-        return model.evaluate(
-            x=test_set.test_data,
-            y=test_set.test_targets,
-            sample_weight=test_set.sample_weights,
-            verbose=0,  # type: ignore
-        )
+        if self._evaluator is None or self._evaluator.model is not model:
+            self._evaluator = TestSetEvaluator(model, self._test_sets)
+        return self._evaluator
 
     def _accumulate_test_set_metric(
         self,
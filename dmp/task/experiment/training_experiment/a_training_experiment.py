@@ -47,8 +47,9 @@ class ATrainingExperiment(ExperimentTask):
     ) -> ExperimentSummaryRecord:
         return cls.summarizer.summarize(cls, results)
 
-    def _set_random_seeds(self) -> None:
-        seed: int = self.seed
+    def _set_random_seeds(self, seed: Optional[int] = None) -> None:
+        if seed is None:
+            seed = self.seed
         numpy.random.seed(seed)
         tensorflow.random.set_seed(seed)
         random.seed(seed)
@@ -70,6 +71,7 @@ class ATrainingExperiment(ExperimentTask):
         self,
         worker: Worker,
         network: NetworkInfo,
+        name: Optional[str] = None,
     ):
         from dmp.marshaling import marshal
         pprint(marshal.marshal(network.structure))
@@ -81,7 +83,7 @@ class ATrainingExperiment(ExperimentTask):
         else:
             keras.backend.set_floatx(self.precision)
         
-        return make_keras_model_from_network(network)
+        return make_keras_model_from_network(network, name)
 
     def _merge_histories(
         self,
@@ -93,6 +95,8 @@ class ATrainingExperiment(ExperimentTask):
         for history in histories:
             for metric, metric_history in history.history.items():
                 for epoch, value in zip(history.epoch, metric_history):
+                    if value is None:  # not recorded at this epoch
+                        continue
                     epoch += 1
                     epoch_set.add(epoch)
                     metric_map.setdefault(metric, {})[epoch] = value
@@ -121,11 +125,12 @@ class ATrainingExperiment(ExperimentTask):
         dataset: PreparedDataset,
         network: NetworkInfo,
         history: Dict[str, Any],
+        run_id: Optional[uuid.UUID] = None,
     ) -> ExperimentResultRecord:
 
         run_data = {
             'job_id': job_id,
-            'run_id': job_id,
+            'run_id': job_id if run_id is None else run_id,
             'python_version': str(platform.python_version()),
             'platform': str(platform.platform()),
             'tensorflow_version': str(tensorflow.__version__),
@@ -134,15 +139,21 @@ class ATrainingExperiment(ExperimentTask):
             'git_hash': common.get_git_hash(),
         }
         run_data.update(worker_info)
+        run_data.update(dataset.cache_statistics)
 
         experiment_attrs = self.get_parameters()
         experiment_tags = {}
 
-        run_data_set = {'seed', 'precision', 'task_version', 'batch'}
+        run_data_set = {
+            'seed', 'data_seed', 'precision', 'task_version', 'batch',
+            'replica_seeds'
+        }
         tag_prefix = 'tags_'
         run_tags_prefix = 'run_tags_'
         for key in list(experiment_attrs.keys()):
-            if key in run_data_set or key.startswith('record_'):
+            if key in run_data_set or key.startswith('record_') or \
+                key.startswith('dataset_pipeline') or \
+                key == 'compile' or key.startswith('compile_'):
                 run_data[key] = experiment_attrs.pop(key, None)
             elif key.startswith(tag_prefix):
                 experiment_tags[key[len(tag_prefix):]] = experiment_attrs.pop(key, None)
@@ -0,0 +1,43 @@
+from typing import Any, Dict, Optional, Tuple
+
+# defaults for the keys of TrainingExperiment.compile; None uses keras' default
+default_compile_config: Dict[str, Any] = {
+    'jit_compile': None,  # compile the train and test steps with XLA
+    'steps_per_execution': None,  # training steps per train function call
+    # Run each training epoch in a single train function call, over training
+    # batches cached in memory after the first epoch.
+    'epoch_in_graph': False,
+}
+
+# the keys of TrainingExperiment.compile that are keras compile() options
+keras_compile_keys: Tuple[str, ...] = ('jit_compile', 'steps_per_execution')
+
+
+def get_compile_config(compile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    compile_config = default_compile_config.copy()
+    if compile is not None:
+        compile_config.update(compile)
+    return compile_config
+
+
+def get_compile_options(
+    compile_config: Dict[str, Any],
+    train_dataset: Any,
+) -> Dict[str, Any]:
+    '''
+    Returns the keras compile() options compile_config sets. With
+    epoch_in_graph, steps_per_execution is the number of batches of the
+    tf.data train_dataset, if it is known.
+    '''
+    options = {
+        key: compile_config[key]
+        for key in keras_compile_keys if compile_config[key] is not None
+    }
+    if compile_config['epoch_in_graph']:
+        num_batches = int(train_dataset.cardinality())
+        if num_batches > 0:
+            options['steps_per_execution'] = num_batches
+        else:
+            print('Unknown number of training batches, '
+                  'not running epochs in graph.')
+    return options
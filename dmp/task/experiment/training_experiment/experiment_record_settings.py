@@ -1,6 +1,15 @@
-
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Dict, Optional, Set
+
+import numpy
+
+# defaults for the keys of ExperimentRecordSettings.test_schedule, matching
+# the epochs TrainingExperimentSummarizer selects for its summaries
+default_test_schedule: Dict[str, Any] = {
+    'linear_epochs': 128,  # evaluate after every epoch up to this one
+    'points_per_decade': 100,  # then at this many log-spaced epochs per decade
+    'epochs': None,  # if set, evaluate after exactly these epochs instead
+}
 
 
 @dataclass
@@ -8,4 +17,31 @@ class ExperimentRecordSettings():
     post_training_metrics: bool  # new default false
     times: bool
     model: Optional[Any]
-    metrics: Optional[Any]
\ No newline at end of file
+    metrics: Optional[Any]
+    # when to evaluate the test sets during training (see
+    # default_test_schedule); None to evaluate after every epoch
+    test_schedule: Optional[Dict[str, Any]] = None
+
+    def get_test_epochs(self, num_epochs: int) -> Optional[Set[int]]:
+        '''
+        Returns the epochs, numbered from 1 as in the run history, after which
+        the test sets are evaluated in a run of num_epochs epochs. Returns
+        None if they are evaluated after every epoch.
+        '''
+        if self.test_schedule is None:
+            return None
+
+        schedule = default_test_schedule.copy()
+        schedule.update(self.test_schedule)
+        if schedule['epochs'] is not None:
+            return {int(epoch) for epoch in schedule['epochs']}
+
+        from dmp.task.experiment.training_experiment.training_experiment_summarizer import summarizer
+        epochs = summarizer.make_summary_points(
+            0,
+            num_epochs,
+            schedule['linear_epochs'],
+            1,
+            numpy.log(10.0) / schedule['points_per_decade'],
+        )
+        return set(numpy.unique(numpy.round(epochs)).astype(int).tolist())
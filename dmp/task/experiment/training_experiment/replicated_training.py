@@ -0,0 +1,208 @@
+'''
+Support for training several replicas of a network as one keras model.
+
+Each replica is its own keras model, built from the same network with its
+own random seed. make_replicated_keras_model() feeds one input to all of
+them and outputs each replica's output, so one training step trains every
+replica on the same batch. Each output has its own loss. Replicas share no
+weights, so the gradient of the summed loss with respect to a replica's
+weights is that replica's own gradient.
+
+Keras adds regularization losses to the summed loss only, so the loss
+recorded for a replica's output would leave out that replica's
+regularization. Networks with regularizers can't be replicated (see
+has_regularizers()).
+
+Keras names each output's metrics after the replica's model, e.g.
+replica_0_loss and val_replica_0_loss. split_replica_history() separates
+a history with those names into one history per replica.
+'''
+
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import tensorflow.keras as keras
+
+from dmp.model.model_info import ModelInfo
+
+
+def get_replica_name(replica_key: str, replica: int) -> str:
+    return f'{replica_key}_{replica}'
+
+
+def get_replica_metric(metric: str, replica_name: str) -> str:
+    '''
+    Returns the name keras gives metric for one replica's output, e.g.
+    val_loss becomes val_replica_0_loss.
+    '''
+    validation_prefix = 'val_'
+    if metric.startswith(validation_prefix):
+        return validation_prefix + replica_name + '_' + \
+            metric[len(validation_prefix):]
+    return replica_name + '_' + metric
+
+
+def has_regularizers(keras_model: keras.Model) -> bool:
+    '''
+    Returns True if any layer of keras_model, or of the models it contains,
+    has a regularizer or adds other losses.
+    '''
+    if len(keras_model.losses) > 0:
+        return True
+    for layer in keras_model.layers:
+        if isinstance(layer, keras.Model):
+            if has_regularizers(layer):
+                return True
+            continue
+        for attribute, value in vars(layer).items():
+            if attribute.endswith('_regularizer') and value is not None:
+                return True
+    return False
+
+
+def make_replicated_keras_model(replicas: Sequence[ModelInfo]) -> keras.Model:
+    '''
+    Makes a keras model that feeds its input to every replica's model and
+    outputs each replica's output, in order.
+    '''
+    replica_input = replicas[0].keras_model.inputs[0]  # type: ignore
+    inputs = keras.Input(
+        shape=tuple(replica_input.shape[1:]),
+        dtype=replica_input.dtype,
+    )
+    outputs = []
+    for replica in replicas:
+        output = replica.keras_model(inputs)
+        if isinstance(output, (list, tuple)):
+            output, = output  # each replica has a single output
+        outputs.append(output)
+    return keras.Model(inputs=inputs, outputs=outputs)
+
+
+def replicate_outputs(tf_dataset: Any, num_replicas: int) -> Any:
+    '''
+    Maps a dataset of (inputs, outputs) batches to batches with one copy of
+    outputs for each replica's output.
+    '''
+    if tf_dataset is None:
+        return None
+
+    def replicate(inputs, outputs):
+        return inputs, tuple(outputs for _ in range(num_replicas))
+
+    return tf_dataset.map(replicate)
+
+
+def split_replica_history(
+    history: Dict[str, List],
+    replica_key: str,
+    num_replicas: int,
+    epoch_key: str,
+    last_epochs: Sequence[Optional[int]],
+) -> List[Dict[str, List]]:
+    '''
+    Splits a merged history of a replicated model into one history per
+    replica. A replica's metrics lose the replica name (train_replica_0_loss
+    becomes train_loss). Other columns, such as times, go to every replica,
+    unless the replica has its own column with the same name. Each replica's
+    history ends at its entry of last_epochs, if that is not None.
+    '''
+    pattern = re.compile(r'^(?:(.*)_)?' + re.escape(replica_key) +
+                         r'_(\d+)_(.*)$')
+    shared_history = {}
+    replica_histories: List[Dict[str, List]] = \
+        [{} for _ in range(num_replicas)]
+    for column, values in history.items():
+        match = pattern.match(column)
+        if match is None:
+            shared_history[column] = values
+            continue
+        prefix, replica, metric = match.groups()
+        if prefix is not None:
+            metric = prefix + '_' + metric
+        replica_histories[int(replica)][metric] = values
+
+    for replica_history, last_epoch in zip(replica_histories, last_epochs):
+        for column, values in shared_history.items():
+            replica_history.setdefault(column, values)
+
+        if last_epoch is not None:
+            length = sum(1 for epoch in history[epoch_key]
+                         if epoch <= last_epoch)
+            for column, values in replica_history.items():
+                replica_history[column] = values[:length]
+    return replica_histories
+
+
+class ReplicatedEarlyStopping(keras.callbacks.Callback):
+    '''
+    Applies a separate EarlyStopping callback to each replica of a model made
+    by make_replicated_keras_model().
+
+    Each callback should monitor its own replica's metric (see
+    get_replica_metric()). It acts on its replica's model, so
+    restore_best_weights only restores that replica. A stopped replica keeps
+    training along with the others, but once training ends its weights are
+    put back to those it would have ended with if trained alone: its best
+    weights with restore_best_weights, or else its weights when it stopped.
+    Training ends when every replica has stopped.
+    '''
+
+    def __init__(
+        self,
+        callbacks: Sequence[keras.callbacks.EarlyStopping],
+        replica_models: Sequence[keras.Model],
+    ):
+        super().__init__()
+        self._callbacks: List[keras.callbacks.EarlyStopping] = \
+            list(callbacks)
+        self._replica_models: List[keras.Model] = list(replica_models)
+        # zero-based epoch each replica stopped after, or None
+        self.stopped_epochs: List[Optional[int]] = \
+            [None] * len(self._callbacks)
+        self._stopped_weights: List[Optional[List]] = \
+            [None] * len(self._callbacks)
+
+    def on_train_begin(self, logs=None):
+        self.stopped_epochs = [None] * len(self._callbacks)
+        self._stopped_weights = [None] * len(self._callbacks)
+        for callback, replica_model in zip(self._callbacks,
+                                           self._replica_models):
+            replica_model.stop_training = False
+            callback.set_model(replica_model)
+            callback.on_train_begin(logs)
+
+    def on_epoch_end(self, epoch, logs=None):
+        for i, (callback, replica_model) in enumerate(
+                zip(self._callbacks, self._replica_models)):
+            if self.stopped_epochs[i] is not None:
+                continue
+            callback.on_epoch_end(epoch, logs)
+            if replica_model.stop_training:
+                self.stopped_epochs[i] = epoch
+                self._stopped_weights[i] = \
+                    _get_final_weights(callback, replica_model)
+
+        if all(epoch is not None for epoch in self.stopped_epochs):
+            self.model.stop_training = True  # type: ignore
+
+    def on_train_end(self, logs=None):
+        for callback, replica_model, weights in zip(
+                self._callbacks,
+                self._replica_models,
+                self._stopped_weights,
+        ):
+            if weights is None:
+                callback.on_train_end(logs)
+            else:
+                replica_model.set_weights(weights)
+
+
+def _get_final_weights(
+    callback: keras.callbacks.EarlyStopping,
+    replica_model: keras.Model,
+) -> List:
+    # the weights a stopped model keeps once its training ends
+    if callback.restore_best_weights and callback.best_weights is not None:
+        return list(callback.best_weights)
+    return replica_model.get_weights()
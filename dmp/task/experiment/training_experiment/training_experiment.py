@@ -1,20 +1,31 @@
+import copy
+import dataclasses
 from dataclasses import dataclass
 from operator import index
-from typing import Any, Dict, Iterable, Optional, Set, Type
+from typing import Any, Dict, Iterable, Optional, Set, Tuple, Type
+import uuid
 from jobqueue.job import Job
 import tensorflow.keras as keras
 
 from dmp.dataset.ml_task import MLTask
-from dmp.dataset.prepared_dataset import PreparedDataset
+from dmp.dataset.prepared_dataset import PreparedDataset, default_pipeline_config
 
 from dmp.keras_interface.keras_utils import make_keras_instance, make_keras_config
 from dmp.keras_interface.layer_to_keras import make_keras_model_from_network
 from dmp.layer import *
+from dmp.task.experiment.recorder.compile_time_recorder import CompileTimeRecorder
 from dmp.task.experiment.recorder.timestamp_recorder import TimestampRecorder
 from dmp.task.experiment.experiment_result_record import ExperimentResultRecord
 from dmp.task.experiment.recorder.test_set_history_recorder import TestSetHistoryRecorder
 from dmp.task.experiment.training_experiment.a_training_experiment import ATrainingExperiment
 from dmp.task.experiment.training_experiment.test_set_info import TestSetInfo
+from dmp.task.experiment.training_experiment import replicated_training
+from dmp.task.experiment.training_experiment.compile_config import (
+    default_compile_config,
+    get_compile_config,
+    get_compile_options,
+)
+from dmp.model.model_cache import make_model_cache_key
 from dmp.model.model_info import ModelInfo
 from dmp.task.experiment.recorder.zero_epoch_recorder import ZeroEpochRecorder
 
@@ -23,7 +34,6 @@ from dmp.model.model_spec import ModelSpec
 
 from dmp.worker import Worker
 
-
 @dataclass
 class TrainingExperiment(ATrainingExperiment):
     dataset: DatasetSpec  # migrate dataset stuff into here
@@ -32,20 +42,48 @@ class TrainingExperiment(ATrainingExperiment):
     optimizer: dict  # contains learning rate (migrate converting to typed config from keras serialization)
     loss: Optional[dict]  # set to None for runtime determination
     early_stopping: Optional[dict]  # direct migration
+    # Seeds of replicas to train alongside this run in the same job, as one
+    # keras model. Each replica gets its own result record. Replicas share
+    # this run's dataset splits and training batches, so each replica's
+    # record has the seed of its initialization and the data_seed of this
+    # run. Recorded in run_data.
+    replica_seeds: Optional[List[int]] = None
+    # If set, seeds the dataset splits and shuffling instead of seed, which
+    # then only seeds the model's initialization and training. Recorded in
+    # run_data.
+    data_seed: Optional[int] = None
+    # keras compile options (see default_compile_config); None for keras'
+    # defaults. Recorded in run_data, not as an experiment attribute.
+    compile: Optional[Dict[str, Any]] = None
 
     @property
     def version(self) -> int:
         return 11
 
-    def __call__(self, worker: Worker, job: Job, *args,
-                 **kwargs) -> ExperimentResultRecord:
+    def __call__(
+        self, worker: Worker, job: Job, *args, **kwargs
+    ) -> Union[ExperimentResultRecord, List[ExperimentResultRecord]]:
         with worker.strategy.scope():
-            # tensorflow.config.optimizer.set_jit(True)
-            self._set_random_seeds()
+            self._set_random_seeds(self.data_seed)
             dataset = self._load_and_prepare_dataset()
+            if self.data_seed is not None:
+                self._set_random_seeds()
             metrics = self._autoconfigure_for_dataset(dataset)
-            model = self._make_model(worker, self.model)
-            self._compile_model(dataset, model, metrics)
+            compile_options = self._get_compile_options(dataset)
+            if self.replica_seeds:
+                return self._run_replicas(
+                    worker,
+                    job,
+                    dataset,
+                    metrics,
+                    compile_options,
+                )
+            model = self._load_compiled_model(
+                worker,
+                self._make_model(worker, self.model),
+                metrics,
+                compile_options,
+            )
             # model.keras_model.summary()
             history = self._fit_model(
                 self.fit,
@@ -61,9 +99,98 @@ class TrainingExperiment(ATrainingExperiment):
                 history,
             )
 
+    def _run_replicas(
+        self,
+        worker: Worker,
+        job: Job,
+        dataset: PreparedDataset,
+        metrics: List[Union[str, keras.metrics.Metric]],
+        compile_options: Dict[str, Any],
+    ) -> List[ExperimentResultRecord]:
+        seeds = [self.seed, *self.replica_seeds]  # type: ignore
+        num_replicas = len(seeds)
+        data_seed = self.seed if self.data_seed is None else self.data_seed
+        network = self._make_network(self.model)
+
+        # seed the initialization of each replica separately
+        replicas = []
+        for replica, seed in enumerate(seeds):
+            self._set_random_seeds(seed)
+            replicas.append(
+                self._make_model_from_network(
+                    worker,
+                    network,
+                    replicated_training.get_replica_name(
+                        self.keys.replica, replica),
+                ))
+        self._set_random_seeds(data_seed)
+        if replicated_training.has_regularizers(replicas[0].keras_model):
+            raise NotImplementedError(
+                'replica_seeds does not support networks with regularizers.')
+
+        model = ModelInfo(
+            network,
+            replicas[0].keras_network,
+            replicated_training.make_replicated_keras_model(replicas),
+        )
+        dataset.train = replicated_training.replicate_outputs(
+            dataset.train, num_replicas)
+        dataset.validation = replicated_training.replicate_outputs(
+            dataset.validation, num_replicas)
+        dataset.test = replicated_training.replicate_outputs(
+            dataset.test, num_replicas)
+
+        self._compile_model(model, metrics, compile_options)
+        early_stopping = self._make_replicated_early_stopping_callback(
+            [replica.keras_model for replica in replicas])
+        history = self._fit_model(
+            self.fit,
+            dataset,
+            model,
+            [early_stopping],
+        )
+
+        last_epochs = [None] * num_replicas
+        if early_stopping is not None:
+            last_epochs = [
+                None if epoch is None else epoch + 1
+                for epoch in early_stopping.stopped_epochs
+            ]
+        replica_histories = replicated_training.split_replica_history(
+            history,
+            self.keys.replica,
+            num_replicas,
+            self.keys.epoch,
+            last_epochs,
+        )
+
+        records = []
+        for replica, (seed, replica_history) in enumerate(
+                zip(seeds, replica_histories)):
+            replica_run = copy.copy(self)
+            replica_run.seed = seed
+            replica_run.data_seed = data_seed
+            records.append(
+                replica_run._make_result_record(
+                    worker.worker_info,
+                    job.id,
+                    dataset,
+                    network,
+                    replica_history,
+                    job.id if replica == 0 else uuid.uuid5(job.id, str(seed)),
+                ))
+        return records
+
     def _load_and_prepare_dataset(self) -> PreparedDataset:
+        dataset_spec = self.dataset
+        if self._get_compile_config()['epoch_in_graph']:
+            # cache the batches, unless the training set is reshuffled
+            pipeline = default_pipeline_config.copy()
+            pipeline.update(dataset_spec.pipeline or {})
+            pipeline['cache'] = True
+            dataset_spec = dataclasses.replace(dataset_spec, pipeline=pipeline)
         return PreparedDataset(
-            self.dataset,
+            dataset_spec,
             self.fit['batch_size'],
         )
 
@@ -167,15 +294,72 @@ class TrainingExperiment(ATrainingExperiment):
 
     def _compile_model(
         self,
-        dataset: PreparedDataset,
         model: ModelInfo,
         metrics: List[Union[str, keras.metrics.Metric]],
+        compile_options: Dict[str, Any],
     ) -> None:
+        loss = make_keras_instance(self.loss)
+        compiled_metrics: Any = metrics
+        output_names = model.keras_model.output_names  # type: ignore
+        if len(output_names) > 1:
+            # a replicated model: each output gets its own loss and metrics
+            loss = {
+                name: make_keras_instance(self.loss)
+                for name in output_names
+            }
+            compiled_metrics = {
+                name: [
+                    m if isinstance(m, str) else type(m).from_config(
+                        m.get_config()) for m in metrics
+                ]
+                for name in output_names
+            }
+
         model.keras_model.compile(
-            loss=make_keras_instance(self.loss),  # type: ignore
+            loss=loss,  # type: ignore
             optimizer=make_keras_instance(self.optimizer),
-            metrics=metrics,
+            metrics=compiled_metrics,
             run_eagerly=False,
+            **compile_options,
+        )
+
+    def _get_compile_config(self) -> Dict[str, Any]:
+        return get_compile_config(self.compile)
+
+    def _get_compile_options(self, dataset: PreparedDataset) -> Dict[str, Any]:
+        '''
+        Returns the keras compile() options the compile config sets. Runs make
+        them once, since epoch_in_graph counts the training batches of
+        dataset.
+        '''
+        return get_compile_options(self._get_compile_config(), dataset.train)
+
+    def _load_compiled_model(
+        self,
+        worker: Worker,
+        model: ModelInfo,
+        metrics: List[Union[str, keras.metrics.Metric]],
+        compile_options: Dict[str, Any],
+    ) -> ModelInfo:
+        '''
+        Compiles model, or reuses a compiled model from the worker's model
+        cache that differs from it only in its weights and learning rate.
+        '''
+        from dmp.marshaling import marshal
+
+        key, learning_rate = make_model_cache_key(
+            marshal.marshal(model.network.structure),
+            self.precision,
+            self.loss,
+            self.optimizer,
+            compile_options,
+            metrics,
+        )
+        return worker.model_cache.load(
+            key,
+            model,
+            lambda model: self._compile_model(model, metrics, compile_options),
+            learning_rate,
         )
 
     def _fit_model(
@@ -202,6 +386,11 @@ class TrainingExperiment(ATrainingExperiment):
             self.keys.epoch_start_time_ms,
             self.keys.epoch_time_ms,
         ) if self.record.times else None
+        compile_time_recorder = CompileTimeRecorder(
+            '_' + self.keys.interval_suffix,
+            self.keys.train + '_' + self.keys.compile_time_ms,
+            self.keys.validation + '_' + self.keys.compile_time_ms,
+        ) if self.record.times else None
         zero_epoch_recorder = ZeroEpochRecorder(
             [train_set_info, validation_set_info, test_set_info], None)
 
@@ -210,10 +399,18 @@ class TrainingExperiment(ATrainingExperiment):
             additional_test_sets.append(
                 TestSetInfo(self.keys.trained, dataset.train))
 
+        test_epochs = self.record.get_test_epochs(fit_config['epochs'])
         history_callbacks = [
             timestamp_recorder,
+            compile_time_recorder,
             zero_epoch_recorder,
-            TestSetHistoryRecorder(additional_test_sets, timestamp_recorder),
+            TestSetHistoryRecorder(
+                additional_test_sets,
+                timestamp_recorder,
+                None if test_epochs is None else
+                {epoch - 1
+                 for epoch in test_epochs},
+            ),
         ]
 
         callbacks.extend(history_callbacks)
@@ -249,3 +446,32 @@ class TrainingExperiment(ATrainingExperiment):
     def _make_early_stopping_callback(
             self) -> Optional[keras.callbacks.EarlyStopping]:
         return make_keras_instance(self.early_stopping)
+
+    def _make_replicated_early_stopping_callback(
+        self,
+        replica_models: List[keras.Model],
+    ) -> Optional[replicated_training.ReplicatedEarlyStopping]:
+        if self.early_stopping is None:
+            return None
+
+        # each replica's callback monitors that replica's metric
+        monitor = self.early_stopping.get('monitor', 'val_loss')
+        overrides = {}
+        if self.early_stopping.get('mode', 'auto') == 'auto' and \
+            monitor.endswith('loss'):
+            # keras may not infer the direction of a renamed loss
+            overrides['mode'] = 'min'
+        callbacks = [
+            make_keras_instance(
+                self.early_stopping,
+                monitor=replicated_training.get_replica_metric(
+                    monitor,
+                    replica_model.name,
+                ),
+                **overrides,
+            ) for replica_model in replica_models
+        ]
+        return replicated_training.ReplicatedEarlyStopping(
+            callbacks,
+            replica_models,
+        )
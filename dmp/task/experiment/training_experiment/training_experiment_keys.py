@@ -19,6 +19,7 @@ class TrainingExperimentKeys():
         self.validation: str = 'validation'
 
         self.trained: str = 'trained'
+        self.replica: str = 'replica'
 
         self.test_data_sets: Sequence[str] = (
             self.test,
@@ -52,6 +53,8 @@ class TrainingExperimentKeys():
         self.interval_suffix: str = 'ms'
         self.epoch_start_time_ms: str = 'epoch_start'
         self.epoch_time_ms: str = 'train'
+        # train_compile_ms and validation_compile_ms, at the first epoch
+        self.compile_time_ms: str = 'compile'
 
         self.extended_history_columns: Set[str] = set(
             make_with_data_set_prefixes((
@@ -74,19 +77,20 @@ class TrainingExperimentKeys():
         self.prefixed_loss_metrics: Sequence[str] = tuple(
             make_with_data_set_prefixes(self.loss_metrics))
 
+        # fmax and fmin skip the NaNs of epochs without test evaluations
         def cmax(a):
             # Thanks: https://stackoverflow.com/questions/40672186/cumulative-argmax-of-a-numpy-array
-            m = numpy.maximum.accumulate(a)
+            m = numpy.fmax.accumulate(a)
             x = numpy.arange(a.shape[0])
-            x[1:] *= m[:-1] < m[1:]
+            x[1:] *= numpy.isnan(m[:-1]) | (m[:-1] < m[1:])
             numpy.maximum.accumulate(x, axis=0, out=x)
             return m, x
 
         def cmin(a):
             # Thanks: https://stackoverflow.com/questions/40672186/cumulative-argmax-of-a-numpy-array
-            m = numpy.minimum.accumulate(a)
+            m = numpy.fmin.accumulate(a)
             x = numpy.arange(a.shape[0])
-            x[1:] *= m[:-1] > m[1:]
+            x[1:] *= numpy.isnan(m[:-1]) | (m[:-1] > m[1:])
             numpy.maximum.accumulate(x, axis=0, out=x)
             return m, x
 
@@ -121,7 +125,11 @@ class TrainingExperimentKeys():
         self.simple_summarize_keys: Set[str] = set([
             self.epoch_start_time_ms,
             self.canonical_epoch,
-        ] + make_with_data_set_prefixes((self.interval_suffix, )) + [
+        ] + make_with_data_set_prefixes((self.interval_suffix, )) + \
+            make_with_prefixes(
+                (self.train, self.validation),
+                (self.compile_time_ms + '_' + self.interval_suffix, ),
+            ) + [
             epoch_column for column, cfunc, ifunc, result_column, epoch_column
             in self.run_summary_metrics
         ])
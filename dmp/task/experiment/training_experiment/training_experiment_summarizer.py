@@ -55,7 +55,11 @@ class TrainingExperimentSummarizer():
                 history[epoch_column] = history[epoch_column].astype(numpy.int16)
                 for run in runs:
                     run_history = history.loc[(run, slice(None)), column]
-                    cumulative_values, cumulative_indexes = cfunc(run_history.to_numpy())
+                    cumulative_values, cumulative_indexes = cfunc(
+                        run_history.to_numpy(
+                            dtype=numpy.float64,
+                            na_value=numpy.nan,
+                        ))
                     history.loc[(run, slice(None)), result_column] = cumulative_values
                     cumulative_epochs = run_history.iloc[cumulative_indexes].index.get_level_values(keys.epoch)
                     history.loc[(run, slice(None)), epoch_column] = cumulative_epochs
@@ -0,0 +1,51 @@
+'''
+Measures the worker cold-start cost of importing dmp.dataset.dataset_util and
+of the first loader lookup, each in a fresh interpreter.
+
+    python -m dmp.util.benchmark_dataset_util_import [repetitions]
+'''
+
+import statistics
+import subprocess
+import sys
+
+_script = '''
+import sys
+import time
+start = time.perf_counter()
+import dmp.dataset.dataset_util as dataset_util
+imported = time.perf_counter()
+dataset_util.get_dataset_loader('pmlb', 'adult')
+dataset_util.get_dataset_loader('keras', 'mnist')
+looked_up = time.perf_counter()
+print(imported - start, looked_up - imported, 'tensorflow' in sys.modules)
+'''
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    import_times = []
+    lookup_times = []
+    imports_tensorflow = False
+    for _ in range(repetitions):
+        output = subprocess.check_output(
+            [sys.executable, '-c', _script],
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+        import_time, lookup_time, tensorflow_imported = \
+            output.strip().split('\n')[-1].split(' ')
+        import_times.append(float(import_time))
+        lookup_times.append(float(lookup_time))
+        imports_tensorflow |= tensorflow_imported == 'True'
+
+    print(f'import dmp.dataset.dataset_util: '
+          f'median {statistics.median(import_times):.3f}s, '
+          f'max {max(import_times):.3f}s over {repetitions} runs')
+    print(f'first loader lookups: '
+          f'median {statistics.median(lookup_times):.3f}s')
+    print(f'tensorflow imported: {imports_tensorflow}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+'''
+Compares add_label_noise() on one-hot outputs with the per-index loop it
+replaced.
+
+    python -m dmp.util.benchmark_label_noise [num_examples] [num_classes]
+'''
+
+import sys
+import time
+
+import numpy
+
+from dmp.dataset.ml_task import MLTask
+from dmp.dataset.prepared_dataset import add_label_noise
+
+
+def add_label_noise_loop(label_noise: float, train_outputs: numpy.ndarray):
+    # the previous one-hot implementation, including its indexing bug of
+    # rolling every selected row on each iteration
+    train_size = len(train_outputs)
+    num_to_perturb = int(train_size * label_noise)
+    noisy_labels_idx = numpy.random.choice(train_size,
+                                           size=num_to_perturb,
+                                           replace=False)
+    num_outputs = train_outputs.shape[1]
+    rolls = numpy.random.choice(
+        numpy.arange(num_outputs - 1) + 1, noisy_labels_idx.size)
+    for i, idx in enumerate(noisy_labels_idx):
+        train_outputs[noisy_labels_idx] = numpy.roll(
+            train_outputs[noisy_labels_idx], rolls[i])
+
+
+def make_outputs(num_examples: int, num_classes: int) -> numpy.ndarray:
+    outputs = numpy.zeros((num_examples, num_classes), dtype=numpy.int8)
+    outputs[numpy.arange(num_examples),
+            numpy.random.randint(num_classes, size=num_examples)] = 1
+    return outputs
+
+
+def time_call(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    num_examples = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_classes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    numpy.random.seed(0)
+
+    for label_noise in (0.05, 0.1, 0.2):
+        outputs = make_outputs(num_examples, num_classes)
+        original = outputs.copy()
+        vectorized_time = time_call(
+            add_label_noise,
+            label_noise,
+            MLTask.classification,
+            outputs,
+        )
+        changed = numpy.any(outputs != original, axis=1).mean()
+        assert numpy.all(outputs.sum(axis=1) == 1)
+
+        loop_time = time_call(
+            add_label_noise_loop,
+            label_noise,
+            make_outputs(num_examples, num_classes),
+        )
+        print(f'{num_examples} examples, {num_classes} classes, '
+              f'label noise {label_noise}: '
+              f'vectorized {vectorized_time:.4f}s '
+              f'(changed {changed:.3f} of labels), '
+              f'loop {loop_time:.4f}s, '
+              f'speedup {loop_time / vectorized_time:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
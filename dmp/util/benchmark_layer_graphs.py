@@ -0,0 +1,84 @@
+'''
+Measures the time and memory used to build, scale and marshal Layer graphs
+like those of a DenseBySize sweep.
+
+    python -m dmp.util.benchmark_layer_graphs [num_networks]
+'''
+
+import sys
+import time
+import tracemalloc
+
+from dmp.layer import *
+from dmp.model.dense_by_size import DenseBySize
+from dmp.task.experiment.growth_experiment.scaling_method.width_scaler import WidthScaler
+
+
+def make_networks(num_networks: int) -> list:
+    networks = []
+    for i in range(num_networks):
+        networks.append(
+            DenseBySize(
+                Input({'shape': (32, )}),
+                Dense.make(10, {'activation': 'softmax'}),
+                'rectangle_residual',
+                2**(10 + i % 10),
+                2 + i % 19,
+                'integer',
+                Dense.make(
+                    -1, {
+                        'activation': 'relu',
+                        'kernel_initializer': 'GlorotUniform',
+                        'kernel_regularizer': {
+                            'class': 'L2',
+                            'l2': 1e-4,
+                        },
+                    }),
+            ).make_network())
+    return networks
+
+
+def run(num_networks: int) -> dict:
+    scaler = WidthScaler()
+    results = {}
+
+    start = time.perf_counter()
+    networks = make_networks(num_networks)
+    results['build'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scaled = [scaler.scale(n.structure, 0.5)[0] for n in networks]
+    results['scale'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    marshaled = [[layer.marshal() for layer in n.structure.topological_order]
+                 for n in networks]
+    results['marshal'] = time.perf_counter() - start
+    return results
+
+
+def measure_memory(num_networks: int) -> dict:
+    scaler = WidthScaler()
+    tracemalloc.start()
+    networks = make_networks(num_networks)
+    build_memory = tracemalloc.get_traced_memory()[0]
+    scaled = [scaler.scale(n.structure, 0.5)[0] for n in networks]
+    scale_memory = tracemalloc.get_traced_memory()[0] - build_memory
+    tracemalloc.stop()
+    return {'build': build_memory, 'scale': scale_memory}
+
+
+def main():
+    num_networks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    times = run(num_networks)
+    memory = measure_memory(num_networks)
+    print(f'{num_networks} networks:')
+    for name, seconds in times.items():
+        line = f'{name}: {seconds:.3f}s'
+        if name in memory:
+            line += f', {memory[name] / 2**20:.1f} MiB'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+'''
+Precomputes a DenseBySize width table for a sweep of shapes, depths,
+input and output sizes, and target sizes. Workers use the table when the
+environment variable DMP_DENSE_BY_SIZE_TABLE names it.
+
+    python -m dmp.util.precompute_dense_by_size_table table.npz \
+        --input-sizes 8 784 --num-outputs 1 10
+
+Sizes default to the powers of two used by the batch scripts. Inner and
+output layers are assumed to use biases, as Dense does by default. A
+residual shape (e.g. rectangle_residual) has the widths of its plain shape,
+so it is stored, and looked up, under the plain shape.
+'''
+
+import argparse
+import itertools
+import time
+
+from dmp.model.dense_by_size import split_residual_shape, check_dense_by_size_conformance, find_dense_widths_by_size
+from dmp.model.dense_by_size_table import write_dense_by_size_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', type=str, help='table file to write (.npz)')
+    parser.add_argument(
+        '--shapes',
+        type=str,
+        nargs='+',
+        default=[
+            'rectangle',
+            'trapezoid',
+            'exponential',
+            'wide_first_2x',
+            'wide_first_4x',
+            'wide_first_8x',
+            'wide_first_16x',
+        ],
+    )
+    parser.add_argument(
+        '--depths',
+        type=int,
+        nargs='+',
+        default=[2, 3, 4, 5, 6, 7, 8, 10, 12, 14, 16, 18, 20],
+    )
+    parser.add_argument('--input-sizes', type=int, nargs='+', required=True)
+    parser.add_argument('--num-outputs', type=int, nargs='+', required=True)
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[2**k for k in range(5, 28)],
+    )
+    parser.add_argument(
+        '--search-methods',
+        type=str,
+        nargs='+',
+        default=['integer'],
+    )
+    args = parser.parse_args()
+
+    # the table is keyed by plain shapes
+    shapes = list(
+        dict.fromkeys(split_residual_shape(shape)[0]
+                      for shape in args.shapes))
+
+    start = time.perf_counter()
+    table = {}
+    num_nonconformant = 0
+    for shape, depth, input_size, num_outputs, size, search_method in \
+        itertools.product(
+            shapes,
+            args.depths,
+            args.input_sizes,
+            args.num_outputs,
+            args.sizes,
+            args.search_methods,
+        ):
+        key = (shape, depth, input_size, num_outputs, size, search_method,
+               True, True)
+        entry = find_dense_widths_by_size(*key)
+        table[key] = entry
+        try:
+            check_dense_by_size_conformance(size, entry[1])
+        except ValueError:
+            num_nonconformant += 1
+
+    write_dense_by_size_table(args.path, table)
+    print(
+        f'Wrote {len(table)} entries ({num_nonconformant} non-conformant) to {args.path} in {time.perf_counter() - start:.2f}s.'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 import uuid
 import tensorflow
 from jobqueue.job import Job
 from jobqueue.job_queue import JobQueue
 from dmp import common
+from dmp.model.model_cache import ModelCache
 
 
 @dataclass
@@ -15,6 +16,7 @@ class Worker:
     _strategy: tensorflow.distribute.Strategy
     _worker_info: Dict[str, Any]
     _max_jobs: Optional[int] = None
+    _model_cache: ModelCache = field(default_factory=ModelCache)
 
     @property
     def strategy(self) -> tensorflow.distribute.Strategy:
@@ -24,6 +26,10 @@ class Worker:
     def worker_info(self) -> Dict[str, Any]:
         return self._worker_info
 
+    @property
+    def model_cache(self) -> ModelCache:
+        return self._model_cache
+
     @property
     def schema(self) -> 'PostgresSchema':
         return self._schema
@@ -51,9 +57,13 @@ class Worker:
         # run task
         result = task(self, job)
 
-        # log task run
+        # log task run (replicated experiments return one record per replica)
         if isinstance(result, ExperimentResultRecord):
             self._result_logger.log(result)
+        elif isinstance(result, list):
+            for record in result:
+                if isinstance(record, ExperimentResultRecord):
+                    self._result_logger.log(record)
 
         if self._max_jobs is not None:
             self._max_jobs -= 1
@@ -4,6 +4,7 @@ from .demarshaler import Demarshaler
 
 
 class CustomMarshalable(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def marshal(self) -> dict:
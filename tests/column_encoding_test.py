@@ -0,0 +1,130 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import pytest
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+
+from dmp.preprocessing.column_encoding import (
+    ColumnEncoder,
+    ColumnEncoding,
+    count_distinct_values,
+    encode_columns,
+)
+
+
+def make_one_hot_encoder():
+    try:
+        return OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+    except TypeError:
+        return OneHotEncoder(handle_unknown='ignore', sparse=False)
+
+
+def encode_column_by_column(values, encodings, fit_values=None):
+    # reference implementation: one scikit-learn preprocessor per column
+    if fit_values is None:
+        fit_values = values
+    results = []
+    for i, encoding in enumerate(encodings):
+        value = values[:, i:i + 1]
+        fit_value = fit_values[:, i:i + 1]
+        if encoding == ColumnEncoding.ignore:
+            continue
+        elif encoding == ColumnEncoding.zeros:
+            results.append(numpy.zeros_like(value))
+        elif encoding == ColumnEncoding.binary:
+            results.append((value == fit_value[0]).astype(numpy.int8))
+        elif encoding == ColumnEncoding.one_hot:
+            results.append(make_one_hot_encoder().fit(fit_value).transform(
+                value).astype(numpy.int8))
+        elif encoding == ColumnEncoding.min_max:
+            results.append(MinMaxScaler().fit(fit_value).transform(
+                value).astype(numpy.float32))
+    return numpy.hstack(results)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_encode_columns_matches_per_column_transforms(seed):
+    rng = numpy.random.default_rng(seed)
+    num_rows = 200
+    values = numpy.stack(
+        [
+            numpy.full(num_rows, 3.0),
+            rng.integers(0, 2, num_rows) * 5.0,
+            rng.integers(0, 15, num_rows).astype(numpy.float64),
+            rng.normal(size=num_rows),
+            rng.integers(-100, 100, num_rows).astype(numpy.float64),
+        ],
+        axis=1,
+    )
+
+    assert list(count_distinct_values(values)) == \
+        [numpy.unique(values[:, i]).size for i in range(values.shape[1])]
+
+    encodings = numpy.array([
+        ColumnEncoding.ignore,
+        ColumnEncoding.binary,
+        ColumnEncoding.one_hot,
+        ColumnEncoding.min_max,
+        ColumnEncoding.min_max,
+    ])
+    expected = encode_column_by_column(values, encodings)
+    actual = encode_columns(values, encodings)
+    assert actual.dtype == expected.dtype
+    assert numpy.array_equal(actual, expected)
+
+    encodings[0] = ColumnEncoding.zeros
+    encodings[3] = ColumnEncoding.one_hot
+    expected = encode_column_by_column(values, encodings)
+    actual = encode_columns(values, encodings)
+    assert actual.dtype == expected.dtype
+    assert numpy.array_equal(actual, expected)
+
+
+def test_encode_columns_object_values():
+    values = numpy.array(
+        [['a', 'b', 1.0], ['c', 'b', 2.0], ['a', 'd', 3.0]],
+        dtype=object,
+    )
+    encodings = numpy.array([ColumnEncoding.one_hot] * 3)
+    assert numpy.array_equal(
+        encode_columns(values, encodings),
+        encode_column_by_column(values, encodings),
+    )
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_column_encoder_applies_fit_to_other_splits(seed):
+    rng = numpy.random.default_rng(seed)
+
+    def make_values(num_rows, num_categories):
+        return numpy.stack(
+            [
+                rng.integers(0, 2, num_rows) * 5.0,
+                rng.integers(0, num_categories, num_rows).astype(
+                    numpy.float64),
+                rng.integers(0, num_categories, num_rows).astype(
+                    numpy.float64),
+                rng.normal(size=num_rows),
+            ],
+            axis=1,
+        )
+
+    train = make_values(100, 6)
+    test = make_values(50, 9)  # includes categories not seen in train
+    encodings = numpy.array([
+        ColumnEncoding.binary,
+        ColumnEncoding.one_hot,
+        ColumnEncoding.one_hot,
+        ColumnEncoding.min_max,
+    ])
+    encoder = ColumnEncoder(train, encodings)
+    assert numpy.array_equal(
+        encoder.forward(train),
+        encode_column_by_column(train, encodings),
+    )
+    assert numpy.array_equal(
+        encoder.forward(test),
+        encode_column_by_column(test, encodings, train),
+    )
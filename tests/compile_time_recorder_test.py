@@ -0,0 +1,42 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import pytest
+
+from dmp.task.experiment.recorder.compile_time_recorder import CompileTimeRecorder
+from dmp.task.experiment.recorder.timestamp_recorder import TimestampRecorder
+from tests.keras_test_util import make_dataset, make_keras_model
+
+
+@pytest.mark.parametrize('jit_compile', [False, True])
+def test_compile_times_are_recorded_at_the_first_epoch(jit_compile):
+    rng = numpy.random.default_rng(0)
+    model = make_keras_model()
+    model.compile(
+        loss='categorical_crossentropy',
+        optimizer='adam',
+        jit_compile=jit_compile,
+        steps_per_execution=4,
+    )
+    timestamp_recorder = TimestampRecorder('_ms', 'epoch_start', 'train')
+    recorder = CompileTimeRecorder('_ms', 'train_compile', 'validation_compile')
+    model.fit(
+        make_dataset(rng, 256, 16),
+        validation_data=make_dataset(rng, 64, 16),
+        epochs=3,
+        verbose=0,
+        callbacks=[timestamp_recorder, recorder],
+    )
+
+    assert recorder.epoch == [0]
+    for metric in ('train_compile_ms', 'validation_compile_ms'):
+        compile_ms, = recorder.history[metric]
+        assert compile_ms >= 0
+    assert recorder.history['train_compile_ms'][0] <= \
+        timestamp_recorder.history['train_ms'][0]
+
+    # the recorder's timing wrappers are removed after training
+    for function in (model.train_function, model.test_function):
+        assert function.__name__ != 'timed_function'
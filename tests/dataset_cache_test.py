@@ -0,0 +1,223 @@
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, './')
+
+import numpy
+import pytest
+
+from dmp.dataset.dataset import Dataset
+from dmp.dataset.dataset_cache import (
+    DatasetCache,
+    get_cache_statistics,
+    get_dataset_size,
+    make_cache_key,
+    manifest_filename,
+    read_dataset,
+    write_dataset,
+)
+from dmp.dataset.dataset_group import DatasetGroup
+from dmp.dataset.ml_task import MLTask
+
+
+def make_dataset(seed, size=1000):
+    rng = numpy.random.default_rng(seed)
+    return Dataset(
+        MLTask.classification,
+        train=DatasetGroup(
+            rng.normal(size=(size, 8)).astype(numpy.float32),
+            rng.integers(0, 3, size),
+        ),
+    )
+
+
+def fail_to_fetch():
+    raise AssertionError('fetched a cached dataset')
+
+
+def assert_same_dataset(data, expected):
+    assert data.ml_task == expected.ml_task
+    numpy.testing.assert_array_equal(data.train.inputs, expected.train.inputs)
+    numpy.testing.assert_array_equal(data.train.outputs,
+                                     expected.train.outputs)
+
+
+def test_write_and_read_dataset(tmp_path):
+    expected = make_dataset(0)
+    expected.test = DatasetGroup(
+        numpy.array([{'a': 1}, None], dtype=object),
+        numpy.zeros(2),
+    )
+    path = str(tmp_path / 'entry')
+
+    num_bytes = write_dataset(path, expected)
+    data = read_dataset(path)
+
+    assert num_bytes >= get_dataset_size(expected)
+    assert_same_dataset(data, expected)
+    assert isinstance(data.train.inputs, numpy.memmap)
+    assert not data.train.inputs.flags.writeable
+    # object arrays are pickled instead of mapped
+    assert not isinstance(data.test.inputs, numpy.memmap)
+    assert data.test.inputs.tolist() == [{'a': 1}, None]
+    with open(os.path.join(path, manifest_filename)) as file:
+        manifest = json.load(file)
+    assert manifest['splits']['train']['inputs']['mmap']
+    assert not manifest['splits']['test']['inputs']['mmap']
+
+
+def test_leftover_temp_directories_are_not_entries(tmp_path):
+    cache = DatasetCache('test_cache', str(tmp_path))
+    # a writer that crashed before renaming its entry into place
+    crashed_path = cache.get_path('a') + '.tmp-1-0'
+    write_dataset(crashed_path, make_dataset(1))
+    os.remove(os.path.join(crashed_path, manifest_filename))
+
+    data = cache.load('a', lambda: make_dataset(0))
+
+    assert_same_dataset(data, make_dataset(0))
+    assert_same_dataset(cache.load('a', fail_to_fetch), make_dataset(0))
+    assert cache.statistics.misses == 1
+    assert cache.statistics.hits == 1
+
+
+def test_failed_writes_leave_no_entry(tmp_path):
+    cache = DatasetCache('test_cache', str(tmp_path))
+
+    def write_entry(path):
+        write_dataset(path, make_dataset(0))
+        raise OSError('disk full')
+
+    with pytest.raises(FileNotFoundError):
+        cache.load_entry('a', write_entry)
+    assert os.listdir(tmp_path) == ['a.lock']
+
+
+def load_cached_dataset(directory):
+    # runs in another process, which must read the entry the test writes
+    cache = DatasetCache('test_cache', directory)
+    data = cache.load('a', fail_to_fetch)
+    assert_same_dataset(data, make_dataset(0))
+    sys.exit(0 if cache.statistics.hits == 1 else 1)
+
+
+def test_readers_wait_for_the_writer(tmp_path):
+    cache = DatasetCache('test_cache', str(tmp_path))
+    context = multiprocessing.get_context('fork')
+    with cache._lock('a'):
+        reader = context.Process(
+            target=load_cached_dataset,
+            args=(str(tmp_path), ),
+        )
+        reader.start()
+        time.sleep(0.5)
+        assert reader.is_alive()  # waiting for the lock
+        cache.write('a', make_dataset(0))
+    reader.join(30)
+    assert reader.exitcode == 0
+
+
+def test_corrupt_entries_are_misses(tmp_path):
+    cache = DatasetCache('test_cache', str(tmp_path))
+    cache.write('a', make_dataset(1))
+    with open(os.path.join(cache.get_path('a'), manifest_filename),
+              'r+') as file:
+        file.truncate(10)
+    # an entry renamed into place without its manifest
+    cache.write('b', make_dataset(1))
+    os.remove(os.path.join(cache.get_path('b'), manifest_filename))
+
+    assert cache.try_read('a') is None
+    assert not os.path.exists(cache.get_path('a'))
+    assert cache.try_read('b') is None
+    for key in ('a', 'b'):
+        data = cache.load(key, lambda: make_dataset(0))
+        assert_same_dataset(data, make_dataset(0))
+    assert cache.statistics.misses == 2
+    assert_same_dataset(cache.load('b', fail_to_fetch), make_dataset(0))
+
+
+def test_cache_statistics(tmp_path):
+    cache = DatasetCache('counted_cache', str(tmp_path))
+    cache.load('a', lambda: make_dataset(0))
+    cache.load('a', fail_to_fetch)
+    cache.load('a', fail_to_fetch)
+
+    statistics = get_cache_statistics()
+    assert statistics['counted_cache_misses'] == 1
+    assert statistics['counted_cache_hits'] == 2
+    assert statistics['counted_cache_bytes_read'] == \
+        2 * get_dataset_size(make_dataset(0))
+    assert statistics['counted_cache_bytes_written'] > 0
+
+
+def test_raw_and_prepared_caches_share_a_directory(tmp_path):
+    raw_cache = DatasetCache('raw_cache', str(tmp_path))
+    prepared_cache = DatasetCache('prepared_cache', str(tmp_path))
+    parameters = {'type': 'Loader', 'dataset_name': 'test'}
+    raw_key = make_cache_key('source_test', 0, parameters)
+    prepared_key = make_cache_key('source_test_prepared', 1, parameters)
+    assert raw_key != prepared_key
+
+    raw_cache.load(raw_key, lambda: make_dataset(0))
+    prepared_cache.load(prepared_key, lambda: make_dataset(1))
+
+    assert_same_dataset(raw_cache.load(raw_key, fail_to_fetch),
+                        make_dataset(0))
+    assert_same_dataset(prepared_cache.load(prepared_key, fail_to_fetch),
+                        make_dataset(1))
+    assert raw_cache.statistics.hits == prepared_cache.statistics.hits == 1
+
+
+def test_entries_that_do_not_fit_are_not_cached(tmp_path):
+    entry_size = get_dataset_size(make_dataset(0))
+    cache = DatasetCache('test_cache', str(tmp_path), int(entry_size * 1.5))
+
+    data = cache.load_mapped('big', lambda: make_dataset(0, 2000))
+
+    assert data.train.size == 2000
+    assert not os.path.exists(cache.get_path('big'))
+    assert cache.statistics.skipped_writes == 1
+
+
+def test_least_recently_read_unheld_entry_is_evicted(tmp_path):
+    entry_size = get_dataset_size(make_dataset(0))
+    cache = DatasetCache('test_cache', str(tmp_path), int(entry_size * 2.5))
+
+    loaded = [
+        cache.load_mapped(key, lambda: make_dataset(0)) for key in ('a', 'b')
+    ]
+    del loaded
+    gc.collect()
+
+    time.sleep(0.05)
+    cache.load_mapped('a', lambda: make_dataset(0))  # now b is the oldest
+    cache.load_mapped('c', lambda: make_dataset(0))
+
+    assert os.path.exists(cache.get_path('a'))
+    assert not os.path.exists(cache.get_path('b'))
+    assert os.path.exists(cache.get_path('c'))
+    assert cache.statistics.evictions == 1
+
+
+def test_held_entries_are_not_evicted(tmp_path):
+    entry_size = get_dataset_size(make_dataset(0))
+    cache = DatasetCache('test_cache', str(tmp_path), int(entry_size * 1.5))
+
+    held = cache.load_mapped('a', lambda: make_dataset(0))
+    data = cache.load_mapped('b', lambda: make_dataset(1))
+
+    assert os.path.exists(cache.get_path('a'))
+    assert not os.path.exists(cache.get_path('b'))
+    assert data.train.size == 1000
+
+    del held
+    gc.collect()
+    cache.load_mapped('b', lambda: make_dataset(1))
+
+    assert not os.path.exists(cache.get_path('a'))
+    assert os.path.exists(cache.get_path('b'))
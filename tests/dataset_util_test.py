@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+# Runs in a new interpreter, where nothing has imported tensorflow yet. The
+# names are those the registry listed before it was made lazy.
+_check_registry = '''
+import csv
+import sys
+
+from dmp.dataset import dataset_util
+from dmp.dataset.ml_task import MLTask
+
+assert 'tensorflow' not in sys.modules
+
+with open('dmp/dataset/pmlb.csv', newline='') as file:
+    pmlb_tasks = {
+        row['Dataset']: MLTask(row['Task']) for row in csv.DictReader(file)
+    }
+pmlb_tasks['201_pol'] = MLTask.classification
+pmlb_tasks['294_satellite_image'] = MLTask.classification
+for name, ml_task in pmlb_tasks.items():
+    loader = dataset_util.get_dataset_loader('pmlb', name)
+    assert loader.dataset_name == name, name
+    assert loader.ml_task == ml_task, name
+assert type(dataset_util.get_dataset_loader('pmlb', 'mnist')).__name__ == \\
+    'FunctionalPMLBDatasetLoader'
+
+sources = {
+    ('keras', 'keras_uint8'): ['mnist', 'fashion_mnist', 'cifar10', 'cifar100'],
+    ('imagenet', 'imagenet_uint8', 'imagenet_streaming'): [
+        'imagenet_16', 'imagenet_16_120', 'imagenet_32', 'imagenet_32_120'
+    ],
+    ('synthetic', ): [
+        'GaussianClassificationDataset_2_10_100',
+        'GaussianRegressionDataset_20_100',
+    ],
+    ('tensorflow', ): ['colorectal_histology', 'eurosat_rgb'],
+}
+for source_names, names in sources.items():
+    for source in source_names:
+        for name in names:
+            loader = dataset_util.get_dataset_loader(source, name)
+            assert loader.dataset_name == name, (source, name)
+            assert dataset_util.get_dataset_loader(source, name) is loader
+
+assert 'tensorflow' not in sys.modules
+'''
+
+
+def test_registry_names_without_tensorflow():
+    result = subprocess.run(
+        [sys.executable, '-c', _check_registry],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,109 @@
+import sys
+
+sys.path.insert(0, './')
+
+import pytest
+
+from dmp.layer import *
+from dmp.layer.flatten import Flatten
+from dmp.model.dense_by_size import DenseBySize, _get_widths_factory, find_dense_widths_by_size
+from dmp.model.dense_by_size_table import read_dense_by_size_table, write_dense_by_size_table
+from dmp.model.fully_connected_network import FullyConnectedNetwork
+from dmp.model.model_util import find_closest_network_to_target_size_float, find_closest_network_to_target_size_int
+
+
+@pytest.mark.parametrize('shape', [
+    'rectangle',
+    'trapezoid',
+    'exponential',
+    'wide_first_4x',
+    'rectangle_residual',
+])
+@pytest.mark.parametrize('search_method', ['integer', 'float'])
+@pytest.mark.parametrize('use_bias', [True, False])
+def test_dense_by_size_matches_layer_graph_search(shape, search_method,
+                                                  use_bias):
+    depth = 4
+    size = 20000
+
+    def make_spec():
+        return DenseBySize(
+            Input({'shape': (8, 4)}),
+            Dense.make(3, {'use_bias': use_bias}),
+            shape,
+            size,
+            depth,
+            search_method,
+            Dense.make(-1, {'use_bias': not use_bias}),
+        )
+
+    network = make_spec().make_network()
+
+    # reference: build and count a Layer graph for every probe
+    spec = make_spec()
+    widths_factory = _get_widths_factory(shape.replace('_residual', ''))
+    search_func = find_closest_network_to_target_size_int \
+        if search_method == 'integer' else find_closest_network_to_target_size_float
+    delta, expected = search_func(
+        size,
+        lambda scale: FullyConnectedNetwork(
+            Flatten({}, [spec.input]),
+            spec.output,
+            widths_factory(depth, 3, scale),
+            'none',
+            False,
+            spec.inner,
+        ).make_network(),
+    )
+
+    assert network.description == expected.description
+    assert network.num_free_parameters == expected.num_free_parameters
+
+
+def test_dense_by_size_table_round_trip(tmp_path):
+    table = {}
+    for shape in ['rectangle', 'exponential', 'wide_first_4x']:
+        for search_method in ['integer', 'float']:
+            key = (shape, 3, 32, 2, 4096, search_method, True, True)
+            table[key] = find_dense_widths_by_size(*key)
+
+    # a float search can find integral float widths
+    table[('wide_first_2x', 3, 32, 2, 4096, 'float', True, False)] = \
+        ((54.0, 27, 2), 3000.0)
+
+    path = str(tmp_path / 'table.npz')
+    write_dense_by_size_table(path, table)
+    read_table = read_dense_by_size_table(path)
+    assert read_table == table
+
+    def get_types(entry):
+        widths, num_free_parameters = entry
+        return [type(width) for width in widths], type(num_free_parameters)
+
+    for key, entry in table.items():
+        assert get_types(read_table[key]) == get_types(entry)
+
+
+def test_precomputed_table_stores_residual_shapes_as_plain(
+        tmp_path, monkeypatch):
+    from dmp.util import precompute_dense_by_size_table
+    path = str(tmp_path / 'table.npz')
+    monkeypatch.setattr(sys, 'argv', [
+        'precompute_dense_by_size_table',
+        path,
+        '--shapes',
+        'rectangle_residual',
+        'rectangle',
+        '--depths',
+        '3',
+        '--input-sizes',
+        '32',
+        '--num-outputs',
+        '2',
+        '--sizes',
+        '4096',
+    ])
+    precompute_dense_by_size_table.main()
+    table = read_dense_by_size_table(path)
+    assert list(table) == [('rectangle', 3, 32, 2, 4096, 'integer', True,
+                            True)]
@@ -0,0 +1,41 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+
+from dmp.dataset.gaussian_data import (
+    collect_chunks,
+    generate_classification_chunks,
+    generate_regression_chunks,
+)
+
+
+def test_collect_chunks():
+    centers = numpy.zeros((3, 4))
+    centers[:, 0] = [0, 100, 200]
+    inputs, labels = collect_chunks(
+        generate_classification_chunks(
+            numpy.random.default_rng(0), centers, 1.0, 20, 7),
+        20,
+    )
+    assert inputs.shape == (20, 4)
+    assert labels.shape == (20, )
+    # every sample was filled in, near its class's center
+    numpy.testing.assert_allclose(inputs[:, 0], labels * 100, atol=10)
+
+
+def test_collect_no_samples():
+    rng = numpy.random.default_rng(0)
+    inputs, labels = collect_chunks(
+        generate_classification_chunks(rng, numpy.zeros((3, 4)), 1.0, 0), 0)
+    assert inputs.shape == (0, 4)
+    assert labels.shape == (0, )
+
+    inputs, outputs = collect_chunks(
+        generate_regression_chunks(rng, numpy.ones(5), 1.0, 0), 0)
+    assert inputs.shape == (0, 5)
+    assert outputs.shape == (0, )
+
+    inputs, outputs = collect_chunks(iter([]), 0)
+    assert inputs.shape == outputs.shape == (0, )
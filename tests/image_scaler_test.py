@@ -0,0 +1,19 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+
+from dmp.preprocessing.image_scaler import ImageScaler
+
+
+def test_tensor_path_matches_forward():
+    images = numpy.arange(256, dtype=numpy.uint8).reshape(4, 8, 8, 1)
+    scaler = ImageScaler()
+
+    expected = scaler.forward(images)
+    scaled = scaler.forward_tensor(images).numpy()
+
+    assert scaled.dtype == expected.dtype == numpy.float16
+    numpy.testing.assert_array_equal(scaled, expected)
+    numpy.testing.assert_array_equal(scaler.backward(scaled), images)
@@ -0,0 +1,23 @@
+'''
+Shared fixtures for tests that train small keras models: a classification
+dataset of 8 features and 3 one-hot classes, and a model that fits it.
+'''
+
+import numpy
+import tensorflow
+import tensorflow.keras as keras
+
+
+def make_dataset(rng, size, batch_size=32):
+    inputs = rng.normal(size=(size, 8)).astype(numpy.float32)
+    outputs = numpy.eye(3, dtype=numpy.float32)[rng.integers(0, 3, size)]
+    return tensorflow.data.Dataset.from_tensor_slices(
+        (inputs, outputs)).batch(batch_size)
+
+
+def make_keras_model(**hidden_layer_options):
+    return keras.Sequential([
+        keras.Input((8, )),
+        keras.layers.Dense(16, activation='relu', **hidden_layer_options),
+        keras.layers.Dense(3, activation='softmax'),
+    ])
@@ -0,0 +1,29 @@
+import sys
+
+sys.path.insert(0, './')
+
+import copy
+
+from dmp.layer import *
+
+
+def test_equal_layer_configs_are_shared_and_copied_on_write():
+    regularizer = {'class': 'L2', 'l2': 1e-4}
+    a = Dense.make(8, {'kernel_regularizer': regularizer.copy()})
+    b = Dense.make(8, {'kernel_regularizer': regularizer.copy()})
+    assert a.config is b.config
+    assert not hasattr(a, '__dict__')
+
+    c = copy.copy(a)
+    c['units'] = 16
+    assert a['units'] == 8 and b['units'] == 8 and c['units'] == 16
+    assert c.config is not a.config
+
+    c['units'] = 8
+    assert c.config is a.config
+
+    # values of different types are not merged
+    d = Dense.make(8, {'kernel_regularizer': regularizer.copy()})
+    d['use_bias'] = 1
+    assert d.config is not a.config
+    assert d['use_bias'] == 1 and type(d['use_bias']) is int
@@ -0,0 +1,123 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import tensorflow.keras as keras
+
+from dmp.model.model_cache import ModelCache, make_model_cache_key
+from dmp.model.model_info import ModelInfo
+from tests.keras_test_util import make_dataset, make_keras_model
+
+
+def make_model(seed):
+    keras.utils.set_random_seed(seed)
+    return ModelInfo(None, None, make_keras_model())  # type: ignore
+
+
+def compile_model(model, learning_rate=0.01):
+    model.keras_model.compile(
+        loss='categorical_crossentropy',
+        optimizer=keras.optimizers.Adam(learning_rate),
+        metrics=['accuracy'],
+    )
+
+
+def train(model):
+    history = model.keras_model.fit(
+        make_dataset(numpy.random.default_rng(0), 256),
+        epochs=3,
+        verbose=0,
+    )
+    return model.keras_model.get_weights(), history.history
+
+
+def make_key(**settings):
+    key_settings = {
+        'structure': {'type': 'Dense', 'units': 16},
+        'precision': 'float32',
+        'loss': {'class': 'CategoricalCrossentropy'},
+        'optimizer': {'class': 'Adam', 'learning_rate': 0.01},
+        'compile_options': {},
+        'metrics': ['accuracy'],
+    }
+    key_settings.update(settings)
+    return make_model_cache_key(**key_settings)
+
+
+def test_cache_key_leaves_out_only_numeric_learning_rates():
+    key, learning_rate = make_key()
+    assert learning_rate == 0.01
+    assert make_key(optimizer={'class': 'Adam', 'learning_rate': 0.1}) == \
+        (key, 0.1)
+
+    schedule = {'class': 'ExponentialDecay'}
+    schedule_key, learning_rate = make_key(optimizer={
+        'class': 'Adam',
+        'learning_rate': schedule,
+    })
+    assert learning_rate is None
+    assert schedule_key != key
+
+    for settings in (
+        {'structure': {'type': 'Dense', 'units': 32}},
+        {'precision': 'float16'},
+        {'loss': {'class': 'MeanSquaredError'}},
+        {'optimizer': {'class': 'SGD', 'learning_rate': 0.01}},
+        {'compile_options': {'jit_compile': True}},
+        {'compile_options': {'steps_per_execution': 8}},
+        {'metrics': ['accuracy', keras.metrics.AUC()]},
+    ):
+        assert make_key(**settings)[0] != key
+
+
+def test_reused_model_trains_like_a_new_model():
+    cache = ModelCache()
+    key, learning_rate = make_key()
+    first = cache.load(key, make_model(0), compile_model, learning_rate)
+    train(first)
+    train_function = first.keras_model.train_function
+
+    for seed, learning_rate in ((1, 0.01), (2, 0.001)):
+        job_key, job_learning_rate = make_key(optimizer={
+            'class': 'Adam',
+            'learning_rate': learning_rate,
+        })
+        reused = cache.load(
+            job_key,
+            make_model(seed),
+            compile_model,
+            job_learning_rate,
+        )
+        assert reused.keras_model is first.keras_model
+        weights, history = train(reused)
+        assert reused.keras_model.train_function is train_function
+        numpy.testing.assert_allclose(
+            float(reused.keras_model.optimizer.learning_rate),
+            learning_rate,
+        )
+
+        expected = make_model(seed)
+        compile_model(expected, learning_rate)
+        expected_weights, expected_history = train(expected)
+        for actual, desired in zip(weights, expected_weights):
+            numpy.testing.assert_allclose(actual, desired, atol=1e-5)
+        for metric, values in expected_history.items():
+            numpy.testing.assert_allclose(history[metric], values, rtol=1e-5)
+
+    assert cache.statistics.hits == 2
+    assert cache.statistics.misses == 1
+
+
+def test_least_recently_used_model_is_evicted():
+    cache = ModelCache(max_size=2)
+    first = cache.load('a', make_model(0), compile_model)
+    cache.load('b', make_model(0), compile_model)
+    assert cache.load('a', make_model(0), compile_model) is not None
+    cache.load('c', make_model(0), compile_model)  # evicts b
+    assert cache.statistics.evictions == 1
+    assert cache.load('a', make_model(0), compile_model).keras_model \
+        is first.keras_model
+    assert cache.statistics.hits == 2
+    cache.load('b', make_model(0), compile_model)
+    assert cache.statistics.misses == 4
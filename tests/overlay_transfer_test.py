@@ -0,0 +1,92 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import pytest
+import tensorflow.keras as keras
+
+from dmp.layer import *
+from dmp.model.keras_layer_info import KerasLayerInfo
+from dmp.task.experiment.growth_experiment.layer_growth_info import LayerGrowthInfo
+from dmp.task.experiment.growth_experiment.transfer_method.overlay_transfer import OverlayTransfer
+
+
+def scale_block(block, scale):
+    if scale == 0.0:
+        block[:] = 0
+    elif scale != 1.0:
+        block[:] *= scale
+
+
+def overlay_on_host(transfer, src_params, dst_params):
+    # reference implementation on numpy copies of the weights
+    for src, dst in zip(src_params, dst_params):
+        channels_out = src.shape[-1]
+        if src.ndim == src_params[0].ndim:
+            channels_in = src.shape[-2]
+            old_to_old = dst[..., :channels_in, :channels_out]
+            scale_block(dst[..., :channels_in, channels_out:],
+                        transfer.old_to_new_scale)
+            scale_block(dst[..., channels_in:, :channels_out],
+                        transfer.new_to_old_scale)
+            scale_block(dst[..., channels_in:, channels_out:],
+                        transfer.new_to_new_scale)
+        else:
+            old_to_old = dst[..., :channels_out]
+            scale_block(dst[..., channels_out:], transfer.new_to_new_scale)
+
+        if transfer.old_to_old_scale == 0.0:
+            old_to_old[:] = 0
+        else:
+            scale_block(old_to_old, transfer.new_add_to_old_scale)
+            old_to_old += src * transfer.old_to_old_scale
+    return dst_params
+
+
+def make_layer_info(layer, keras_layer, input_shape):
+    keras_layer.build(input_shape)
+    return KerasLayerInfo(layer, keras_layer, None)  # type: ignore
+
+
+@pytest.mark.parametrize('transfer', [
+    OverlayTransfer(),
+    OverlayTransfer(0.5, 0.25, 2.0, 0.0, 0.5),
+    OverlayTransfer(0.0, 0.0, 1.0, 3.0, 1.0),
+])
+@pytest.mark.parametrize('kind', ['dense', 'conv'])
+def test_overlay_matches_host_blend(transfer, kind):
+    if kind == 'dense':
+        src = make_layer_info(Dense.make(3, {}), keras.layers.Dense(3),
+                              (None, 4))
+        dst = make_layer_info(Dense.make(7, {}), keras.layers.Dense(7),
+                              (None, 6))
+    else:
+        src = make_layer_info(
+            DenseConv.make(3, [3, 3], [1, 1], {}),
+            keras.layers.Conv2D(3, 3),
+            (None, 8, 8, 2),
+        )
+        dst = make_layer_info(
+            DenseConv.make(5, [3, 3], [1, 1], {}),
+            keras.layers.Conv2D(5, 3),
+            (None, 8, 8, 4),
+        )
+
+    rng = numpy.random.default_rng(0)
+    for keras_layer in (src.keras_layer, dst.keras_layer):
+        keras_layer.set_weights([  # type: ignore
+            rng.normal(size=w.shape).astype(numpy.float32)
+            for w in keras_layer.get_weights()  # type: ignore
+        ])
+
+    expected = overlay_on_host(
+        transfer,
+        src.keras_layer.get_weights(),  # type: ignore
+        dst.keras_layer.get_weights(),  # type: ignore
+    )
+    transfer.transfer([LayerGrowthInfo(src, dst)])
+    for actual, expected_weights in zip(
+            dst.keras_layer.get_weights(),  # type: ignore
+            expected):
+        numpy.testing.assert_allclose(actual, expected_weights, rtol=1e-6)
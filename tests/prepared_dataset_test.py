@@ -0,0 +1,73 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+
+from dmp.dataset.dataset_group import DatasetGroup
+from dmp.dataset.ml_task import MLTask
+from dmp.dataset.prepared_dataset import (
+    add_label_noise,
+    default_pipeline_config,
+    make_tensorflow_dataset,
+)
+
+
+def test_regression_noise_draws_each_column_in_turn():
+    outputs = numpy.random.default_rng(0).normal(size=(100, 3)) * [1, 2, 3]
+    expected = outputs.copy()
+    numpy.random.seed(1)
+    noise_std = numpy.std(expected, axis=0) * 0.1
+    for i in range(expected.shape[1]):
+        expected[:, i] += numpy.random.normal(
+            loc=0, scale=noise_std[i], size=expected[:, i].shape)
+
+    numpy.random.seed(1)
+    add_label_noise(0.1, MLTask.regression, outputs)
+
+    numpy.testing.assert_array_equal(outputs, expected)
+
+
+def test_regression_noise_of_one_dimensional_outputs():
+    outputs = numpy.random.default_rng(0).normal(size=100)
+    expected = outputs.copy()
+    numpy.random.seed(1)
+    expected += numpy.random.normal(
+        loc=0, scale=numpy.std(expected) * 0.1, size=expected.shape)
+
+    numpy.random.seed(1)
+    add_label_noise(0.1, MLTask.regression, outputs)
+
+    numpy.testing.assert_array_equal(outputs, expected)
+
+
+def test_one_hot_noise_moves_labels_to_other_classes():
+    classes = numpy.random.default_rng(0).integers(0, 4, 200)
+    outputs = numpy.eye(4, dtype=numpy.int64)[classes]
+
+    numpy.random.seed(1)
+    add_label_noise(0.25, MLTask.classification, outputs)
+
+    assert (outputs.sum(axis=1) == 1).all()
+    assert (numpy.argmax(outputs, axis=1) != classes).sum() == 50
+
+
+def test_unshuffled_streamed_sets_leave_the_global_seed_alone():
+    inputs = numpy.arange(20, dtype=numpy.float32).reshape(10, 2)
+    group = DatasetGroup(inputs, numpy.arange(5), numpy.arange(5) * 2)
+    pipeline = default_pipeline_config.copy()
+    pipeline['shuffle_buffer_size'] = 10
+
+    numpy.random.seed(0)
+    expected = numpy.random.randint(2**31)
+    numpy.random.seed(0)
+    test_set = make_tensorflow_dataset(group, 2, pipeline, False)
+    assert numpy.random.randint(2**31) == expected
+
+    batches = [batch_inputs.numpy() for batch_inputs, _ in test_set]
+    numpy.testing.assert_array_equal(
+        numpy.concatenate(batches), inputs[::2])
+
+    numpy.random.seed(0)
+    make_tensorflow_dataset(group, 2, pipeline, True)
+    assert numpy.random.randint(2**31) != expected
@@ -0,0 +1,161 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import pytest
+import tensorflow.keras as keras
+
+from dmp.keras_interface.layer_to_keras import make_keras_model_from_network
+from dmp.layer import *
+from dmp.model.network_info import NetworkInfo
+from dmp.task.experiment.training_experiment.replicated_training import (
+    ReplicatedEarlyStopping,
+    get_replica_metric,
+    has_regularizers,
+    make_replicated_keras_model,
+    replicate_outputs,
+    split_replica_history,
+)
+from tests.keras_test_util import make_dataset
+
+
+def make_network():
+    input = Input({'shape': (8, )})
+    hidden = Dense.make(16, {}, [input])
+    return NetworkInfo(Dense.make(3, {'activation': 'softmax'}, [hidden]), {})
+
+
+def make_replica(network, seed, name=None):
+    keras.utils.set_random_seed(seed)
+    return make_keras_model_from_network(network, name)
+
+
+def compile_model(keras_model):
+    keras_model.compile(
+        loss={
+            name: 'categorical_crossentropy'
+            for name in keras_model.output_names
+        },
+        optimizer=keras.optimizers.Adam(0.01),
+    )
+
+
+def test_replicas_train_like_separate_models():
+    dataset = make_dataset(numpy.random.default_rng(0), 256)
+
+    network = make_network()
+    seeds = [3, 4, 5]
+    replicas = [
+        make_replica(network, seed, f'replica_{i}')
+        for i, seed in enumerate(seeds)
+    ]
+    model = make_replicated_keras_model(replicas)
+    compile_model(model)
+    history = model.fit(
+        replicate_outputs(dataset, len(seeds)),
+        epochs=3,
+        verbose=0,
+    ).history
+    assert 'replica_2_loss' in history
+
+    for seed, replica in zip(seeds, replicas):
+        separate = make_replica(network, seed).keras_model
+        compile_model(separate)
+        separate.fit(dataset, epochs=3, verbose=0)
+        for actual, expected in zip(replica.keras_model.get_weights(),
+                                    separate.get_weights()):
+            numpy.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+@pytest.mark.parametrize('restore_best_weights', [False, True])
+def test_replicated_early_stopping_stops_each_replica(restore_best_weights):
+    network = make_network()
+    replica_models = [
+        make_replica(network, i, f'replica_{i}').keras_model
+        for i in range(2)
+    ]
+    model = make_replicated_keras_model(
+        [make_keras_model_from_network(network) for _ in range(2)])
+    callback = ReplicatedEarlyStopping(
+        [
+            keras.callbacks.EarlyStopping(
+                monitor=get_replica_metric('val_loss', m.name),
+                patience=0,
+                mode='min',
+                restore_best_weights=restore_best_weights,
+            ) for m in replica_models
+        ],
+        replica_models,
+    )
+    callback.set_model(model)
+    model.stop_training = False
+    callback.on_train_begin()
+
+    losses = [[3.0, 2.0, 2.5, 1.0], [3.0, 3.5, 1.0, 0.5]]
+    best_weights = replica_models[1].get_weights()
+    stopped_weights = None
+    for epoch in range(4):
+        callback.on_epoch_end(
+            epoch, {
+                f'val_replica_{i}_loss': replica_losses[epoch]
+                for i, replica_losses in enumerate(losses)
+            })
+        if epoch == 1:
+            stopped_weights = replica_models[1].get_weights()
+            assert not model.stop_training
+        replica_models[1].set_weights(
+            [w + 1 for w in replica_models[1].get_weights()])
+        if epoch == 2:
+            break
+
+    assert callback.stopped_epochs == [2, 1]
+    assert model.stop_training
+    callback.on_train_end()
+    # a single run ends with the best weights, from before replica 1's loss
+    # went up, if restore_best_weights is set
+    expected_weights = best_weights if restore_best_weights else \
+        stopped_weights
+    for actual, expected in zip(replica_models[1].get_weights(),
+                                expected_weights):  # type: ignore
+        numpy.testing.assert_array_equal(actual, expected)
+
+
+def test_split_replica_history():
+    history = {
+        'epoch': [0, 1, 2, 3],
+        'train_ms': [1, 2, 3, 4],
+        'train_loss': [9, 9, 9, 9],  # total of both replicas
+        'train_replica_0_loss': [4, 3, 2, 1],
+        'test_replica_0_accuracy': [0.1, None, 0.3, 0.4],
+        'train_replica_1_loss': [5, 4, 3, 2],
+        'test_replica_1_accuracy': [0.2, None, 0.4, 0.5],
+    }
+    replica_0, replica_1 = split_replica_history(history, 'replica', 2,
+                                                 'epoch', [None, 2])
+    assert replica_0 == {
+        'epoch': [0, 1, 2, 3],
+        'train_ms': [1, 2, 3, 4],
+        'train_loss': [4, 3, 2, 1],
+        'test_accuracy': [0.1, None, 0.3, 0.4],
+    }
+    assert replica_1 == {
+        'epoch': [0, 1, 2],
+        'train_ms': [1, 2, 3],
+        'train_loss': [5, 4, 3],
+        'test_accuracy': [0.2, None, 0.4],
+    }
+
+
+@pytest.mark.parametrize('regularizer', [
+    'kernel_regularizer',
+    'bias_regularizer',
+    'activity_regularizer',
+])
+def test_regularized_networks_have_regularizers(regularizer):
+    input = Input({'shape': (8, )})
+    hidden = Dense.make(16, {regularizer: {'class': 'L2'}}, [input])
+    network = NetworkInfo(Dense.make(3, {}, [hidden]), {})
+
+    assert not has_regularizers(make_replica(make_network(), 0).keras_model)
+    assert has_regularizers(make_replica(network, 0).keras_model)
@@ -0,0 +1,96 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import tensorflow.keras as keras
+
+from dmp.task.experiment.recorder.test_set_history_recorder import TestSetHistoryRecorder
+from dmp.task.experiment.recorder.timestamp_recorder import TimestampRecorder
+from dmp.task.experiment.training_experiment.compile_config import (
+    get_compile_config,
+    get_compile_options,
+)
+from dmp.task.experiment.training_experiment.test_set_info import TestSetInfo
+from tests import keras_test_util
+from tests.keras_test_util import make_keras_model
+
+
+def make_dataset(rng, size):
+    # pre-batched, with a partial last batch, and cached like the pipeline
+    return keras_test_util.make_dataset(rng, size, 16).cache()
+
+
+def train(epoch_in_graph):
+    rng = numpy.random.default_rng(0)
+    train_set = make_dataset(rng, 200)
+    validation_set = make_dataset(rng, 40)
+    test_set = make_dataset(rng, 50)
+    compile_options = get_compile_options(
+        get_compile_config({'epoch_in_graph': epoch_in_graph}),
+        train_set,
+    )
+
+    keras.utils.set_random_seed(0)
+    model = make_keras_model()
+    model.compile(
+        loss='categorical_crossentropy',
+        optimizer=keras.optimizers.Adam(0.01),
+        **compile_options,
+    )
+    timestamp_recorder = TimestampRecorder('_ms', 'epoch_start', 'train')
+    test_set_recorder = TestSetHistoryRecorder(
+        [TestSetInfo('test', test_set)],
+        timestamp_recorder,
+        {1},
+    )
+    history = model.fit(
+        train_set,
+        validation_data=validation_set,
+        epochs=4,
+        verbose=0,
+        callbacks=[timestamp_recorder, test_set_recorder],
+    )
+    return model, history, timestamp_recorder, test_set_recorder
+
+
+def test_epoch_in_graph_compile_options():
+    train_set = make_dataset(numpy.random.default_rng(0), 200)
+    config = get_compile_config({'epoch_in_graph': True, 'jit_compile': False})
+
+    assert get_compile_config(None)['epoch_in_graph'] is False
+    assert get_compile_options(get_compile_config(None), train_set) == {}
+    # 200 examples in batches of 16
+    assert get_compile_options(config, train_set) == {
+        'jit_compile': False,
+        'steps_per_execution': 13,
+    }
+    # the number of batches of a filtered dataset is unknown
+    unknown_set = train_set.filter(lambda inputs, outputs: True)
+    assert get_compile_options(config, unknown_set) == {'jit_compile': False}
+    assert get_compile_options(config, train_set.repeat()) == {
+        'jit_compile': False
+    }
+
+
+def test_epoch_in_one_execution_trains_like_single_steps():
+    expected_model, expected_history, _, expected_test = train(False)
+    model, history, timestamp_recorder, test_set_recorder = train(True)
+
+    for actual, desired in zip(model.get_weights(),
+                               expected_model.get_weights()):
+        numpy.testing.assert_allclose(actual, desired, atol=1e-5)
+    for metric, values in expected_history.history.items():
+        numpy.testing.assert_allclose(history.history[metric],
+                                      values,
+                                      rtol=1e-4)
+
+    # the per-epoch recorders still record every epoch
+    assert timestamp_recorder.epoch == [0, 1, 2, 3]
+    assert len(timestamp_recorder.history['train_ms']) == 4
+    assert test_set_recorder.epoch == [1, 3]
+    numpy.testing.assert_allclose(
+        test_set_recorder.history['test_loss'],
+        expected_test.history['test_loss'],
+        rtol=1e-4,
+    )
@@ -0,0 +1,154 @@
+import gc
+import sys
+import weakref
+
+sys.path.insert(0, './')
+
+import numpy
+import pandas
+import tensorflow
+import tensorflow.keras as keras
+
+from dmp.task.experiment.recorder.test_set_evaluator import TestSetEvaluator
+from dmp.task.experiment.recorder.test_set_history_recorder import TestSetHistoryRecorder
+from dmp.task.experiment.recorder.timestamp_recorder import TimestampRecorder
+from dmp.task.experiment.training_experiment.experiment_record_settings import ExperimentRecordSettings
+from dmp.task.experiment.training_experiment.test_set_info import TestSetInfo
+from dmp.task.experiment.training_experiment.training_experiment_keys import keys
+from dmp.task.experiment.training_experiment.training_experiment_summarizer import summarizer
+from tests.keras_test_util import make_dataset, make_keras_model
+
+
+def make_model():
+    model = make_keras_model(kernel_regularizer='l2')
+    model.compile(
+        loss='categorical_crossentropy',
+        optimizer='adam',
+        metrics=[
+            keras.metrics.CosineSimilarity(),
+            'accuracy',
+            keras.metrics.AUC(),
+        ],
+    )
+    return model
+
+
+def assert_matches_evaluate(model, results):
+    for test_set, metrics, seconds in results:
+        expected = model.evaluate(
+            test_set.test_data,
+            verbose=0,
+            return_dict=True,
+        )
+        assert set(metrics) == set(expected)
+        for metric, value in expected.items():
+            numpy.testing.assert_allclose(metrics[metric], value, rtol=1e-5)
+        assert seconds >= 0
+
+
+def test_fused_evaluation_matches_evaluate():
+    tensorflow.random.set_seed(0)
+    rng = numpy.random.default_rng(0)
+    model = make_model()
+    train = make_dataset(rng, 300)
+    evaluator = TestSetEvaluator(model, [
+        TestSetInfo('train', train),
+        TestSetInfo('validation', None),
+        TestSetInfo('test', make_dataset(rng, 100)),
+    ])
+
+    # metrics are first built while the evaluation is traced
+    results = evaluator.evaluate()
+    assert [r[0].history_key for r in results] == ['train', 'test']
+    assert_matches_evaluate(model, results)
+
+    model.fit(train, epochs=2, verbose=0)
+    assert_matches_evaluate(model, evaluator.evaluate())
+
+
+def test_evaluated_models_are_freed():
+    rng = numpy.random.default_rng(3)
+    test_set = TestSetInfo('test', make_dataset(rng, 50))
+    model_references = []
+    for _ in range(3):
+        model = make_model()
+        TestSetEvaluator(model, [test_set]).evaluate()
+        model_references.append(weakref.ref(model))
+        del model
+    gc.collect()
+    assert all(reference() is None for reference in model_references)
+
+
+def test_history_recorder_records_each_set():
+    tensorflow.random.set_seed(0)
+    rng = numpy.random.default_rng(1)
+    model = make_model()
+    train = make_dataset(rng, 200)
+    test = make_dataset(rng, 100)
+    recorder = TestSetHistoryRecorder([TestSetInfo('test', test)], None)
+    model.fit(train, epochs=3, verbose=0, callbacks=[recorder])
+
+    assert recorder.epoch == [0, 1, 2]
+    expected = model.evaluate(test, verbose=0, return_dict=True)
+    for metric, value in expected.items():
+        history = recorder.history['test_' + metric]
+        assert len(history) == 3
+        numpy.testing.assert_allclose(history[-1], value, rtol=1e-5)
+
+
+def test_scheduled_recorder_keeps_histories_aligned():
+    tensorflow.random.set_seed(0)
+    rng = numpy.random.default_rng(2)
+    model = make_model()
+    timestamp_recorder = TimestampRecorder('_ms', 'epoch_start', 'train')
+    recorder = TestSetHistoryRecorder(
+        [TestSetInfo('test', make_dataset(rng, 50))],
+        timestamp_recorder,
+        {0, 2},
+    )
+    model.fit(
+        make_dataset(rng, 100),
+        epochs=5,
+        verbose=0,
+        callbacks=[timestamp_recorder, recorder],
+    )
+
+    assert recorder.epoch == [0, 2, 4]  # the last epoch is always evaluated
+    assert len(recorder.history['test_loss']) == 3
+    assert timestamp_recorder.epoch == [0, 1, 2, 3, 4]
+    test_times = timestamp_recorder.history['test_ms']
+    assert [t is None for t in test_times] == [False, True, False, True, False]
+    assert len(timestamp_recorder.history['train_ms']) == 5
+
+
+def test_default_test_schedule_covers_summary_epochs():
+    record = ExperimentRecordSettings(False, True, None, None, {})
+    test_epochs = record.get_test_epochs(3000)
+    assert len(test_epochs) < 300
+    for num_epochs in (50, 500, 3000):
+        selected = summarizer._select_epochs(
+            pandas.Index(range(num_epochs + 1)))
+        assert set(selected.tolist()) <= test_epochs
+
+    record.test_schedule = {'epochs': [1, 10, 100]}
+    assert record.get_test_epochs(3000) == {1, 10, 100}
+    record.test_schedule = None
+    assert record.get_test_epochs(3000) is None
+
+
+def test_cumulative_indexes_skip_unevaluated_epochs():
+    # test sets evaluated after epochs 2, 3 and 4 only
+    cumulative_functions = {
+        column: cfunc
+        for column, cfunc, ifunc, result_column, epoch_column in
+        keys.run_summary_metrics
+    }
+    losses = numpy.array([numpy.nan, numpy.nan, 3.0, 2.0, 4.0])
+
+    values, indexes = cumulative_functions['test_loss'](losses)
+    numpy.testing.assert_equal(values[2:], [3.0, 2.0, 2.0])
+    assert indexes[2:].tolist() == [2, 3, 3]
+
+    values, indexes = cumulative_functions['test_accuracy'](-losses)
+    numpy.testing.assert_equal(values[2:], [-3.0, -2.0, -2.0])
+    assert indexes[2:].tolist() == [2, 3, 3]
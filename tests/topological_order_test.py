@@ -0,0 +1,35 @@
+import sys
+
+sys.path.insert(0, './')
+
+from dmp.layer import *
+from dmp.model.network_info import NetworkInfo
+
+
+def test_topological_order_of_deep_network():
+    input = Input({'shape': (4, )})
+    layer = input
+    for i in range(5000):  # deeper than the recursion limit
+        dense = Dense.make(4, {}, [layer])
+        layer = Add({}, [dense, layer])
+
+    network = NetworkInfo(layer, {})
+    order = layer.topological_order
+    assert len(order) == 10001
+    assert order[0] is input and order[-1] is layer
+    position = {l: i for i, l in enumerate(order)}
+    assert all(position[i] < position[l] for l in order for i in l.inputs)
+    assert network.num_free_parameters == 5000 * (4 * 4 + 4)
+
+
+def test_topological_order_cache_is_invalidated():
+    input = Input({'shape': (4, )})
+    a = Dense.make(4, {}, [input])
+    b = Dense.make(4, {}, [a])
+    assert b.topological_order == (input, a, b)
+    assert b.topological_order is b.topological_order
+
+    c = Dense.make(4, {}, [input])
+    b.inputs = [a, c]
+    assert b.topological_order == (input, a, c, b)
+    assert list(b.all_descendants) == [b, c, a, input]
@@ -0,0 +1,53 @@
+import sys
+
+sys.path.insert(0, './')
+
+import numpy
+import pytest
+
+from dmp.layer import *
+from dmp.layer.flatten import Flatten
+from dmp.model.dense_by_size import DenseBySize
+from dmp.model.network_info import NetworkInfo
+from dmp.task.experiment.growth_experiment.scaling_method.width_scaler import WidthScaler
+
+
+def make_cnn() -> NetworkInfo:
+    input = Input({'shape': (16, 16, 3)})
+    conv = DenseConv.make(16, [3, 3], [1, 1], {'padding': 'same'}, [input])
+    pool = MaxPool.make([2, 2], [2, 2], {}, [conv])
+    separable = SeparableConv.make(16, [3, 3], [1, 1], {'padding': 'same'},
+                                   [pool])
+    add = Add({}, [separable, pool])
+    projection = DenseConv.make(8, [1, 1], [1, 1], {
+        'padding': 'same',
+        'use_bias': False
+    }, [add])
+    concatenate = Concatenate({'axis': 2}, [add, projection])
+    pooled = GlobalAveragePooling({'data_format': None}, [concatenate])
+    hidden = Dense.make(20, {}, [Flatten({}, [concatenate])])
+    return NetworkInfo(Dense.make(10, {}, [pooled, hidden]), {})
+
+
+def make_dense() -> NetworkInfo:
+    return DenseBySize(
+        Input({'shape': (8, 8)}),
+        Dense.make(3, {}),
+        'trapezoid_residual',
+        10000,
+        5,
+        'integer',
+        Dense.make(-1, {}),
+    ).make_network()
+
+
+@pytest.mark.parametrize('make_network', [make_cnn, make_dense])
+def test_width_scaler_parameter_counter_matches_scaled_network(make_network):
+    network = make_network()
+    scaler = WidthScaler()
+    count_parameters = scaler.make_parameter_counter(network.structure)
+    assert count_parameters is not None
+    for scale_factor in numpy.linspace(0.01, 2.0, 41):
+        scaled, layer_map = scaler.scale(network.structure, scale_factor)
+        assert count_parameters(scale_factor) == \
+            NetworkInfo(scaled, {}).num_free_parameters